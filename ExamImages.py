@@ -1,554 +1,498 @@
-import pymupdf 
+import numpy as np
+import pymupdf
 from PIL import Image
+import hashlib
 import os
-import json
+import logging
 import re
-import pdfplumber
-from Regex_Patterns import get_footer_patterns, get_usnco_exam_footer_patterns
+from typing import NamedTuple
 from Image_Validator import validate_question_images, generate_validation_report
+from log_config import configure_logging
+from image_trim import trim_pixels
 
-FOOTER_PATTERNS = get_footer_patterns()
-USNCO_EXAM_FOOTER_PATTERNS = get_usnco_exam_footer_patterns()
+logger = logging.getLogger(__name__)
 
-def infer_superscripts(text):
-    # Finds subscripts and changes them to normal numbers
-    return re.sub(r"×\s*10\s*([+-]?\d+)", r"× 10^\1", text)
+QUESTION_NUMBER_PATTERN = re.compile(r"^(?!-)(\d{1,3})\.\s")
+PAGE_CENTER = 310  # Approximate x of the gap between the two columns
 
-def reformat_hyphen_numbers(text):
-    # Reformat patterns like '-8.', ']8.' or 'mol-1.' to prevent them from being misinterpreted as question numbers...
 
-    # Reformat standalone hyphen-number-period patterns
-    text = re.sub(r"-(\d+)\.", r"-(\1).", text)
+class ImageProfile(NamedTuple):
+    """How question images are rendered and encoded."""
+    format: str  # "PNG" or "WEBP" (lossless)
+    text_dpi: int  # Resolution of questions that are only text
+    figure_dpi: int  # Resolution of questions with an image or drawing
+    gray_levels: int  # Gray levels kept in text-only questions; 0 saves the render as RGB
+    trim: bool = False  # Crop to the ink plus a uniform margin (image_trim) before encoding
 
-    # Reformat standalone bracket-number-period patterns
-    text = re.sub(r"\](\d+)\.", r"](\1).", text)
+    @property
+    def extension(self):
+        return "." + self.format.lower()
 
-    # Handle cases like 'mol-1.' or 'kJ mol-1.'
-    text = re.sub(r"(\w+)-(\d+)\.", r"\1-(\2).", text)
+    @property
+    def save_options(self):
+        return save_options(self.format)
 
-    return text
 
-def remove_footer_from_option(text):
-    # Remove footer text specifically from option D
+IMAGE_PROFILES = {
+    "original": ImageProfile("PNG", 300, 300, 0),
+    "trimmed": ImageProfile("PNG", 300, 300, 0, trim=True),
+    "compact": ImageProfile("PNG", 200, 300, 16, trim=True),
+    "webp": ImageProfile("WEBP", 200, 300, 16, trim=True),
+}
+FIGURE_MIN_SIZE = 10  # Points; thinner drawings are rules, fraction bars and underlines
 
-    return re.sub(FOOTER_PATTERNS['option_footer'], '', text, flags=re.IGNORECASE).strip()
 
-def remove_unwanted_text(text, page_number):
-    # Removes instructions and footer text based on known patterns.
+def save_options(image_format):
+    """Encoder options question images are saved with in a format."""
+    # Lossless WebP at method 2 is as small as the default method 4 on exam pages, in half the time
+    return {"lossless": True, "method": 2} if image_format == "WEBP" else {}
 
-    patterns = []
 
-    # page-specific patterns
-    if page_number == 3:  # Page 3 instructions
-        patterns.append(
-            r"DIRECTIONS\s+ When you have selected your answer to each question, blacken the corresponding space on the answer sheet using a soft, #2 pencil\. Make a heavy, full mark, but no stray marks\. If you decide to change an answer, erase the unwanted mark very carefully\.\s+ There is only one correct answer to each question\. Any questions for which more than one response has been blackened will not\s+be counted\.  Your score is based solely on the number of questions you answer correctly\. It is to your advantage to answer every question\."
-        )
-    # Add footer patterns for odd and even pages
-    if page_number % 2 == 1:  # Odd pages
-        patterns.append(
-            r"Property of ACS USNCO – Not for use as USNCO Local Sectio"
-        )
-    else:  # Even pages
-        patterns.append(
-            r"Page \d+ Property of ACS USNCO –"
-        )
-        patterns.append(r"ot for use as USNCO Local Section Exam after March 31, (200[0-9]|201[0-9]|202[0-2])")
-        patterns.append(r"END OF TEST")
-
-    # Remove all matches of these patterns
-    for pattern in patterns:
-        text = re.sub(pattern, "", text)
-    for pattern in USNCO_EXAM_FOOTER_PATTERNS:
-        text = re.sub(pattern, "", text, flags=re.IGNORECASE)
-
-    return text.strip()
-
-
-
-def clean_text_with_removal(page_text, page_number):
-    """
-    Cleans and standardizes text:
-    - Removes instructions and footer text.
-    - Infers superscripts for scientific notation.
-    - Reformats problematic patterns.
-    - Removes unnecessary line breaks and extra spaces.
-    - Ensures consistent formatting for parsing.
+def resolution_options(image_format, dpi):
     """
-    # Step 1: Remove unwanted text (instructions and footers)
-    text = remove_unwanted_text(page_text, page_number)
-
-    # Step 2: Infer superscripts for scientific notation
-    text = infer_superscripts(text)
+    Save options that record an image's resolution, so later stages can convert points to pixels.
 
-    # Step 3: Reformat problematic patterns
-    text = reformat_hyphen_numbers(text)
-
-    # Step 4: Replace subscript characters with normal digits
-    subscript_map = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
-    text = text.translate(subscript_map)
-
-    # Step 5: Remove extra spaces
-    text = re.sub(r"\s+", " ", text)
+    PNG has a pHYs chunk for it; WebP only carries it in EXIF (XResolution,
+    YResolution and ResolutionUnit 2, inches).
+    """
+    if image_format == "WEBP":
+        exif = Image.Exif()
+        exif[0x011A] = exif[0x011B] = dpi
+        exif[0x0128] = 2
+        return {"exif": exif.tobytes()}
+    return {"dpi": (dpi, dpi)}
 
-    # Step 6: Merge lines
-    text = re.sub(r"\n(?!\d+\.\s|\(A\)|\(B\)|\(C\)|\(D\))", " ", text)
 
-    # Step 7: Add consistent line breaks for questions and answer options
-    text = re.sub(r"(\d+\.\s)", r"\n\1", text)  # Add newline before question numbers
-    text = re.sub(r"(\(A\))", r"\n\1", text)    # Add newline before option A
-    text = re.sub(r"(\(B\))", r"\n\1", text)    # Add newline before option B
-    text = re.sub(r"(\(C\))", r"\n\1", text)    # Add newline before option C
-    text = re.sub(r"(\(D\))", r"\n\1", text)    # Add newline before option D
+def block_geometry(blocks):
+    """
+    Hold the page's text blocks as arrays, matching the question pattern once per block.
 
-    return text.strip()
+    Args:
+        blocks (list): List of text blocks, each a tuple containing:
+                       (x0, y0, x1, y1, text, block_no, block_type).
+    Returns:
+        tuple: (n, 4) float array of the blocks' x0, y0, x1, y1, and a boolean
+               array that is True for the blocks starting a question.
+    """
+    coords = np.array([block[:4] for block in blocks], dtype=float).reshape(-1, 4)
+    starts = np.array([QUESTION_NUMBER_PATTERN.match(block[4].strip()) is not None for block in blocks], dtype=bool)
+    return coords, starts
 
-def filter_non_questions(text):
-    match = re.search(r"(\d+\..+)", text, re.DOTALL)
-    return match.group(1) if match else ""
+def close_gaps_between_bounding_boxes(coords, gap_threshold=0):
+    """
+    Adjust bounding boxes to close significant gaps between them.
 
-def parse_questions(block):
+    Args:
+        coords (numpy.ndarray): (n, 4) array of block x0, y0, x1, y1.
+        gap_threshold (float): The maximum allowable gap between bounding boxes.
+    Returns:
+        numpy.ndarray: The adjusted coordinates.
+    """
+    coords = coords.copy()
+    y1 = coords[:, 3]
+    # Gap to the next block; the last block has none
+    gap = np.append(coords[1:, 1] - y1[:-1], np.nan)
+    has_next = ~np.isnan(gap)
+    y1 = np.where(has_next & (y1 > 650), y1 + 35, y1)
+    # If the gap exceeds the threshold, close it by extending y1
+    y1 = np.where(gap > gap_threshold, y1 + (31 - gap), y1)
+    coords[:, 3] = y1 - 10
+    return coords
+
+def adjust_x1_based_on_center(coords, center_threshold=25, page_center=PAGE_CENTER, second_page_right=700):
+    """
+    Adjust x1 coordinates based on distance from the center of the page.
 
-    # Parses a block of text representing a single question and its options
+    Left column blocks ending far from the center are widened or cut to it,
+    and right column blocks are widened to second_page_right.
 
-    # Match the question number and text up to the options
-    question_number_pattern = r"^(?!-)(\d{1,3})\.\s(.+?)(?=\s\(A\))"
-    option_pattern = (
-        r"\(A\)(.+?)\s*"
-        r"\(B\)(.+?)\s*"
-        r"\(C\)(.+?)\s*"
-        r"\(D\)(.+?)(?=\s*\d+\.\s|$)"
+    Args:
+        coords (numpy.ndarray): (n, 4) array of block x0, y0, x1, y1.
+        center_threshold (float): Maximum allowed distance from the page center.
+        page_center (float): x-coordinate of the center of the page.
+        second_page_right (float): x1 given to every right column block.
+    Returns:
+        numpy.ndarray: The adjusted coordinates.
+    """
+    coords = coords.copy()
+    x0, x1 = coords[:, 0], coords[:, 2]
+    coords[:, 2] = np.where(
+        x0 > page_center, second_page_right,
+        np.where((x0 < page_center) & (np.abs(x1 - page_center) > center_threshold), page_center, x1),
     )
+    return coords
 
-    # Match the question text
-    question_match = re.search(question_number_pattern, block, re.DOTALL)
-    if not question_match:
-        print(f"DEBUG: Question not found in block:\n{block}")
-        return None
-    
-    # Match the options
-    options_match = re.search(option_pattern, block, re.DOTALL)
-    if not options_match:
-        print(f"DEBUG: Options not found for block:\n{block}")
-        return None
-
-    # Extract question details
-    question_number = question_match.group(1).strip() if question_match else None
-    question_text = question_match.group(2).strip() if question_match else None
-    options = {
-        "A": options_match.group(1).strip() if options_match else None,
-        "B": options_match.group(2).strip() if options_match else None,
-        "C": options_match.group(3).strip() if options_match else None,
-        "D": options_match.group(4).strip() if options_match else None,
-    }
+def find_next_question_starts(coords, starts, page_center=PAGE_CENTER):
+    """
+    Find the y-coordinate where the next question in the same column starts, for every block.
 
-    return {"number": question_number, "text": question_text, "options": options}
+    Args:
+        coords (numpy.ndarray): (n, 4) array of block x0, y0, x1, y1.
+        starts (numpy.ndarray): True for the blocks starting a question.
+        page_center (float): x-coordinate splitting the columns.
+    Returns:
+        numpy.ndarray: y0 of the next question block after each block, NaN where there is none.
+    """
+    next_y0 = np.full(len(coords), np.nan)
+    indices = np.arange(len(coords))
+    in_left_column = coords[:, 0] < page_center
+    for column in (in_left_column, ~in_left_column):
+        question_indices = indices[starts & column]
+        column_indices = indices[column]
+        position = np.searchsorted(question_indices, column_indices, side="right")
+        found = position < len(question_indices)
+        next_y0[column_indices[found]] = coords[question_indices[position[found]], 1]
+    return next_y0
+
+def adjust_bounding_boxes(coords, starts, page_height):
+    """
+    Adjust question bounding boxes to extend to the start of the next question.
 
+    Args:
+        coords (numpy.ndarray): (n, 4) array of block x0, y0, x1, y1.
+        starts (numpy.ndarray): True for the blocks starting a question.
+        page_height (float): Height of the page.
+    Returns:
+        numpy.ndarray: The adjusted coordinates.
+    """
+    coords = coords.copy()
+    y0, y1 = coords[:, 1], coords[:, 3]
+    next_y0 = find_next_question_starts(coords, starts)
+    has_next = starts & ~np.isnan(next_y0)
+
+    # The last question of a column ending near the bottom is kept clear of the footer
+    bottom = starts & ~has_next & (page_height - y1 < 50) & (y1 > page_height - 50)
+    # Others end 10 points above the next question, unless that would make the box invalid
+    new_y1 = next_y0 - 10
+    extend = has_next & (new_y1 > y0)
+    invalid = np.flatnonzero(has_next & ~extend)
+    if len(invalid):
+        logger.warning("Invalid bounding box prevented for question in blocks %s", invalid.tolist())
+
+    coords[:, 3] = np.where(bottom, page_height - 50, np.where(extend, new_y1, y1))
+    return coords
+
+def merge_question_blocks(coords, starts):
+    """
+    Merge each question block with the blocks after it, up to the next question.
 
-def extract_questions_from_page(page, page_number, left_bbox, right_bbox):
-    # Extracts questions and their corresponding images from a single page.
+    Blocks with no area are left out of the union, as Rect.include_rect does,
+    and a union of two or more boxes is rounded to float32 like pymupdf's.
 
-    questions = []
-    width = page.width
-    height = page.height
+    Args:
+        coords (numpy.ndarray): (n, 4) array of block x0, y0, x1, y1.
+        starts (numpy.ndarray): True for the blocks starting a question.
+    Returns:
+        numpy.ndarray: (questions, 4) array of question bounding boxes.
+    """
+    question = np.cumsum(starts) - 1  # -1 for the blocks before the first question
+    members = (question >= 0) & (coords[:, 0] < coords[:, 2]) & (coords[:, 1] < coords[:, 3])
+    count = np.bincount(question[members], minlength=int(starts.sum()))
+    lows = np.full((len(count), 2), np.inf)
+    highs = np.full((len(count), 2), -np.inf)
+    np.minimum.at(lows, question[members], coords[members, :2])
+    np.maximum.at(highs, question[members], coords[members, 2:])
+    merged = np.hstack([lows, highs])
+    merged = np.where(count[:, None] > 1, merged.astype(np.float32), merged)
+    return np.where(count[:, None] > 0, merged, coords[starts])
+
+def find_question_bboxes(blocks, page_height):
+    """
+    Find each question's bounding box on a page.
 
-    # Extract text from columns
-    left_text = page.within_bbox(left_bbox).extract_text(y_tolerance=6) or ""
-    right_text = page.within_bbox(right_bbox).extract_text(y_tolerance=6) or ""
+    Args:
+        blocks (list): The page's text blocks from page.get_text("blocks").
+        page_height (float): Height of the page.
+    Returns:
+        list: (question number, pymupdf.Rect) pairs in reading order.
+    """
+    coords, starts = block_geometry(blocks)
+    coords = adjust_x1_based_on_center(coords)
+    coords = adjust_bounding_boxes(coords, starts, page_height)
+    coords = close_gaps_between_bounding_boxes(coords)
 
-    # Clean and merge text
-    combined_text = (
-        clean_text_with_removal(left_text, page_number)
-        + "\n"
-        + clean_text_with_removal(right_text, page_number)
-    )
+    numbers = [QUESTION_NUMBER_PATTERN.match(block[4].strip()).group(1) for block, is_start in zip(blocks, starts) if is_start]
+    return [(number, pymupdf.Rect(*bbox)) for number, bbox in zip(numbers, merge_question_blocks(coords, starts).tolist())]
 
-    # Use re.finditer() to match all questions and options in the text
-    question_pattern = r"(\d{1,3})\.\s.+?(?=\n\d{1,3}\.\s|\Z)"
-    matches = re.finditer(question_pattern, combined_text, re.DOTALL)
-
-    for match in matches:
-        question_block = match.group(0)  # Extract the matched question block
-        parsed_question = parse_questions(question_block)
-        if parsed_question:
-            questions.append(parsed_question)
-
-    return questions
-
-def extract_questions(pdf_path):
-    questions = []
-    error_log = []
-    
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_number, page in enumerate(pdf.pages[2:-1], start=3):
-            try:
-                page_questions = extract_questions_from_page(page, page_number, 
-                    (0, 0, page.width / 2, page.height), 
-                    (page.width / 2, 0, page.width, page.height))
-                questions.extend(page_questions)
-            except Exception as e:
-                error_log.append({
-                    'page': page_number,
-                    'error': str(e)
-                })
-    
-    # Log errors for later review
-    if error_log:
-        with open('parsing_errors.json', 'w') as f:
-            json.dump(error_log, f, indent=4)
-    
-    return questions
-
-def close_gaps_between_bounding_boxes(blocks, gap_threshold=0):
+def save_page_question_images(page, blocks, output_folder, exam_type, exam_year, renderer=None,
+                              profile="original"):
     """
-    Adjust bounding boxes to close significant gaps between them.
+    Save an image of every question on one page.
 
     Args:
-        blocks (list): List of text blocks, each a tuple containing:
-                       (x0, y0, x1, y1, text, block_no, page_no).
-        gap_threshold (float): The maximum allowable gap between bounding boxes.
+        page: The pymupdf page.
+        blocks (list): The page's text blocks from page.get_text("blocks").
+        output_folder (str): Folder to save the images in.
+        exam_type (int): 1 for local, 2 for national.
+        exam_year (int): Year of the exam.
+        renderer (PageRenderer): Renders the page once for all its questions; a new one if None.
+        profile (str): Name of the ImageProfile in IMAGE_PROFILES to save the images with.
     Returns:
-        list: List of adjusted bounding boxes.
-    """
-    adjusted_blocks = []
-    for i, block in enumerate(blocks):
-        if ValueError:
-            pass
-        x0, y0, x1, y1, text, block_no, page_no = block
-
-        # If this is not the last block, check the gap with the next block
-        if i < len(blocks) - 1:
-            next_y0 = blocks[i + 1][1]  # y0 of the next block
-            gap = next_y0 - y1  # Calculate the gap
-            if y1 > 650:
-                y1 += 35
-            # If the gap exceeds the threshold, close it by extending the y2
-            if gap > gap_threshold:
-                y1 += 31 - gap  # Adjust y1 to close the gap
-        
-        
-        # Append the adjusted block to the list
-        adjusted_blocks.append((x0, y0, x1, y1 - 10, text, block_no, page_no))
-    
-    return adjusted_blocks
-
-def adjust_x1_based_on_center(blocks, center_threshold=25, page_center=310, second_page_right = 700):
-    """
-    Adjust x1 coordinates based on distance from the center of the page, only for the left column.
+        dict: A dictionary mapping question IDs to image paths.
+    """
+    renderer = renderer or PageRenderer()
+    image_profile = IMAGE_PROFILES[profile]
+    # Only profiles that treat figures differently need to look for them
+    figures = page_figures(page) if image_profile.gray_levels or image_profile.text_dpi != image_profile.figure_dpi else []
+    question_images = {}
+    for number, bbox in find_question_bboxes(blocks, page.rect.height):
+        question_id = f"{exam_type}{exam_year}{number}"
+        save_path = os.path.join(output_folder, question_id + image_profile.extension)
+        logger.debug("Saving question %s with bounding box %s", question_id, bbox)
+        figure = any(bbox.intersects(rect) for rect in figures)
+        save_image_from_bbox(page, bbox, save_path, renderer=renderer, profile=image_profile, figure=figure)
+        question_images[question_id] = save_path
+    return question_images
 
-    Args:
-        blocks (list): List of text blocks, each a tuple containing:
-                       (x0, y0, x1, y1, text, block_no, page_no).
-        center_threshold (float): Maximum allowed distance from the page center.
-        page_center (float): x-coordinate of the center of the page.
-    Returns:
-        list: List of adjusted bounding boxes.
-    """
-    adjusted_blocks = []
-    
-    for block in blocks:
-        try:
-            x0, y0, x1, y1, text, block_no, page_no = block
-            
-            # Check if the block belongs to the left column
-            if page_center is not None and x0 < page_center:
-                if abs(x1 - page_center) > center_threshold:
-                    x1 = page_center  # Adjust x1 to the center of the page
-            
-            if page_center is not None and x0 > page_center:
-                x1 = second_page_right
-            
-            # Append the adjusted block to the list
-            adjusted_blocks.append((x0, y0, x1, y1, text, block_no, page_no))
-        except ValueError as e:
-            print(f"Skipping block due to unpacking error: {block} | Error: {e}")
-            continue  # Skip this block and proceed to the next
-    
-    return adjusted_blocks
-
-
-
-import pymupdf  # PyMuPDF
-def is_bottom_question(blocks, current_block_index, page_height, threshold=50):
-    """
-    Determine if this is the last question on the page.
-    """
-    current_block = blocks[current_block_index]
-    if not current_block:
-        return False
-        
-    next_question_y = find_next_question_start(blocks, current_block_index)
-    if next_question_y is None:
-        return (page_height - current_block[3]) < threshold
-    return False
-
-def adjust_bounding_boxes(blocks, page_height):
-    """
-    Adjust bounding boxes to extend to the start of the next question.
-    """
-    adjusted_blocks = []
-    question_pattern = r"^(?!-)(\d{1,3})\.\s"
-    
-    for i, block in enumerate(blocks):
-        if not block:  # Skip empty blocks
-            continue
-            
-        x0, y0, x1, y1, text, block_no, page_no = block
-        
-        if re.match(question_pattern, text.strip()):
-            if is_bottom_question(blocks, i, page_height):
-                adjusted_blocks.append(block)
-                continue
-                
-            next_y = find_next_question_start(blocks, i)
-            if next_y is not None:
-                new_y1 = next_y - 18  # 5 pixel padding
-                adjusted_blocks.append((x0, y0, x1, new_y1, text, block_no, page_no))
-            else:
-                adjusted_blocks.append(block)
-        else:
-            adjusted_blocks.append(block)
-    
-    return adjusted_blocks
-
-def find_next_question_start(blocks, current_block_index):
-    """
-    Find the y-coordinate where the next question starts.
-    """
-    question_pattern = r"^(?!-)(\d{1,3})\.\s"
-    current_block = blocks[current_block_index]
-    current_x0 = current_block[0]  # Get x-coordinate of current block
-    page_center = 310  # Approximate center of page
-    
-    # Determine if we're in left or right column
-    in_left_column = current_x0 < page_center
-    
-    for i in range(current_block_index + 1, len(blocks)):
-        if not blocks[i]:  # Skip empty blocks
-            continue
-            
-        next_block = blocks[i]
-        next_x0 = next_block[0]
-        next_in_left = next_x0 < page_center
-        
-        # Only look for next question in same column
-        if in_left_column != next_in_left:
-            continue
-            
-        text = next_block[4].strip()
-        if re.match(question_pattern, text):
-            # Add debug output
-            print(f"Found next question: {text}")
-            print(f"Current question y1: {current_block[3]}")
-            print(f"Next question y0: {next_block[1]}")
-            return next_block[1]  # Return y0 of the next question
-    return None
-
-def adjust_bounding_boxes(blocks, page_height):
-    """
-    Adjust bounding boxes to extend to the start of the next question.
-    """
-    adjusted_blocks = []
-    question_pattern = r"^(?!-)(\d{1,3})\.\s"
-    page_center = 310  # Approximate center of page
-    
-    # First pass: identify all question blocks and their columns
-    question_blocks = []
-    for i, block in enumerate(blocks):
-        if not block:  # Skip empty blocks
-            continue
-            
-        text = block[4].strip()
-        if re.match(question_pattern, text):
-            x0 = block[0]
-            in_left_column = x0 < page_center
-            question_blocks.append((i, block, in_left_column))
-    
-    # Second pass: adjust blocks with awareness of column structure
-    for i, block in enumerate(blocks):
-        if not block:  # Skip empty blocks
-            continue
-            
-        x0, y0, x1, y1, text, block_no, page_no = block
-        
-        if re.match(question_pattern, text.strip()):
-            in_left_column = x0 < page_center
-            
-            if is_bottom_question(blocks, i, page_height):
-                # For bottom questions, keep original block but ensure proper height
-                if y1 > page_height - 50:  # Adjust if too close to bottom
-                    y1 = page_height - 50
-                adjusted_blocks.append((x0, y0, x1, y1, text, block_no, page_no))
-                continue
-                
-            next_y = find_next_question_start(blocks, i)
-            if next_y is not None:
-                # Add more padding (10 pixels) to ensure separation
-                new_y1 = next_y - 10
-                
-                # Ensure we're not creating an invalid bounding box
-                if new_y1 > y0:
-                    adjusted_blocks.append((x0, y0, x1, new_y1, text, block_no, page_no))
-                else:
-                    # If invalid, keep original
-                    adjusted_blocks.append(block)
-                    print(f"Warning: Invalid bounding box prevented for question in block {i}")
-            else:
-                # If no next question found, use original block
-                adjusted_blocks.append(block)
-        else:
-            # Non-question blocks remain unchanged
-            adjusted_blocks.append(block)
-    
-    return adjusted_blocks
-
-def save_individual_question_images_with_ids(pdf_path, output_folder, exam_type, exam_year):
-    """
-    Modified version with additional debugging and validation.
-    """
-    question_number_pattern = r"^(?!-)(\d{1,3})\.\s"
-    option_regex = r"\(A\)|\(B\)|\(C\)|\(D\)"
+def page_figures(page):
+    """
+    Bounding boxes of the images and drawings on a page that are figures or structures.
+
+    Drawings thinner than FIGURE_MIN_SIZE in either direction are left out,
+    as are vector glyphs, which are smaller.
+    """
+    figures = []
+    for kind, rect in page.get_bboxlog():
+        rect = pymupdf.Rect(rect)
+        if ("image" in kind or "path" in kind) and rect.width > FIGURE_MIN_SIZE and rect.height > FIGURE_MIN_SIZE:
+            figures.append(rect)
+    return figures
+
+def save_individual_question_images_with_ids(pdf_path, output_folder, exam_type, exam_year, page_range=None,
+                                             render_cache=None, profile="original"):
+    """
+    Save one image per question, named by question ID.
+
+    page_range optionally limits this to (start, stop) 0-based page indices,
+    render_cache is an optional folder to keep rendered pages in and profile
+    names the ImageProfile to save the images with.
+    """
     question_images = {}
+    renderer = PageRenderer(pdf_digest(pdf_path) if render_cache else None, render_cache)
 
     with pymupdf.open(pdf_path) as pdf:
-        for page_index, page in enumerate(pdf):
+        start, stop = page_range or (0, len(pdf))
+        for page_index in range(start, stop):
+            page = pdf[page_index]
             if page_index == 0 or page_index == 1 or page_index == len(pdf) - 1:
                 continue
-            
-            page_height = page.rect.height
-            blocks = page.get_text("blocks")
-            
-            # Add debug output for blocks
-            print(f"\nProcessing page {page_index + 1}")
-            
-            blocks = adjust_x1_based_on_center(blocks)
-            blocks = adjust_bounding_boxes(blocks, page_height)
-            adjusted_blocks = close_gaps_between_bounding_boxes(blocks)
-
-            current_question_bbox = None
-            current_question_text = ""
-            
-            for block in adjusted_blocks:
-                if not block:
-                    continue
-                    
-                text = block[4].strip()
-                bbox = pymupdf.Rect(*block[:4])
-
-                if re.match(question_number_pattern, text):
-                    if current_question_bbox:
-                        # Save previous question
-                        question_id = f"{exam_type}{exam_year}{current_question_text.split('.')[0].strip()}"
-                        save_path = os.path.join(output_folder, f"{question_id}.png")
-                        
-                        # Add debug output for bounding box
-                        print(f"\nSaving question {question_id}")
-                        print(f"Bounding box: {current_question_bbox}")
-                        
-                        save_image_from_bbox(page, current_question_bbox, save_path)
-                        question_images[question_id] = save_path
-                    
-                    current_question_bbox = bbox
-                    current_question_text = text
-                    continue
-                
-                if current_question_bbox:
-                    current_question_bbox = current_question_bbox.include_rect(bbox)
-                    current_question_text += " " + text
-
-            # Handle last question on page
-            if current_question_bbox:
-                question_id = f"{exam_type}{exam_year}{current_question_text.split('.')[0].strip()}"
-                save_path = os.path.join(output_folder, f"{question_id}.png")
-                save_image_from_bbox(page, current_question_bbox, save_path)
-                question_images[question_id] = save_path
+
+            logger.debug("Processing page %d of %s", page_index + 1, pdf_path)
+            question_images.update(
+                save_page_question_images(
+                    page, page.get_text("blocks"), output_folder, exam_type, exam_year, renderer, profile
+                )
+            )
 
     return question_images
 
-def save_image_from_bbox(page, bbox, save_path, dpi=300):
+def pdf_digest(pdf_path):
+    """SHA-256 of a PDF file, which names its pages in the render cache."""
+    sha = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def clip_to_page(page, bbox):
     """
-    Save a cropped image of the specified bounding box.
+    Clamp a bounding box to the page.
 
-    Args:
-        page: The page from which to crop the image.
-        bbox: Bounding box to crop.
-        save_path (str): Path to save the cropped image.
-        dpi (int): Resolution of the output image.
+    Returns:
+        tuple: (x0, y0, x1, y1), or None if nothing of the box is left on the page.
     """
-    # Ensure bounding box is within page bounds
     page_width, page_height = page.rect.width, page.rect.height
     x0, y0, x1, y1 = bbox
-
-    # Clamp bounding box coordinates
     x0 = max(0, min(x0, page_width))
     y0 = max(0, min(y0, page_height))
     x1 = max(0, min(x1, page_width))
     y1 = max(0, min(y1, page_height))
-
-    # If the bounding box is invalid after clamping, skip it
     if x0 >= x1 or y0 >= y1:
-        print(f"Skipping invalid bounding box: {bbox}")
-        return
-
-    # Render only the specified bounding box
-    pix = page.get_pixmap(dpi=dpi, clip=(x0, y0, x1, y1))
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        return None
+    return x0, y0, x1, y1
 
-    # Save the image
-    img.save(save_path)
-    print(f"Saved question image to: {save_path}")
+class PageRenderer:
+    """
+    Renders a page once per DPI and crops question images out of that raster.
+
+    Crops are NumPy slices of the page's pixels, with the same pixel grid as
+    page.get_pixmap(dpi=dpi, clip=bbox), so they match rendering each
+    question on its own to within edge resampling: a clip rendered alone can
+    anti-alias the glyphs it cuts through differently (a few crops in the
+    corpus differ by up to 17 levels in edge pixels). Only the most recent
+    page is held in memory.
+
+    With a cache folder, rendered pages are also written there as .npy files,
+    named by the PDF's SHA-256, the pymupdf version, the page and the DPI, and
+    memory-mapped instead of rendered on later runs. Re-cropping after a
+    bounding box change then reads pixels rather than rendering the PDF. A page
+    whose three channels are equal, as nearly all exam pages are, is stored as
+    one channel (about 8 MB at 300 DPI).
+    """
 
-def process_all_exams_for_image(input_folder, output_folder):
+    def __init__(self, pdf_digest=None, cache_folder=None):
+        self.pdf_digest = pdf_digest
+        self.cache_folder = cache_folder if pdf_digest else None
+        self._page_index = None
+        self._rasters = {}  # dpi -> (pixels, pixmap or None)
+
+    def cache_path(self, page_index, dpi):
+        name = f"{self.pdf_digest[:16]}-{pymupdf.VersionBind}-p{page_index}-{dpi}dpi.npy"
+        return os.path.join(self.cache_folder, name)
+
+    def page_pixels(self, page, dpi=300):
+        """
+        The page's pixels at dpi, rendering it only if neither memory nor the cache folder has them.
+
+        Returns:
+            numpy.ndarray: (height, width, 3) RGB pixels, or (height, width) for a gray page read from the cache.
+        """
+        if page.number != self._page_index:
+            self._rasters.clear()
+            self._page_index = page.number
+        raster = self._rasters.get(dpi)
+        if raster is not None:
+            return raster[0]
+
+        path = self.cache_path(page.number, dpi) if self.cache_folder else None
+        if path and os.path.exists(path):
+            self._rasters[dpi] = (np.load(path, mmap_mode="r"), None)
+            return self._rasters[dpi][0]
+
+        pix = page.get_pixmap(dpi=dpi)
+        # A view of the pixmap's samples; the pixmap is kept alongside so the memory stays valid
+        pixels = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        self._rasters[dpi] = (pixels, pix)
+        if path:
+            self.save_to_cache(pixels, path)
+        return pixels
+
+    def save_to_cache(self, pixels, path):
+        os.makedirs(self.cache_folder, exist_ok=True)
+        if (pixels[..., 0] == pixels[..., 1]).all() and (pixels[..., 1] == pixels[..., 2]).all():
+            pixels = np.ascontiguousarray(pixels[..., 0])  # np.save writes a strided view element by element
+        # Written under a temporary name so that parallel workers never read a partial file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.save(f, pixels)
+        os.replace(temporary, path)
+
+    def crop(self, page, bbox, dpi=300):
+        """
+        Pixels of a bounding box of the page, as a view into the page raster.
+
+        Returns:
+            numpy.ndarray: The cropped pixels, or None if the box lies outside the page.
+        """
+        clip = clip_to_page(page, bbox)
+        if clip is None:
+            logger.warning("Skipping invalid bounding box: %s", bbox)
+            return None
+        zoom = dpi / 72
+        # The pixels get_pixmap(clip=...) would render: the clip scaled and rounded outwards
+        area = (pymupdf.Rect(clip) * pymupdf.Matrix(zoom, zoom)).irect
+        return self.page_pixels(page, dpi)[area.y0:area.y1, area.x0:area.x1]
+
+    def release(self):
+        """Drop the page raster held in memory."""
+        self._rasters.clear()
+        self._page_index = None
+
+def render_bbox(page, bbox, dpi=300, renderer=None, trim=False):
     """
-    Process all exam PDFs in a given folder and classify them as local or national.
+    Render the specified bounding box of a page.
 
     Args:
-        input_folder (str): Path to the folder containing exam PDFs.
-        output_folder (str): Path to save question images.
+        page: The page to render from.
+        bbox: Bounding box to render.
+        dpi (int): Resolution of the image.
+        renderer (PageRenderer): Holds the rendered page between calls; a new one if None.
+        trim (bool): Crop the region to its ink plus a uniform margin and pad it to a common width (image_trim).
     Returns:
-        dict: A dictionary mapping question IDs to image paths.
+        PIL.Image.Image: The rendered region, or None if the box lies outside the page.
     """
-    exam_mappings = {}
-
-    for file_name in os.listdir(input_folder):
-        if not file_name.endswith(".pdf"):
-            continue
-
-        # Determine exam type based on the file name
-        exam_type = 1 if "local" in file_name.lower() else 2 if "national" in file_name.lower() else 0
-        if exam_type == 0:
-            print(f"Skipping file {file_name}: Unable to determine exam type (local or national).")
-            continue
+    # Held until the pixels are copied out: the crop is a view into the renderer's pixmap
+    renderer = renderer or PageRenderer()
+    pixels = renderer.crop(page, bbox, dpi)
+    if pixels is None:
+        return None
+    if trim:
+        # On the crop's pixels, before they are copied out of the page raster
+        trimmed = trim_pixels(pixels, dpi)
+        pixels = pixels if trimmed is None else trimmed
+    img = Image.fromarray(np.ascontiguousarray(pixels))
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+def compact_image(img, figure, gray_levels):
+    """
+    A rendered question in as few colours as it needs.
 
-        # Extract the year from the file name
-        try:
-            exam_year = int(re.search(r"\d{4}", file_name).group())
-        except AttributeError:
-            print(f"Skipping file {file_name}: Unable to extract year.")
-            continue
+    Gray crops become 8-bit grayscale if they hold a figure, and otherwise
+    a palette of gray_levels evenly spaced grays (16 levels are saved with 4
+    bits per pixel). Crops with colour are quantized to a 256 colour palette.
 
-        # Process each exam and save images
-        pdf_path = os.path.join(input_folder, file_name)
-        base_name = os.path.splitext(file_name)[0]
-        exam_output_folder = os.path.join(output_folder, base_name)
-        os.makedirs(exam_output_folder, exist_ok=True)
+    Args:
+        img (PIL.Image.Image): The RGB render.
+        figure (bool): Whether the crop contains a figure or structure.
+        gray_levels (int): Gray levels kept for text-only crops.
+    Returns:
+        PIL.Image.Image: An "L" or "P" image.
+    """
+    pixels = np.asarray(img)
+    if not ((pixels[..., 0] == pixels[..., 1]).all() and (pixels[..., 1] == pixels[..., 2]).all()):
+        return img.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    gray = pixels[..., 0]
+    if figure:
+        return Image.fromarray(gray)
+    steps = gray_levels - 1
+    levels = ((gray.astype(np.uint16) * steps + 127) // 255).astype(np.uint8)
+    compact = Image.fromarray(levels, "P")
+    compact.putpalette([round(level * 255 / steps) for level in range(gray_levels) for _ in range(3)])
+    return compact
+
+def save_image_from_bbox(page, bbox, save_path, dpi=300, renderer=None, profile=None, figure=False):
+    """
+    Save a cropped image of the specified bounding box.
 
-        # Generate question images and IDs
-        question_images = save_individual_question_images_with_ids(
-            pdf_path, exam_output_folder, exam_type, exam_year
-        )
-        exam_mappings.update(question_images)  # Combine mappings
-    return exam_mappings
+    Args:
+        page: The page from which to crop the image.
+        bbox: Bounding box to crop.
+        save_path (str): Path to save the cropped image.
+        dpi (int): Resolution of the output image, when no profile is given.
+        renderer (PageRenderer): Holds the rendered page between calls; a new one if None.
+        profile (ImageProfile): Resolution and encoding to use instead of an RGB PNG at dpi.
+        figure (bool): Whether the box contains a figure, which the profile may render sharper.
+    """
+    if profile is not None:
+        dpi = profile.figure_dpi if figure else profile.text_dpi
+    img = render_bbox(page, bbox, dpi, renderer, trim=profile is not None and profile.trim)
+    if img is None:
+        return
 
+    # Save the image
+    if profile is not None and profile.gray_levels:
+        img = compact_image(img, figure, profile.gray_levels)
+    image_format = profile.format if profile is not None else "PNG"
+    options = dict(profile.save_options) if profile is not None else {}
+    img.save(save_path, **options, **resolution_options(image_format, dpi))
+    logger.debug("Saved question image to %s", save_path)
 
 
 if __name__ == "__main__":
+    configure_logging()
     input_folder = "olyexams"
     output_folder = "output_images"
-    image_mapping = process_all_exams_for_image(input_folder, output_folder)
-
-results = validate_question_images("D:\Downloads\discord bot\output_images")
-
-# Generate detailed report
-generate_validation_report(results)
+    # Same image stage as Database.py, on its own; imported here since exam_extractor imports this module
+    from exam_extractor import find_exams, run_exam_jobs
+    jobs = find_exams(input_folder)
+    for job in jobs:
+        job.text = False
+    for result in run_exam_jobs(jobs, output_folder):
+        logger.info("Saved %d question images for %s", len(result.images), result.job.file_name)
+
+    results = validate_question_images(output_folder)
+
+    # Generate detailed report
+    generate_validation_report(results)
 
 
@@ -2,7 +2,12 @@ import pytesseract
 from PIL import Image
 import re
 import os
-from ExamImages import save_individual_question_images_with_ids
+import logging
+from ExamImages import resolution_options, save_individual_question_images_with_ids, save_options
+from image_trim import image_dpi
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
 
 def validate_and_adjust_image_crop(image_path, expected_question_num):
     """
@@ -28,7 +33,7 @@ def validate_and_adjust_image_crop(image_path, expected_question_num):
         next_question_pattern = r"(?<!\d)" + str(expected_question_num + 1) + r"\."
         
         if re.search(next_question_pattern, text):
-            print(f"Found next question {expected_question_num + 1} in image {image_path}")
+            logger.debug("Found next question %d in image %s", expected_question_num + 1, image_path)
             
             # Create slices of the image to find where the next question starts
             num_slices = 10
@@ -44,17 +49,18 @@ def validate_and_adjust_image_crop(image_path, expected_question_num):
                     # Found the slice containing the next question
                     adjustment_y = slice_y - 20  # Add 20px padding
                     
-                    # Crop and save the adjusted image
+                    # Crop and save the adjusted image, keeping its format, lossless encoding and resolution
                     adjusted_img = img.crop((0, 0, width, adjustment_y))
-                    adjusted_img.save(image_path)
+                    adjusted_img.save(image_path, format=img.format, **save_options(img.format),
+                                      **resolution_options(img.format, image_dpi(img)))
                     
-                    print(f"Adjusted image {image_path} to remove question {expected_question_num + 1}")
+                    logger.info("Adjusted image %s to remove question %d", image_path, expected_question_num + 1)
                     return True, adjustment_y
         
         return False, None
         
     except Exception as e:
-        print(f"Error processing image {image_path}: {str(e)}")
+        logger.warning("Error processing image %s: %s", image_path, e)
         return False, None
 
 def batch_validate_and_adjust_images(folder_path):
@@ -74,7 +80,7 @@ def batch_validate_and_adjust_images(folder_path):
     }
     
     for filename in os.listdir(folder_path):
-        if not filename.endswith('.png'):
+        if not filename.endswith(('.png', '.webp')):
             continue
             
         try:
@@ -89,7 +95,7 @@ def batch_validate_and_adjust_images(folder_path):
                 stats['adjustments_made'] += 1
                 
         except Exception as e:
-            print(f"Error processing {filename}: {str(e)}")
+            logger.warning("Error processing %s: %s", filename, e)
             stats['errors'] += 1
             continue
     
@@ -110,7 +116,7 @@ def integrate_ocr_validation(save_individual_question_images_with_ids):
                 question_num = int(question_id[-2:])
                 validate_and_adjust_image_crop(image_path, question_num)
             except Exception as e:
-                print(f"Error validating {question_id}: {str(e)}")
+                logger.warning("Error validating %s: %s", question_id, e)
                 continue
         
         return question_images
@@ -119,6 +125,7 @@ def integrate_ocr_validation(save_individual_question_images_with_ids):
 
 # Example usage:
 if __name__ == "__main__":
+    configure_logging()
     # Wrap the original save function with OCR validation
     save_with_validation = integrate_ocr_validation(save_individual_question_images_with_ids)
     
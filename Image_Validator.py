@@ -32,7 +32,7 @@ def validate_question_images(image_folder):
     MIN_TEXT_LENGTH = 25  # Minimum characters expected in a complete question
     
     for filename in os.listdir(image_folder):
-        if not filename.endswith('.png'):
+        if not filename.endswith(('.png', '.webp')):
             continue
             
         filepath = os.path.join(image_folder, filename)
@@ -1,19 +1,34 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ui import View, Button
 import asyncio
 import os
 import json
+import logging
 import random
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 import datetime
 import csv
+import time
+import tracemalloc
 from discord import ui
 from discord.interactions import Interaction
-from topic_organizer import TopicOrganizer
-from topic_organizer import TopicOrganizer, USNCOTopic
+from topic_organizer import USNCOTopic
+from question_models import topic_for_question
+from embed_cache import EmbedCache
+from question_index import QuestionFilter, QuestionIndex, normalize_id_prefix
+from question_search import SearchIndex
+from question_similarity import SimilarityIndex
+from question_difficulty import DIFFICULTY_BUCKETS, DifficultyModel
+from event_journal import EVENT_ANSWER, EVENT_BUZZ, EVENT_REPORT, EVENT_SERVE, EVENT_TIMEOUT, EventJournal
+from question_blocklist import QuestionBlocklist
+from question_api import QuestionAPI
+import memory_debug
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class Question:
@@ -49,6 +64,16 @@ class Question:
         return cls(**cleaned_data)
     
 
+@dataclass
+class QuestionBank:
+    """A loaded question bank and the lookup structures built from it."""
+    questions: List[Question]
+    embed_cache: EmbedCache
+    question_index: QuestionIndex
+    search_index: SearchIndex
+    similarity_index: SimilarityIndex
+
+
 class HelpPage(discord.ui.View):
     def __init__(self, embeds: list[discord.Embed]):
         super().__init__(timeout=180)  # 3 minute timeout
@@ -130,6 +155,16 @@ class ReportModal(ui.Modal, title="Report Question Error"):
             }
             
             await self.log_report(report_data)
+            interaction.client.journal.log(
+                EVENT_REPORT, self.question, getattr(self.parent_view, 'topic', None), interaction.user.id
+            )
+
+            # Take the question out of rotation once enough users (or an admin) report it
+            permissions = getattr(interaction.user, 'guild_permissions', None)
+            blocklist = interaction.client.blocklist
+            if blocklist.report(self.question.question_id, interaction.user.id, bool(permissions and permissions.administrator)):
+                logger.info("Question %s blocked after reports", self.question.question_id)
+            await asyncio.to_thread(blocklist.save, blocklist.snapshot())
             
             # Stop the timer if it's running
             if hasattr(self.parent_view, 'timer_task') and self.parent_view.timer_task:
@@ -169,7 +204,11 @@ class ReportModal(ui.Modal, title="Report Question Error"):
             
             # Add new question button
             bot = interaction.client
-            new_question_view = NewQuestionView(bot, self.topic)
+            new_question_view = NewQuestionView(
+                bot,
+                getattr(self.parent_view, 'topic', None),
+                getattr(self.parent_view, 'filters', None)
+            )
             for item in new_question_view.children:
                 combined_view.add_item(item)
             
@@ -183,7 +222,7 @@ class ReportModal(ui.Modal, title="Report Question Error"):
             )
             
         except Exception as e:
-            print(f"Error in report submission: {str(e)}")
+            logger.exception("Error in report submission")
             await interaction.followup.send(
                 f"An error occurred while processing your report: {str(e)}",
                 ephemeral=True
@@ -214,12 +253,39 @@ class ReportButton(ui.Button):
         modal = ReportModal(self.question, self.parent_view)  # Use parent_view here
         await interaction.response.send_modal(modal)
 
+class SimilarQuestionButton(ui.Button):
+    def __init__(self, question: Question):
+        super().__init__(
+            label="More like this",
+            style=discord.ButtonStyle.secondary,
+            custom_id="more_like_this"
+        )
+        self.question = question
+
+    async def callback(self, interaction: Interaction):
+        await interaction.response.defer()
+
+        bot = interaction.client
+        quiz_cog = bot.get_cog('QuizCommands')
+        # Neighbours are precomputed when the question bank loads; reported questions are skipped
+        similar = [
+            question for question in bot.similarity_index.similar_to(self.question)
+            if not bot.blocklist.is_blocked(question.question_id)
+        ]
+        if not quiz_cog or not similar:
+            await interaction.followup.send("❌ No similar questions available.", ephemeral=True)
+            return
+
+        question = random.choice(similar)
+        await quiz_cog.send_question(interaction, question, topic_for_question(question))
+
 # Update the NewQuestionView to include the report button
 class NewQuestionView(View):
-    def __init__(self, bot: commands.Bot, topic: Optional[USNCOTopic]):
+    def __init__(self, bot: commands.Bot, topic: Optional[USNCOTopic], filters: Optional[QuestionFilter] = None):
         super().__init__()
         self.bot = bot
         self.topic = topic  # Store the topic
+        self.filters = filters or QuestionFilter(topic=topic or USNCOTopic.RANDOM)
         self.add_new_question_button()
     
     def add_new_question_button(self):
@@ -250,38 +316,15 @@ class NewQuestionView(View):
             await interaction.followup.send("❌ Failed to load quiz commands.", ephemeral=True)
             return
         
-        # Use the stored topic if set, otherwise random
+        # Use the stored topic and filters if set, otherwise random
         topic = self.topic or USNCOTopic.RANDOM
-        questions = quiz_cog.bot.topic_organizer.get_questions_by_topic(topic)
+        question = quiz_cog.bot.pick_question(self.filters)
         
-        if not questions:
+        if not question:
             await interaction.followup.send(f"No questions available for topic: {topic.value}", ephemeral=True)
             return
         
-        question = random.choice(questions)
-        embed = quiz_cog._create_question_embed(question, topic)
-        view = BuzzView(question, topic)  # Pass the topic
-        
-        if question.image_path:
-            file = discord.File(
-                question.image_path,
-                filename=os.path.basename(question.image_path)
-            )
-            message = await interaction.followup.send(
-                embed=embed,
-                file=file,
-                view=view,
-                wait=True
-            )
-        else:
-            message = await interaction.followup.send(
-                embed=embed,
-                view=view,
-                wait=True
-            )
-        
-        view.message = message
-        view.timer_task = asyncio.create_task(view.start_timer())
+        await quiz_cog.send_question(interaction, question, topic, self.filters)
             
 class TimedView(View):
     def __init__(self, timeout=120):
@@ -291,6 +334,7 @@ class TimedView(View):
         self.remaining_time = timeout
         self.timer_running = True
         self.update_interval = 1  # Default update interval in seconds
+        self.started_at = time.monotonic()  # For buzz/answer latency in the journal
         
     
     async def start_timer(self):
@@ -306,7 +350,7 @@ class TimedView(View):
             if self.timer_running:  # If we reached 0 naturally
                 await self.handle_timeout()
         except Exception as e:
-            print(f"Timer error: {e}")
+            logger.exception("Timer error")
 
     def update_timer_field(self, embed: discord.Embed):
         timer_field_index = None
@@ -332,21 +376,34 @@ class TimedView(View):
             embed.add_field(name="Status", value="⏰ Time's up!", inline=False)
 
             bot = self.message._state._get_client()  # Dynamically get bot instance
-            new_question_view = NewQuestionView(bot, self.topic)
+            new_question_view = NewQuestionView(bot, self.topic, self.filters)
             await self.message.edit(embed=embed, view=new_question_view)
 
         self.stop()
 
+    def build_result_view(self, bot, similar: bool = False) -> View:
+        """This view's (disabled) buttons plus a New Question button, and optionally More like this."""
+        new_question_view = NewQuestionView(bot, self.topic, self.filters)
+        combined_view = discord.ui.View()
+        for item in self.children:
+            combined_view.add_item(item)
+        for item in new_question_view.children:
+            combined_view.add_item(item)
+        if similar and bot.similarity_index.available:
+            combined_view.add_item(SimilarQuestionButton(self.question))
+        return combined_view
+
     def stop_timer(self):
         self.timer_running = False
         if self.timer_task:
             self.timer_task.cancel()
 
 class BuzzView(TimedView):
-    def __init__(self, question: Question, topic: Optional[USNCOTopic] = None):
+    def __init__(self, question: Question, topic: Optional[USNCOTopic] = None, filters: Optional[QuestionFilter] = None):
         super().__init__(timeout=120)
         self.question = question
         self.topic = topic
+        self.filters = filters
         self.add_buzz_button()
         self.add_item(ReportButton(question, self))
     
@@ -361,6 +418,10 @@ class BuzzView(TimedView):
     
     async def handle_buzz(self, interaction: discord.Interaction):
         self.stop_timer()
+        interaction.client.journal.log(
+            EVENT_BUZZ, self.question, self.topic, interaction.user.id,
+            latency=time.monotonic() - self.started_at
+        )
         
         embed = interaction.message.embeds[0]
         
@@ -382,14 +443,13 @@ class BuzzView(TimedView):
             embed.add_field(name=f"Option {option}", value=text, inline=False)
         
         # Create answer view with topic
-        answer_view = QuestionView(self.question, self.topic, timeout=5)
+        answer_view = QuestionView(self.question, self.topic, timeout=5, filters=self.filters)
         answer_view.message = interaction.message
         answer_view.remaining_time = 5
         answer_view.update_interval = 1
         
         await interaction.response.edit_message(embed=embed, view=answer_view)
         answer_view.timer_task = asyncio.create_task(answer_view.start_timer())
-        print(f"NewQuestionView instantiated with topic: {self.current_topic}")
         
     
     async def handle_timeout(self):
@@ -416,25 +476,18 @@ class BuzzView(TimedView):
                         item.style = discord.ButtonStyle.success
 
             bot = self.message._state._get_client()
-            # Pass the topic here
-            new_question_view = NewQuestionView(bot, self.topic)  # This was missing self.topic
-            
-            combined_view = discord.ui.View()
-            for item in self.children:
-                combined_view.add_item(item)
-            for item in new_question_view.children:
-                combined_view.add_item(item)
-            
-            await self.message.edit(embed=embed, view=combined_view)
+            bot.journal.log(EVENT_TIMEOUT, self.question, self.topic, latency=time.monotonic() - self.started_at)
+            await self.message.edit(embed=embed, view=self.build_result_view(bot))
 
         self.stop()
 
 
 class QuestionView(TimedView):
-    def __init__(self, question: Question, topic: Optional[USNCOTopic] = None, timeout=120):
+    def __init__(self, question: Question, topic: Optional[USNCOTopic] = None, timeout=120, filters: Optional[QuestionFilter] = None):
         super().__init__(timeout=timeout)
         self.question = question
         self.topic = topic
+        self.filters = filters
         self.answer_selected = False
         self._create_buttons()
         self.add_item(ReportButton(question, self))
@@ -457,6 +510,11 @@ class QuestionView(TimedView):
         self.stop_timer()
         correct_answer = self.question.correct_answer
         is_correct = selected_option == correct_answer
+        interaction.client.difficulty.record_answer(self.question, interaction.user.id, is_correct)
+        interaction.client.journal.log(
+            EVENT_ANSWER, self.question, self.topic, interaction.user.id,
+            option=selected_option, correct=is_correct, latency=time.monotonic() - self.started_at
+        )
         
         # Update button colors
         for child in self.children:
@@ -474,15 +532,7 @@ class QuestionView(TimedView):
         embed.add_field(name="Verdict", value=verdict, inline=True)
         
         # Add new question button
-        bot = interaction.client
-        new_question_view = NewQuestionView(bot, self.topic)
-        
-        combined_view = discord.ui.View()
-        for item in self.children:
-            combined_view.add_item(item)
-        for item in new_question_view.children:
-            combined_view.add_item(item)
-        
+        combined_view = self.build_result_view(interaction.client, similar=True)
         await interaction.response.edit_message(embed=embed, view=combined_view)
 
     async def handle_timeout(self):
@@ -503,18 +553,10 @@ class QuestionView(TimedView):
                 inline=False
             )
 
-            # Add new question button
-            bot = self.message._state._get_client()
-            new_question_view = NewQuestionView(bot, self.topic)
-            
             # Combine the disabled answer buttons with the new question button
-            combined_view = discord.ui.View()
-            for item in self.children:
-                combined_view.add_item(item)
-            for item in new_question_view.children:
-                combined_view.add_item(item)
-            
-            await self.message.edit(embed=embed, view=combined_view)
+            bot = self.message._state._get_client()
+            bot.journal.log(EVENT_TIMEOUT, self.question, self.topic, latency=time.monotonic() - self.started_at)
+            await self.message.edit(embed=embed, view=self.build_result_view(bot))
 
         self.stop()
 
@@ -523,43 +565,144 @@ class USNCOQuizBot(commands.Bot):
         intents = discord.Intents.all()
         super().__init__(command_prefix='!', intents=intents)
         self.questions: List[Question] = []
-        self.topic_organizer = None  # Will be initialized in setup_hook
+        self.embed_cache = EmbedCache()
+        self.question_index = QuestionIndex([])
+        self.search_index = SearchIndex([])
+        self.similarity_index = SimilarityIndex([])
+        self.difficulty: Optional[DifficultyModel] = None
+        self.journal = EventJournal("journal")
+        self.blocklist = QuestionBlocklist("reports/blocklist.json")
+        self.question_api: Optional[QuestionAPI] = None
         
     async def setup_hook(self):
-        print(f"Current working directory: {os.getcwd()}")  # Debug: Print current directory
-        self.questions = self._load_questions("final_questions")
-        print(f"Loaded {len(self.questions)} questions")  # Debug: Print number of questions loaded
-        self.topic_organizer = TopicOrganizer("final_questions")  # Initialize the topic organizer
-        print(f"Loaded {len(self.questions)} questions")
+        logger.debug("Current working directory: %s", os.getcwd())
+        self.load_question_bank("final_questions")
+        logger.info("Loaded %d questions", len(self.questions))
+        self.save_ratings.start()
+        self.journal.start()
+
+        # Optional HTTP API for the companion web practice page
+        api_port = os.getenv('QUESTION_API_PORT')
+        if api_port:
+            self.question_api = QuestionAPI(self, os.getenv('QUESTION_API_HOST', '127.0.0.1'), int(api_port))
+            if self.question_api.available:
+                try:
+                    self.question_api.start()
+                except Exception as e:
+                    logger.error("Question API could not start on %s:%s (%s); question API disabled",
+                                 self.question_api.host, self.question_api.port, e)
+                    self.question_api = None
+            else:
+                logger.warning("QUESTION_API_PORT is set but aiohttp is not installed; question API disabled")
         await self.tree.sync()
+
+    def load_question_bank(self, folder: str = "final_questions") -> None:
+        """(Re)load the question bank and rebuild everything derived from it."""
+        self.install_question_bank(self.build_question_bank(folder))
+
+    async def reload_question_bank(self, folder: str = "final_questions") -> None:
+        """Like load_question_bank, but builds the indexes in a worker thread so the event loop keeps running."""
+        bank = await asyncio.to_thread(self.build_question_bank, folder)
+        self.install_question_bank(bank)
+
+    def build_question_bank(self, folder: str) -> QuestionBank:
+        """Load the questions and build their indexes. Touches no bot state, so it can run in any thread."""
+        questions = self._load_questions(folder)
+        embed_cache = EmbedCache()
+        embed_cache.build(questions)
+        return QuestionBank(questions, embed_cache, QuestionIndex(questions), SearchIndex(questions),
+                            SimilarityIndex(questions))
+
+    def install_question_bank(self, bank: QuestionBank) -> None:
+        """Swap in a built question bank. Runs on the event loop, between interactions."""
+        self.questions = bank.questions
+        self.embed_cache = bank.embed_cache
+        self.question_index = bank.question_index
+        self.search_index = bank.search_index
+        self.similarity_index = bank.similarity_index
+        # Built here rather than in the worker (about 10 ms) so no answer lands in the old model after its save
+        if self.difficulty and self.difficulty.pending_updates:
+            self.difficulty.save()  # Keep ratings recorded since the last batch
+        self.difficulty = DifficultyModel(self.questions)
+        self.blocklist.bind(self.question_index.position)
+
+    def pick_question(self, filters: QuestionFilter) -> Optional[Question]:
+        """Pick a random question matching every filter, or None if none do."""
+        # Blocked questions are skipped by drawing again, which is O(1) while
+        # few are blocked; if the selection is mostly blocked fall back to
+        # subtracting the blocklist bitset
+        for _ in range(8):
+            question = self._draw_question(filters)
+            if question is None or not self.blocklist.is_blocked(question.question_id):
+                return question
+        within = self.difficulty.bucket_masks[filters.difficulty] if filters.difficulty else None
+        return self.question_index.sample(filters, within=within, exclude=self.blocklist.mask)
+
+    def _draw_question(self, filters: QuestionFilter) -> Optional[Question]:
+        if filters.difficulty:
+            if filters == QuestionFilter(difficulty=filters.difficulty):
+                return self.difficulty.sample(filters.difficulty)
+            return self.question_index.sample(filters, within=self.difficulty.bucket_masks[filters.difficulty])
+        return self.question_index.sample(filters)
+
+    @tasks.loop(seconds=60)
+    async def save_ratings(self):
+        # Ratings are updated in memory per answer and written out in batches
+        if self.difficulty and self.difficulty.pending_updates:
+            await asyncio.to_thread(self.difficulty.save, self.difficulty.snapshot())
+
+    async def close(self):
+        if self.difficulty and self.difficulty.pending_updates:
+            self.difficulty.save()
+        await asyncio.to_thread(self.journal.close)
+        if self.question_api:
+            self.question_api.stop()
+        await super().close()
         
     def _load_questions(self, folder: str) -> List[Question]:
+        """
+        Load every question in a folder of JSON arrays (the default build) or
+        JSON Lines files (Database.py --stream). When an exam has both
+        <exam>.json and <exam>.jsonl, the one written last is loaded.
+        """
         questions = []
         try:
-            print(f"Attempting to load questions from folder: {folder}")  # Debug: Print folder path
             files = os.listdir(folder)
-            print(f"Found {len(files)} files in folder")  # Debug: Print number of files found
-            
-            for file in files:
-                if file.endswith(".json"):
-                    file_path = os.path.join(folder, file)
-                    print(f"Processing file: {file_path}")  # Debug: Print each file being processed
-                    try:
-                        with open(file_path, "r", encoding='utf-8') as f:
+            logger.debug("Found %d files in %s", len(files), folder)
+
+            exam_files = {}
+            for file in sorted(files):
+                base_name, extension = os.path.splitext(file)
+                if extension not in (".json", ".jsonl"):
+                    continue
+                previous = exam_files.get(base_name)
+                if previous is None or os.path.getmtime(os.path.join(folder, file)) > os.path.getmtime(os.path.join(folder, previous)):
+                    exam_files[base_name] = file
+                if previous is not None:
+                    logger.info("Both %s.json and %s.jsonl exist in %s; loading the newer %s",
+                                base_name, base_name, folder, exam_files[base_name])
+
+            for file in exam_files.values():
+                file_path = os.path.join(folder, file)
+                try:
+                    with open(file_path, "r", encoding='utf-8') as f:
+                        if file.endswith(".jsonl"):
+                            questions_data = [json.loads(line) for line in f if line.strip()]
+                        else:
                             questions_data = json.load(f)
-                            print(f"Found {len(questions_data)} questions in {file}")  # Debug: Print questions found in file
-                            for q in questions_data:
-                                try:
-                                    question = Question.from_json(q)
-                                    questions.append(question)
-                                except Exception as e:
-                                    print(f"Error parsing question in {file}: {e}")
-                    except Exception as e:
-                        print(f"Error reading file {file}: {e}")
+                        logger.debug("Found %d questions in %s", len(questions_data), file)
+                        for q in questions_data:
+                            try:
+                                question = Question.from_json(q)
+                                questions.append(question)
+                            except Exception as e:
+                                logger.warning("Error parsing question in %s: %s", file, e)
+                except Exception as e:
+                    logger.warning("Error reading file %s: %s", file, e)
         except Exception as e:
-            print(f"Error accessing folder {folder}: {e}")
+            logger.error("Error accessing folder %s: %s", folder, e)
         
-        print(f"Total questions loaded: {len(questions)}")  # Debug: Print final count
+        logger.debug("Total questions loaded: %d", len(questions))
         return questions
     async def on_ready(self):
         activity = discord.Activity(
@@ -567,12 +710,14 @@ class USNCOQuizBot(commands.Bot):
             name='/help'
         )
         await self.change_presence(activity=activity)
-        print(f"{self.user} is ready! Loaded {len(self.questions)} questions.")
+        logger.info("%s is ready! Loaded %d questions.", self.user, len(self.questions))
 
 class QuizCommands(commands.Cog):
     def __init__(self, bot: USNCOQuizBot):
         self.bot = bot
-        self.topic_organizer = TopicOrganizer("final_questions")  # Initialize with your questions folder
+        self.help_embeds = self.create_help_embeds()  # Static pages, built once
+        self.memory_snapshot: Optional[tracemalloc.Snapshot] = None
+        self.started_tracing = False  # tracemalloc was started by /debug memory, not PYTHONTRACEMALLOC
 
     @app_commands.command(name="ping", description="Check bot's latency")
     async def ping(self, interaction: discord.Interaction):
@@ -580,29 +725,98 @@ class QuizCommands(commands.Cog):
         await interaction.response.send_message(f"Pong! 🏓\nLatency: `{latency}ms`")
 
     @app_commands.command(name="question", description="Get a USNCO practice question by topic")
-    @app_commands.choices(topic=[
-        app_commands.Choice(name=topic.value, value=topic.name)
-        for topic in USNCOTopic
-    ])
+    @app_commands.describe(
+        question_id="Serve a specific question by its ID, eg. 1201820",
+        exam_type="Only questions from local or national exams",
+        year_min="Only questions from this year onwards",
+        year_max="Only questions up to this year",
+        has_image="Only questions with (or without) an image",
+        difficulty="Only questions rated easy, medium or hard by past answers"
+    )
+    @app_commands.rename(question_id="id")
+    @app_commands.choices(
+        topic=[
+            app_commands.Choice(name=topic.value, value=topic.name)
+            for topic in USNCOTopic
+        ],
+        exam_type=[
+            app_commands.Choice(name="Local", value="local"),
+            app_commands.Choice(name="National", value="national")
+        ],
+        difficulty=[
+            app_commands.Choice(name=bucket.capitalize(), value=bucket)
+            for bucket in DIFFICULTY_BUCKETS
+        ]
+    )
     async def question(
         self, 
         interaction: discord.Interaction, 
-        topic: str = "RANDOM"
+        topic: str = "RANDOM",
+        question_id: Optional[str] = None,
+        exam_type: Optional[str] = None,
+        year_min: Optional[int] = None,
+        year_max: Optional[int] = None,
+        has_image: Optional[bool] = None,
+        difficulty: Optional[str] = None
     ):
-        await interaction.response.defer()
-        
+        if question_id:
+            question = self.bot.question_index.get(question_id)
+            if not question:
+                await interaction.response.send_message(
+                    f"No question found with ID `{question_id}`.",
+                    ephemeral=True
+                )
+                return
+            await interaction.response.defer()
+            await self.send_question(interaction, question, topic_for_question(question))
+            return
+
         selected_topic = USNCOTopic[topic] if topic in USNCOTopic.__members__ else USNCOTopic.RANDOM
-        questions = self.bot.topic_organizer.get_questions_by_topic(selected_topic)
+        filters = QuestionFilter(
+            topic=selected_topic,
+            exam_type=exam_type,
+            year_min=year_min,
+            year_max=year_max,
+            has_image=has_image,
+            difficulty=difficulty
+        )
+        question = self.bot.pick_question(filters)
         
-        if not questions:
-            await interaction.followup.send(
-                f"No questions available for topic: {selected_topic.value}"
+        # Checked before deferring so an empty selection gets a plain ephemeral reply
+        if not question:
+            await interaction.response.send_message(
+                f"No questions available for topic: {selected_topic.value} with those filters.",
+                ephemeral=True
             )
             return
 
-        question = random.choice(questions)
-        embed = self._create_question_embed(question, selected_topic)
-        view = BuzzView(question, selected_topic)  # Pass the topic here
+        await interaction.response.defer()
+        await self.send_question(interaction, question, selected_topic, filters)
+
+    @question.autocomplete('question_id')
+    async def question_id_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        prefix = normalize_id_prefix(current)
+        choices = []
+        for qid in self.bot.question_index.ids_with_prefix(prefix):
+            question = self.bot.question_index.by_id[qid]
+            label = f"{qid} · {question.exam_type} {question.exam_year} Q{question.number} · {question.text}"
+            choices.append(app_commands.Choice(name=label[:100], value=qid))
+        return choices
+
+    async def send_question(
+        self,
+        interaction: discord.Interaction,
+        question: Question,
+        topic: USNCOTopic,
+        filters: Optional[QuestionFilter] = None
+    ):
+        """Send a question with its BUZZ view as a followup to a deferred interaction."""
+        embed = self._create_question_embed(question, topic)
+        view = BuzzView(question, topic, filters)  # Pass the topic here
         
         if question.image_path:
             if not os.path.exists(question.image_path):
@@ -628,25 +842,10 @@ class QuizCommands(commands.Cog):
         
         view.message = message
         view.timer_task = asyncio.create_task(view.start_timer())
+        self.bot.journal.log(EVENT_SERVE, question, topic, interaction.user.id)
     
     def _create_question_embed(self, question: Question, topic: USNCOTopic) -> discord.Embed:
-        embed = discord.Embed(
-            title=f"Question ID: `{question.question_id or 'Unknown'}`",
-            description=(
-                f"**Topic:** `{topic.value}`\n"
-                f"**Exam Type:** `{question.exam_type}`\n"
-                f"**Year:** `{question.exam_year}`\n"
-                f"**Question Number:** `{question.number}`\n\n"
-                f"{question.text}"
-            )
-        )
-
-        if question.image_path:
-            embed.set_image(url=f"attachment://{os.path.basename(question.image_path)}")
-        
-        embed.add_field(name="Time Remaining", value="2:00", inline=True)
-        
-        return embed
+        return self.bot.embed_cache.get(question, topic)
     
     def create_help_embeds(self) -> list[discord.Embed]:
         embeds = []
@@ -748,28 +947,184 @@ class QuizCommands(commands.Cog):
     @app_commands.command(name="help", description="Learn how to use the USNCO Bot")
     async def help(self, interaction: discord.Interaction):
         await interaction.response.defer()
-        embeds = self.create_help_embeds()
+        view = HelpPage(self.help_embeds)
+        await interaction.followup.send(embed=self.help_embeds[0], view=view)
+
+    @app_commands.command(name="search", description="Search USNCO questions by their text and answer choices")
+    @app_commands.describe(terms="Words or formulas to look for, eg. enthalpy, NaCl, half-life")
+    async def search(self, interaction: discord.Interaction, terms: str):
+        results = self.bot.search_index.search(terms)
+        if not results:
+            await interaction.response.send_message(
+                f"No questions found for `{terms}`.",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer()
+        embeds = self.create_search_embeds(terms, results)
         view = HelpPage(embeds)
         await interaction.followup.send(embed=embeds[0], view=view)
-        
-    def _create_question_embed(self, question: Question, topic: USNCOTopic) -> discord.Embed:
-        embed = discord.Embed(
-            title=f"Question ID: `{question.question_id or 'Unknown'}`",
-            description=(
-                f"**Topic:** `{topic.value}`\n"
-                f"**Exam Type:** `{question.exam_type}`\n"
-                f"**Year:** `{question.exam_year}`\n"
-                f"**Question Number:** `{question.number}`\n\n"
-                f"{question.text}"
+
+    def create_search_embeds(self, terms: str, results: list, per_page: int = 5) -> list[discord.Embed]:
+        embeds = []
+        pages = [results[i:i + per_page] for i in range(0, len(results), per_page)]
+
+        for page_number, page in enumerate(pages):
+            embed = discord.Embed(
+                title=f"Search results for \"{terms}\"",
+                description=f"{len(results)} matching questions",
+                color=discord.Color.blue()
             )
+            for rank, (question, _) in enumerate(page, start=page_number * per_page + 1):
+                snippet = question.text if len(question.text) <= 200 else question.text[:197] + "..."
+                embed.add_field(
+                    name=f"{rank}. `{question.question_id or 'Unknown'}` · {question.exam_type} {question.exam_year} Q{question.number}",
+                    value=snippet or "*No question text*",
+                    inline=False
+                )
+            embed.set_footer(text="Use /question id:<question_id> to practice a result")
+            embeds.append(embed)
+
+        return embeds
+
+    blocklist_group = app_commands.Group(
+        name="blocklist",
+        description="Manage reported questions taken out of rotation",
+        default_permissions=discord.Permissions(administrator=True)
+    )
+
+    @blocklist_group.command(name="add", description="Take a question out of rotation")
+    @app_commands.rename(question_id="id")
+    async def blocklist_add(self, interaction: discord.Interaction, question_id: str):
+        self.bot.blocklist.block(question_id.strip())
+        await asyncio.to_thread(self.bot.blocklist.save, self.bot.blocklist.snapshot())
+        await interaction.response.send_message(f"Question `{question_id}` is now blocked.", ephemeral=True)
+
+    @blocklist_group.command(name="remove", description="Put a question back in rotation and clear its reports")
+    @app_commands.rename(question_id="id")
+    async def blocklist_remove(self, interaction: discord.Interaction, question_id: str):
+        self.bot.blocklist.unblock(question_id.strip())
+        await asyncio.to_thread(self.bot.blocklist.save, self.bot.blocklist.snapshot())
+        await interaction.response.send_message(f"Question `{question_id}` is back in rotation.", ephemeral=True)
+
+    @blocklist_group.command(name="list", description="Show blocked questions")
+    async def blocklist_list(self, interaction: discord.Interaction):
+        blocklist = self.bot.blocklist
+        if not blocklist.blocked:
+            await interaction.response.send_message("No questions are blocked.", ephemeral=True)
+            return
+        lines = [
+            f"`{qid}` ({len(blocklist.reporters.get(qid, ()))} reports)"
+            for qid in sorted(blocklist.blocked)
+        ]
+        await interaction.response.send_message("\n".join(lines)[:2000], ephemeral=True)
+
+    debug_group = app_commands.Group(
+        name="debug",
+        description="Bot diagnostics",
+        default_permissions=discord.Permissions(administrator=True)
+    )
+
+    @debug_group.command(name="memory", description="Report memory use, live views and cache sizes")
+    @app_commands.describe(action="report: current state, snapshot: start tracing and save a baseline, "
+                                  "diff: compare with the baseline and stop tracing, stop: stop tracing")
+    @app_commands.choices(action=[
+        app_commands.Choice(name="report", value="report"),
+        app_commands.Choice(name="snapshot", value="snapshot"),
+        app_commands.Choice(name="diff", value="diff"),
+        app_commands.Choice(name="stop", value="stop")
+    ])
+    async def debug_memory(self, interaction: discord.Interaction, action: str = "report"):
+        await interaction.response.defer(ephemeral=True)
+
+        if action == "stop":
+            stopped = self.stop_tracing()
+            await interaction.followup.send(
+                "Stopped tracemalloc and dropped the baseline." if stopped else "tracemalloc was not started by /debug memory.",
+                ephemeral=True
+            )
+            return
+
+        was_tracing = memory_debug.ensure_tracing() if action == "snapshot" else tracemalloc.is_tracing()
+        self.started_tracing = self.started_tracing or not was_tracing
+        # tracemalloc slows every allocation, so it only runs from a snapshot until its diff (or stop)
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        embed = discord.Embed(title="Memory Report", color=discord.Color.blue())
+
+        rss = memory_debug.current_rss_mb()
+        peak_rss = memory_debug.peak_rss_mb()
+        embed.description = (
+            (f"RSS: `{rss:.1f} MB`\n" if rss is not None else "")
+            + (f"Peak RSS: `{peak_rss:.1f} MB`\n" if peak_rss is not None else "")
         )
+        if snapshot:
+            current, peak = tracemalloc.get_traced_memory()
+            embed.description += (
+                f"Traced: `{current / 1024 / 1024:.1f} MB` (peak `{peak / 1024 / 1024:.1f} MB`)"
+                + ("" if was_tracing else "\n⚠️ tracemalloc just started; allocations before now are not traced")
+            )
+        else:
+            embed.description += "tracemalloc is off; run /debug memory action:snapshot to trace allocations"
 
-        if question.image_path:
-            embed.set_image(url=f"attachment://{os.path.basename(question.image_path)}")
-        
-        embed.add_field(name="Time Remaining", value="2:00", inline=True)
-        
-        return embed
+        counts = memory_debug.live_object_counts([BuzzView, QuestionView, TimedView, NewQuestionView, discord.File])
+        embed.add_field(
+            name="Live objects",
+            value="\n".join(
+                f"`{name}`: {count['live']}" + (f" ({count['finished']} finished)" if count['finished'] else "")
+                for name, count in counts.items()
+            ),
+            inline=False
+        )
+
+        per_question = memory_debug.average_deep_size(self.bot.questions)
+        caches = memory_debug.cache_sizes(self.bot)
+        embed.add_field(
+            name="Question store",
+            value=(
+                f"~{per_question / 1024:.1f} KiB per question, "
+                f"~{per_question * len(self.bot.questions) / 1024 / 1024:.1f} MB total\n"
+                + "\n".join(f"{name}: {size}" for name, size in caches.items())
+            ),
+            inline=False
+        )
+
+        if action == "diff" and self.memory_snapshot and snapshot:
+            lines = memory_debug.diff_snapshots(self.memory_snapshot, snapshot)
+            embed.add_field(name="Growth since snapshot", value=("\n".join(lines) or "No change")[:1024], inline=False)
+            if self.stop_tracing():
+                embed.set_footer(text="tracemalloc stopped; run /debug memory action:snapshot to start again")
+        else:
+            if snapshot:
+                lines = memory_debug.top_allocators(snapshot)
+                embed.add_field(name="Top allocators", value=("\n".join(lines) or "Nothing traced yet")[:1024], inline=False)
+            if action == "diff":
+                embed.set_footer(text="No baseline yet; run /debug memory action:snapshot first")
+
+        if action == "snapshot":
+            self.memory_snapshot = snapshot
+            embed.set_footer(text="Baseline saved; run /debug memory action:diff later to compare")
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    def stop_tracing(self) -> bool:
+        """Drop the baseline and stop tracemalloc if /debug memory started it. Returns True if it did."""
+        self.memory_snapshot = None
+        if not self.started_tracing:
+            return False
+        tracemalloc.stop()
+        self.started_tracing = False
+        return True
+
+    @app_commands.command(name="reload", description="Reload the question bank from disk")
+    @app_commands.default_permissions(administrator=True)
+    async def reload(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        await self.bot.reload_question_bank("final_questions")
+        await interaction.followup.send(
+            f"Reloaded {len(self.bot.questions)} questions.",
+            ephemeral=True
+        )
 
 async def main():
     bot = USNCOQuizBot()
@@ -785,4 +1140,5 @@ async def main():
         await bot.start(token)
 
 if __name__ == "__main__":
+    configure_logging()
     asyncio.run(main())
\ No newline at end of file
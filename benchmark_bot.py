@@ -0,0 +1,172 @@
+"""
+Microbenchmarks for the bot's hot paths, runnable without a Discord token.
+
+Covers question loading (_load_questions, TopicOrganizer.load_questions),
+topic lookup, question selection, _create_question_embed and construction of
+BuzzView, QuestionView and the combined result views. If the question folder
+does not exist a synthetic bank with the same layout is generated.
+
+Usage:
+    python benchmark_bot.py --save-baseline          record bot_benchmark_baseline.json
+    python benchmark_bot.py --threshold 0.2          compare against it; exits 1 on a regression
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+from typing import Callable, Dict, List
+
+from USNCObot import BuzzView, QuestionView, QuizCommands, USNCOQuizBot
+from question_index import QuestionFilter
+from question_models import USNCOTopic, topic_for_question
+from topic_organizer import TopicOrganizer
+
+DEFAULT_BASELINE = "bot_benchmark_baseline.json"
+
+
+def write_synthetic_bank(folder: str, years=range(2000, 2025), seed: int = 0) -> None:
+    """Write one JSON file per exam with 60 questions each, like final_questions."""
+    rng = random.Random(seed)
+    words = ("mol", "enthalpy", "solution", "rate", "equilibrium", "electron", "bond", "acid",
+             "gas", "pressure", "orbital", "reaction", "entropy", "buffer", "isomer", "oxidation")
+    for year in years:
+        for type_digit, exam_type in (("1", "local"), ("2", "national")):
+            questions = []
+            for number in range(1, 61):
+                question_id = f"{type_digit}{year}{number}"
+                questions.append({
+                    "number": str(number),
+                    "text": " ".join(rng.choice(words) for _ in range(rng.randint(12, 40))) + "?",
+                    "options": {opt: " ".join(rng.choice(words) for _ in range(rng.randint(1, 6))) for opt in "ABCD"},
+                    "correct_answer": rng.choice("ABCD"),
+                    "question_id": question_id,
+                    "image_path": f"output_images/{year}-{exam_type}/{question_id}.png" if rng.random() < 0.3 else None,
+                })
+            path = os.path.join(folder, f"{year}-{exam_type}-olympiad-exam_parsed.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(questions, f)
+
+
+def time_call(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Best and median time per call in microseconds, timeit-style with gc disabled."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    return {"best_us": round(min(runs), 3), "median_us": round(statistics.median(runs), 3), "number": number}
+
+
+async def run_benchmarks(folder: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    # Views need a running event loop, so everything is built inside one
+    bot = USNCOQuizBot()
+    bot.load_question_bank(folder)
+    cog = QuizCommands(bot)
+    rng = random.Random(1)
+    questions = bot.questions
+    sample = [rng.choice(questions) for _ in range(64)]
+    topics = [topic_for_question(q) for q in sample]
+    numbers = list(range(1, 61))
+    organizer = TopicOrganizer(folder)
+    kinetics = QuestionFilter(topic=USNCOTopic.KINETICS)
+    narrow = QuestionFilter(topic=USNCOTopic.KINETICS, exam_type="national", year_min=2010, year_max=2015)
+
+    def cycle(items: List):
+        state = {"i": 0}
+
+        def next_item():
+            state["i"] = (state["i"] + 1) % len(items)
+            return items[state["i"]]
+        return next_item
+
+    next_question = cycle(sample)
+    next_pair = cycle(list(zip(sample, topics)))
+
+    def reload_organizer():
+        organizer.questions_by_topic = {topic: [] for topic in USNCOTopic}
+        organizer.load_questions(folder)
+
+    def result_view(similar: bool):
+        question, topic = next_pair()
+        view = QuestionView(question, topic, filters=QuestionFilter(topic=topic))
+        return view.build_result_view(bot, similar=similar)
+
+    benchmarks = {
+        "load_questions": lambda: bot._load_questions(folder),
+        "topic_organizer.load_questions": reload_organizer,
+        "get_topic_for_number (x60)": lambda: [USNCOTopic.get_topic_for_number(n) for n in numbers],
+        "pick_question (random)": lambda: bot.pick_question(QuestionFilter()),
+        "pick_question (topic)": lambda: bot.pick_question(kinetics),
+        "pick_question (topic+type+years)": lambda: bot.pick_question(narrow),
+        "create_question_embed": lambda: cog._create_question_embed(*next_pair()),
+        "BuzzView()": lambda: BuzzView(next_question(), USNCOTopic.RANDOM),
+        "QuestionView()": lambda: QuestionView(next_question(), USNCOTopic.RANDOM),
+        "result view (handle_response)": lambda: result_view(True),
+        "result view (handle_timeout)": lambda: result_view(False),
+    }
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = time_call(func, repeat)
+        print(f"{name:<36} {results[name]['best_us']:>12.2f} us  (median {results[name]['median_us']:.2f})")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Names of benchmarks whose best time grew by more than `threshold` over the baseline."""
+    regressions = []
+    print(f"\nCompared with baseline (threshold +{threshold:.0%}):")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            print(f"- {name}: no baseline")
+            continue
+        change = result["best_us"] / old["best_us"] - 1
+        flag = "REGRESSION" if change > threshold else "ok"
+        print(f"- {name}: {old['best_us']:.2f} -> {result['best_us']:.2f} us ({change:+.1%}) {flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's hot paths without connecting to Discord.")
+    parser.add_argument("--questions", default="final_questions", help="Question folder (synthetic bank if missing)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging, eg. 0.2 = 20%%")
+    parser.add_argument("--repeat", type=int, default=7, help="Timing rounds per benchmark")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.questions
+        if not os.path.isdir(folder):
+            folder = tmp
+            write_synthetic_bank(folder)
+            print(f"{args.questions} not found; using a synthetic question bank\n")
+        results = asyncio.run(run_benchmarks(folder, args.repeat))
+
+    environment = {"python": platform.python_version(), "platform": platform.platform(), "questions": args.questions}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": environment, "results": results}, f, indent=2)
+        print(f"\nBaseline saved to '{args.baseline}'")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at '{args.baseline}'; run with --save-baseline first")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("environment", {}).get("python") != environment["python"]:
+        print(f"\nNote: baseline was recorded on Python {baseline['environment'].get('python')}")
+    if compare(results, baseline["results"], args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
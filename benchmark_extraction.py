@@ -0,0 +1,254 @@
+"""
+Benchmark of the extraction pipeline over the exam PDFs.
+
+Times each stage separately on every exam: opening the PDF, text blocks and
+question bounding boxes, pdfplumber column text, cleaning and parsing, the
+answer key, rendering question images, PNG encoding and (on a sample of the
+images, if tesseract is installed) the OCR check from Image_Adjustment. The
+report gives the wall time of each stage, pages and questions per second and
+the peak memory of the process. Nothing is written to the output folders.
+
+Usage:
+    python benchmark_extraction.py --save-baseline      record extraction_benchmark_baseline.json
+    python benchmark_extraction.py --threshold 0.2      compare against it; exits 1 on a regression
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from ExamImages import find_question_bboxes, render_bbox
+from exam_extractor import TEXT_BACKENDS, ExamExtractor, ExamJob, find_exams
+from exam_parsing import parse_page_questions
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BASELINE = "extraction_benchmark_baseline.json"
+STAGES = ("open", "bboxes", "text", "parse", "answer_key", "render", "png_encode", "ocr")
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def tesseract_available() -> bool:
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.memory: Dict[str, Optional[float]] = {}
+
+    def add(self, stage: str, start: float) -> None:
+        self.seconds[stage] += time.perf_counter() - start
+        self.memory[stage] = peak_memory_mb()
+
+
+def benchmark_exam(job: ExamJob, timer: StageTimer, ocr_folder: Optional[str], ocr_every: int,
+                   counts: Dict[str, int]) -> List[tuple]:
+    """
+    Run every stage on one exam, adding the times to timer.
+
+    Returns:
+        list: (image path, question number) of the images kept for the OCR stage.
+    """
+    ocr_images = []
+    start = time.perf_counter()
+    extractor = ExamExtractor(job.pdf_path, job.text_backend)
+    # Open the documents now so that opening is timed on its own
+    extractor.document
+    if job.text_backend == "pdfplumber":
+        extractor.plumber
+    timer.add("open", start)
+
+    with extractor:
+        pages = extractor.question_pages()
+        counts["pages"] += len(pages)
+
+        start = time.perf_counter()
+        page_bboxes = {
+            index: find_question_bboxes(extractor.layout(index).blocks, extractor.layout(index).height)
+            for index in pages
+        }
+        timer.add("bboxes", start)
+
+        start = time.perf_counter()
+        column_texts = {index: extractor.column_texts(index) for index in pages}
+        timer.add("text", start)
+
+        start = time.perf_counter()
+        for index in pages:
+            counts["questions"] += len(parse_page_questions(*column_texts[index], extractor.layout(index).number))
+        timer.add("parse", start)
+
+        start = time.perf_counter()
+        extractor.answer_key()
+        timer.add("answer_key", start)
+
+        # Render and encode one image at a time, as the pipeline does, so the
+        # rasters of a whole exam are never held at once
+        for index in pages:
+            page = extractor.document[index]
+            for number, bbox in page_bboxes[index]:
+                start = time.perf_counter()
+                img = render_bbox(page, bbox, renderer=extractor.renderer)
+                timer.add("render", start)
+                if img is None:
+                    continue
+                start = time.perf_counter()
+                png = io.BytesIO()
+                img.save(png, format="PNG")
+                timer.add("png_encode", start)
+                counts["images"] += 1
+                counts["image_bytes"] += png.tell()
+                if ocr_folder is not None and counts["images"] % ocr_every == 0:
+                    path = os.path.join(ocr_folder, f"{job.exam_type}{job.exam_year}{number}.png")
+                    with open(path, "wb") as f:
+                        f.write(png.getvalue())
+                    ocr_images.append((path, int(number)))
+    return ocr_images
+
+
+def run_benchmarks(jobs: List[ExamJob], ocr_sample: int) -> dict:
+    from Image_Adjustment import validate_and_adjust_image_crop
+
+    timer = StageTimer()
+    counts = defaultdict(int)
+    ocr = ocr_sample > 0 and tesseract_available()
+    if ocr_sample > 0 and not ocr:
+        print("tesseract not found; skipping the OCR stage")
+
+    with tempfile.TemporaryDirectory() as ocr_folder:
+        ocr_images = []
+        # Spread the OCR sample over the corpus (about 60 questions per exam)
+        ocr_every = max(1, len(jobs) * 60 // ocr_sample) if ocr else 0
+        for job in jobs:
+            ocr_images.extend(benchmark_exam(job, timer, ocr_folder if ocr else None, ocr_every, counts))
+
+        for path, number in ocr_images[:ocr_sample]:
+            start = time.perf_counter()
+            validate_and_adjust_image_crop(path, number)
+            timer.add("ocr", start)
+            counts["ocr_images"] += 1
+
+    total = sum(timer.seconds.values())
+    pipeline = total - timer.seconds.get("ocr", 0.0)
+    stages = {}
+    for stage in STAGES:
+        if stage not in timer.seconds:
+            continue
+        seconds = timer.seconds[stage]
+        stages[stage] = {"seconds": round(seconds, 3), "peak_memory_mb": timer.memory[stage]}
+    return {
+        "exams": len(jobs),
+        "pages": counts["pages"],
+        "questions": counts["questions"],
+        "images": counts["images"],
+        "image_bytes": counts["image_bytes"],
+        "ocr_images": counts["ocr_images"],
+        "stages": stages,
+        "seconds": round(pipeline, 3),  # Without the OCR sample, which is optional in the pipeline
+        "pages_per_second": round(counts["pages"] / pipeline, 2) if pipeline else None,
+        "questions_per_second": round(counts["questions"] / pipeline, 2) if pipeline else None,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+def print_report(results: dict) -> None:
+    print(f"{results['exams']} exams, {results['pages']} question pages, {results['questions']} questions, "
+          f"{results['images']} images ({results['image_bytes'] / 1e6:.1f} MB as PNG)\n")
+    per_unit = {"text": "pages", "parse": "pages", "bboxes": "pages", "render": "images",
+                "png_encode": "images", "ocr": "ocr_images"}
+    print(f"{'stage':<12} {'seconds':>9} {'share':>7} {'rate':>18} {'peak MB':>9}")
+    for stage, result in results["stages"].items():
+        share = result["seconds"] / results["seconds"] if stage != "ocr" else None
+        unit = per_unit.get(stage, "exams")
+        rate = results[unit] / result["seconds"] if result["seconds"] else 0
+        memory = result["peak_memory_mb"]
+        print(f"{stage:<12} {result['seconds']:>9.2f} {f'{share:.1%}' if share is not None else '':>7} "
+              f"{f'{rate:.1f} {unit}/s':>18} {memory if memory is not None else 'n/a':>9}")
+    print(f"\ntotal {results['seconds']:.2f} s: {results['pages_per_second']} pages/s, "
+          f"{results['questions_per_second']} questions/s, peak memory {results['peak_memory_mb']} MB")
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Names of stages (and totals) that got slower or bigger by more than `threshold` over the baseline."""
+    regressions = []
+    print(f"\nCompared with baseline (threshold +{threshold:.0%}):")
+    checks = [(f"{stage} seconds", result["seconds"], baseline.get("stages", {}).get(stage, {}).get("seconds"))
+              for stage, result in results["stages"].items()]
+    checks.append(("total seconds", results["seconds"], baseline.get("seconds")))
+    checks.append(("peak memory MB", results["peak_memory_mb"], baseline.get("peak_memory_mb")))
+    for name, new, old in checks:
+        if not old or new is None:
+            print(f"- {name}: no baseline")
+            continue
+        change = new / old - 1
+        flag = "REGRESSION" if change > threshold else "ok"
+        print(f"- {name}: {old:.2f} -> {new:.2f} ({change:+.1%}) {flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the extraction pipeline.")
+    parser.add_argument("--input", default="olyexams", help="Folder with the exam PDFs")
+    parser.add_argument("--exams", type=int, help="Only benchmark the first N exams")
+    parser.add_argument("--ocr-sample", type=int, default=30, help="Images to run the OCR check on; 0 skips it")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging, eg. 0.2 = 20%%")
+    parser.add_argument("--text-backend", choices=TEXT_BACKENDS, default="pdfplumber", help="Library to read the column text with")
+    args = parser.parse_args()
+
+    jobs = find_exams(args.input)[:args.exams]
+    for job in jobs:
+        job.text_backend = args.text_backend
+    results = run_benchmarks(jobs, args.ocr_sample)
+    print_report(results)
+
+    environment = {"python": platform.python_version(), "platform": platform.platform(), "input": args.input,
+                   "text_backend": args.text_backend}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": environment, "results": results}, f, indent=2)
+        print(f"\nBaseline saved to '{args.baseline}'")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at '{args.baseline}'; run with --save-baseline first")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["results"].get("exams") != results["exams"]:
+        print(f"\nNote: baseline covers {baseline['results'].get('exams')} exams, this run {results['exams']}")
+    if baseline.get("environment", {}).get("python") != environment["python"]:
+        print(f"\nNote: baseline was recorded on Python {baseline['environment'].get('python')}")
+    if compare(results, baseline["results"], args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
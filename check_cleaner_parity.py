@@ -0,0 +1,69 @@
+"""
+Checks that the compiled text cleaner matches the original one on every exam.
+
+1. Extracts the raw column text of every question page in the input folder
+2. Cleans each column with clean_text_with_removal and with the one-rule-per-pass
+   reference clean_text_multipass, and reports any column where they differ
+3. Times both cleaners over all the columns and reports the speedup
+
+Exits with status 1 if any column differs.
+"""
+
+import argparse
+import difflib
+import sys
+import timeit
+
+from exam_extractor import ExamExtractor, find_exams
+from exam_parsing import clean_text_multipass, clean_text_with_removal, extract_column_texts
+
+
+def collect_column_texts(input_folder):
+    # [(exam file name, page number, raw column text)] for every column of every question page
+    columns = []
+    for job in find_exams(input_folder):
+        with ExamExtractor(job.pdf_path) as extractor:
+            for index in extractor.question_pages():
+                layout = extractor.layout(index)
+                page = extractor.plumber.pages[index]
+                for text in extract_column_texts(page, layout.left_bbox, layout.right_bbox):
+                    columns.append((job.file_name, layout.number, text))
+    return columns
+
+
+def time_cleaner(cleaner, columns, repeat):
+    # Best time in seconds to clean every column once
+    run = lambda: [cleaner(text, page_number) for _, page_number, text in columns]
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled text cleaner with the original on all exams.")
+    parser.add_argument("--input", default="olyexams", help="Folder with the exam PDFs")
+    parser.add_argument("--repeat", type=int, default=7, help="Timing runs per cleaner; the best is reported")
+    parser.add_argument("--show", type=int, default=5, help="Number of differing columns to print")
+    args = parser.parse_args()
+
+    columns = collect_column_texts(args.input)
+    mismatches = 0
+    for file_name, page_number, text in columns:
+        expected = clean_text_multipass(text, page_number)
+        actual = clean_text_with_removal(text, page_number)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= args.show:
+                print(f"{file_name} page {page_number}:")
+                print("\n".join(difflib.unified_diff(expected.splitlines(), actual.splitlines(), lineterm="")))
+
+    exams = len({file_name for file_name, _, _ in columns})
+    print(f"{len(columns)} columns from {exams} exams, {mismatches} differ")
+
+    multipass = time_cleaner(clean_text_multipass, columns, args.repeat)
+    compiled = time_cleaner(clean_text_with_removal, columns, args.repeat)
+    print(f"multipass: {multipass * 1000:.1f} ms, compiled: {compiled * 1000:.1f} ms, "
+          f"speedup: {multipass / compiled:.2f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Checks that a question bank nobody has answered yet fills every difficulty bucket.
+
+Builds a DifficultyModel over the bank with no saved ratings and prints
+how many questions land in easy, medium and hard, and how each bucket
+splits by exam type. Exits with status 1 if any bucket is empty, which
+would make the /question difficulty filter return nothing.
+
+Usage:
+    python check_difficulty_buckets.py --questions final_questions
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from collections import Counter
+
+from benchmark_bot import write_synthetic_bank
+from question_difficulty import DIFFICULTY_BUCKETS, DifficultyModel
+from question_models import Question
+
+
+def load_bank(folder):
+    questions = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".json"):
+            with open(os.path.join(folder, name), encoding="utf-8") as f:
+                questions.extend(Question.from_json(q) for q in json.load(f))
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a fresh question bank fills every difficulty bucket.")
+    parser.add_argument("--questions", default="final_questions", help="Question folder (synthetic bank if missing)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.questions
+        if not os.path.isdir(folder):
+            folder = tmp
+            write_synthetic_bank(folder)
+            print(f"{args.questions} not found; using a synthetic question bank")
+        questions = load_bank(folder)
+        # No saved ratings: every question starts cold
+        model = DifficultyModel(questions, ratings_path=os.path.join(tmp, "no_ratings.json"))
+
+    empty = []
+    for bucket in DIFFICULTY_BUCKETS:
+        members = model.buckets[bucket]
+        by_type = Counter(questions[i].exam_type for i in members)
+        print(f"{bucket:<7} {len(members):>5} questions  " + ", ".join(f"{t}: {n}" for t, n in sorted(by_type.items())))
+        if not members:
+            empty.append(bucket)
+    if empty:
+        print(f"Empty buckets: {', '.join(empty)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
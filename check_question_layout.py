@@ -0,0 +1,128 @@
+"""
+Compares coordinate-based question segmentation with the regex pipeline.
+
+1. Runs both on every question page of every exam, timing each: the regex
+   pipeline as text blocks, find_question_bboxes, column text and parsing;
+   the layout as question_layout.segment_page, which gives text and boxes
+   in one pass
+2. Checks the question numbers each finds against the exam's answer key
+3. Pairs the questions by exam and number and counts those whose text and
+   options are identical, and the overlap (IoU) of the two image boxes
+
+Options:
+    --text-backend  library the regex pipeline reads the column text with
+    --report PATH   also write every differing question to a JSON file
+    --show N        number of differing questions to print
+"""
+
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+
+from ExamImages import find_question_bboxes
+from check_text_backend_parity import question_diffs
+from exam_extractor import TEXT_BACKENDS, ExamExtractor, find_exams
+from exam_parsing import parse_page_questions
+from question_layout import segment_page
+
+
+def iou(a, b) -> float:
+    """Intersection over union of two (x0, y0, x1, y1) boxes."""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    overlap = width * height
+    return overlap / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - overlap)
+
+
+def regex_page(extractor, index, seconds):
+    # (questions, {number: bbox}) of a page from the regex pipeline
+    start = time.perf_counter()
+    layout = extractor.layout(index)
+    bboxes = {}
+    for number, rect in find_question_bboxes(layout.blocks, layout.height):
+        bboxes.setdefault(number, (max(rect.x0, 0), max(rect.y0, 0), min(rect.x1, layout.width), min(rect.y1, layout.height)))
+    questions = parse_page_questions(*extractor.column_texts(index), layout.number)
+    seconds["regex"] += time.perf_counter() - start
+    return questions, bboxes
+
+
+def layout_page(extractor, index, seconds):
+    # (questions, {number: bbox}) of a page from question_layout
+    start = time.perf_counter()
+    segmentation = segment_page(extractor.document[index], index + 1)
+    questions = [q for q in (region.as_question() for region in segmentation.questions) if q is not None]
+    seconds["layout"] += time.perf_counter() - start
+    return questions, dict(segmentation.image_bboxes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare coordinate-based question segmentation with the regex pipeline.")
+    parser.add_argument("--input", default="olyexams", help="Folder with the exam PDFs")
+    parser.add_argument("--exams", type=int, help="Only compare the first N exams")
+    parser.add_argument("--text-backend", choices=TEXT_BACKENDS, default="pdfplumber", help="Library the regex pipeline reads the column text with")
+    parser.add_argument("--show", type=int, default=5, help="Number of differing questions to print")
+    parser.add_argument("--report", help="Write every difference to this JSON file")
+    args = parser.parse_args()
+
+    counts = Counter()
+    seconds = Counter()
+    overlaps = []
+    report = []
+    for job in find_exams(args.input)[:args.exams]:
+        found = {"regex": {}, "layout": {}}
+        bboxes = {"regex": {}, "layout": {}}
+        with ExamExtractor(job.pdf_path, args.text_backend) as extractor:
+            for index in extractor.question_pages():
+                for name, read_page in (("regex", regex_page), ("layout", layout_page)):
+                    questions, page_bboxes = read_page(extractor, index, seconds)
+                    for question in questions:
+                        found[name].setdefault(question["number"], question)
+                        counts[f"{name} duplicates"] += found[name][question["number"]] is not question
+                    for number, bbox in page_bboxes.items():
+                        bboxes[name].setdefault(number, bbox)
+            answer_key = {str(number) for number in extractor.answer_key()}
+        counts["exams"] += 1
+        counts["answer key"] += len(answer_key)
+
+        for name, questions in found.items():
+            counts[f"{name} in key"] += len(answer_key & questions.keys())
+            counts[f"{name} not in key"] += len(questions.keys() - answer_key)
+            missed = sorted(answer_key - questions.keys(), key=int)
+            if missed:
+                report.append({"file": job.file_name, "missed_by": name, "numbers": missed})
+
+        for number in sorted(found["regex"].keys() & found["layout"].keys(), key=int):
+            diffs = question_diffs(found["regex"][number], found["layout"][number])
+            if not diffs:
+                counts["identical"] += 1
+                continue
+            counts["different"] += 1
+            report.append({"file": job.file_name, "number": number, "diffs": diffs})
+            if counts["different"] <= args.show:
+                print(f"{job.file_name} question {number}:")
+                for field, diff in diffs.items():
+                    print(f"  {field}:\n" + "\n".join("    " + line for line in diff.splitlines()[2:]))
+        overlaps += [iou(bboxes["regex"][n], bboxes["layout"][n]) for n in bboxes["regex"].keys() & bboxes["layout"].keys()]
+
+    print(f"\n{counts['exams']} exams, {counts['answer key']} questions in the answer keys")
+    for name in ("regex", "layout"):
+        print(f"{name}: {counts[f'{name} in key']} found, {counts[f'{name} not in key']} not in the key, "
+              f"{counts[f'{name} duplicates']} duplicates")
+    print(f"found by both: {counts['identical']} identical, {counts['different']} different")
+    if overlaps:
+        print(f"image boxes: {len(overlaps)} paired, IoU median {statistics.median(overlaps):.2f}, "
+              f"{sum(v >= 0.9 for v in overlaps)} at 0.9 or more")
+    print(f"time: regex ({args.text_backend} text) {seconds['regex']:.2f} s, layout {seconds['layout']:.2f} s")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"counts": dict(counts), "seconds": dict(seconds), "differences": report}, f, indent=4)
+        print(f"Report written to '{args.report}'")
+
+
+if __name__ == "__main__":
+    main()
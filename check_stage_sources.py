@@ -0,0 +1,127 @@
+"""
+Checks that incremental_build.STAGE_SOURCES covers the code each stage runs.
+
+1. Copies the sources to a scratch folder, edits each one in turn and checks
+   that stage_versions changes for exactly the stages in EXPECTED_STAGES
+2. Runs the text, image and enrich stages on one exam under sys.setprofile
+   and checks that every repository file whose functions were called is in
+   that stage's sources, so a change to it cannot leave outputs marked up
+   to date (the OCR stage needs tesseract and is left out)
+
+Exits with status 1 on any mismatch.
+
+Usage:
+    python check_stage_sources.py --exam 2018-usnco-national-exam-part-i.pdf
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from exam_extractor import enrich_questions, find_exams, run_exam_jobs
+from incremental_build import STAGE_SOURCES, stage_versions
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Stages that editing each source file has to invalidate
+EXPECTED_STAGES = {
+    "exam_extractor.py": {"text", "images", "enrich"},
+    "parallel_extraction.py": {"text", "images"},
+    "exam_parsing.py": {"text"},
+    "Regex_Patterns.py": {"text"},
+    "pymupdf_text.py": {"text"},
+    "ExamImages.py": {"images"},
+    "image_trim.py": {"images"},
+    "Image_Adjustment.py": {"ocr"},
+}
+
+
+def edited_stages(failures):
+    listed = {source for sources in STAGE_SOURCES.values() for source in sources}
+    for source in sorted(listed - EXPECTED_STAGES.keys()):
+        failures.append(f"{source} is in STAGE_SOURCES but not in EXPECTED_STAGES")
+    with tempfile.TemporaryDirectory() as tmp:
+        for source in EXPECTED_STAGES:
+            shutil.copy(os.path.join(ROOT, source), tmp)
+        before = stage_versions(tmp)
+        for source, expected in EXPECTED_STAGES.items():
+            path = os.path.join(tmp, source)
+            shutil.copy(os.path.join(ROOT, source), path)
+            with open(path, "a") as f:
+                f.write("\n# edited\n")
+            after = stage_versions(tmp)
+            shutil.copy(os.path.join(ROOT, source), path)
+            changed = {stage for stage in before if before[stage] != after[stage]}
+            status = "ok" if changed == expected else "MISMATCH"
+            print(f"editing {source:<24} invalidates {', '.join(sorted(changed)) or 'nothing':<24} {status}")
+            if changed != expected:
+                failures.append(f"editing {source} invalidates {sorted(changed)}, expected {sorted(expected)}")
+
+
+def traced_files(run):
+    """Repository files with a function called while run() runs."""
+    files = set()
+
+    def profile(frame, event, arg):
+        if event == "call":
+            files.add(frame.f_code.co_filename)
+
+    sys.setprofile(profile)
+    try:
+        run()
+    finally:
+        sys.setprofile(None)
+    return {
+        os.path.basename(path) for path in files
+        if os.path.isfile(path) and os.path.dirname(os.path.abspath(path)) == ROOT
+        and os.path.abspath(path) != os.path.abspath(__file__)
+    }
+
+
+def traced_stages(job, failures):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+
+        def text():
+            job.text, job.images = True, False
+            results["text"] = next(run_exam_jobs([job], tmp))
+
+        def images():
+            job.text, job.images = False, True
+            results["images"] = next(run_exam_jobs([job], tmp))
+
+        def enrich():
+            enrich_questions(results["text"].questions, results["images"].images, job.exam_type, job.exam_year)
+
+        for stage, run in (("text", text), ("images", images), ("enrich", enrich)):
+            files = traced_files(run)
+            missing = files - set(STAGE_SOURCES[stage])
+            print(f"{stage:<7} runs {', '.join(sorted(files))}" + (f"; not in its sources: {', '.join(sorted(missing))}" if missing else ""))
+            if missing:
+                failures.append(f"the {stage} stage runs {sorted(missing)}, which are not in its sources")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that STAGE_SOURCES covers the code each build stage runs.")
+    parser.add_argument("--input", default="olyexams", help="Folder with the exam PDFs")
+    parser.add_argument("--exam", help="Exam file to trace the stages on (the first one by default)")
+    args = parser.parse_args()
+
+    failures = []
+    edited_stages(failures)
+    jobs = [job for job in find_exams(args.input) if args.exam in (None, job.file_name)]
+    if jobs:
+        traced_stages(jobs[0], failures)
+    else:
+        print(f"No exam to trace in {args.input}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares the questions parsed from pymupdf text with those from pdfplumber text.
+
+1. Reads every question page of every exam with both text backends, timing each
+2. Parses and cleans both the same way and pairs the questions by exam and number
+3. Reports questions found by only one backend and, for the rest, a diff of the
+   question text and each option that differs; the answer keys are compared too
+
+Options:
+    --report PATH   also write every differing question to a JSON file
+    --show N        number of differing questions to print
+
+Exits with status 1 if any question or answer differs, so the pipeline can
+switch to --text-backend pymupdf once this passes.
+"""
+
+import argparse
+import difflib
+import json
+import sys
+import time
+from collections import Counter
+
+from exam_extractor import TEXT_BACKENDS, ExamExtractor, find_exams
+from exam_parsing import parse_page_questions
+
+
+def read_exam(pdf_path, text_backend, seconds):
+    # ({question number: question}, answer key) of an exam, adding the text reading time to seconds
+    questions = {}
+    with ExamExtractor(pdf_path, text_backend) as extractor:
+        for index in extractor.question_pages():
+            extractor.layout(index)  # Shared by both backends, so not timed
+            start = time.perf_counter()
+            column_texts = extractor.column_texts(index)
+            seconds[text_backend] += time.perf_counter() - start
+            for question in parse_page_questions(*column_texts, index + 1):
+                questions.setdefault(question["number"], question)
+        start = time.perf_counter()
+        answer_key = extractor.answer_key()
+        seconds[text_backend] += time.perf_counter() - start
+    return questions, answer_key
+
+
+def question_diffs(expected, actual):
+    # {field: unified diff} of the question text and options that differ
+    diffs = {}
+    fields = [("text", expected["text"], actual["text"])]
+    fields += [(f"option {key}", value, actual["options"].get(key)) for key, value in expected["options"].items()]
+    for field, old, new in fields:
+        if old != new:
+            diffs[field] = "\n".join(difflib.unified_diff(
+                (old or "").split(), (new or "").split(), "pdfplumber", "pymupdf", n=2, lineterm=""
+            ))
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare questions parsed from the pymupdf and pdfplumber text backends.")
+    parser.add_argument("--input", default="olyexams", help="Folder with the exam PDFs")
+    parser.add_argument("--exams", type=int, help="Only compare the first N exams")
+    parser.add_argument("--show", type=int, default=5, help="Number of differing questions to print")
+    parser.add_argument("--report", help="Write every difference to this JSON file")
+    args = parser.parse_args()
+
+    counts = Counter()
+    seconds = Counter()
+    report = []
+    for job in find_exams(args.input)[:args.exams]:
+        expected, expected_key = read_exam(job.pdf_path, "pdfplumber", seconds)
+        actual, actual_key = read_exam(job.pdf_path, "pymupdf", seconds)
+
+        for number in sorted(expected.keys() | actual.keys(), key=int):
+            if number not in actual or number not in expected:
+                side = "pdfplumber" if number in expected else "pymupdf"
+                counts[f"only in {side}"] += 1
+                report.append({"file": job.file_name, "number": number, "only_in": side})
+                continue
+            diffs = question_diffs(expected[number], actual[number])
+            if not diffs:
+                counts["identical"] += 1
+                continue
+            counts["different"] += 1
+            report.append({"file": job.file_name, "number": number, "diffs": diffs})
+            if counts["different"] <= args.show:
+                print(f"{job.file_name} question {number}:")
+                for field, diff in diffs.items():
+                    print(f"  {field}:\n" + "\n".join("    " + line for line in diff.splitlines()[2:]))
+
+        wrong_answers = sorted(n for n in expected_key.keys() | actual_key.keys() if expected_key.get(n) != actual_key.get(n))
+        if wrong_answers:
+            counts["answer key differences"] += len(wrong_answers)
+            report.append({"file": job.file_name, "answer_key": wrong_answers})
+        counts["exams"] += 1
+
+    total = counts["identical"] + counts["different"]
+    print(f"\n{counts['exams']} exams, {total} questions found by both backends: "
+          f"{counts['identical']} identical, {counts['different']} different")
+    print(f"only in pdfplumber: {counts['only in pdfplumber']}, only in pymupdf: {counts['only in pymupdf']}, "
+          f"answer key differences: {counts['answer key differences']}")
+    print("text time: " + ", ".join(f"{backend} {seconds[backend]:.2f} s" for backend in TEXT_BACKENDS)
+          + (f", speedup {seconds['pdfplumber'] / seconds['pymupdf']:.1f}x" if seconds["pymupdf"] else ""))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"counts": dict(counts), "seconds": dict(seconds), "differences": report}, f, indent=4)
+        print(f"Report written to '{args.report}'")
+    return 1 if report else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
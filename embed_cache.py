@@ -0,0 +1,73 @@
+import os
+from typing import Dict, Iterable, Tuple
+
+import discord
+
+from question_models import Question, USNCOTopic, topic_for_question
+
+
+def build_question_embed(question: Question, topic: USNCOTopic) -> discord.Embed:
+    embed = discord.Embed(
+        title=f"Question ID: `{question.question_id or 'Unknown'}`",
+        description=(
+            f"**Topic:** `{topic.value}`\n"
+            f"**Exam Type:** `{question.exam_type}`\n"
+            f"**Year:** `{question.exam_year}`\n"
+            f"**Question Number:** `{question.number}`\n\n"
+            f"{question.text}"
+        )
+    )
+
+    if question.image_path:
+        embed.set_image(url=f"attachment://{os.path.basename(question.image_path)}")
+
+    embed.add_field(name="Time Remaining", value="2:00", inline=True)
+
+    return embed
+
+
+class EmbedCache:
+    """
+    Precomputed question embed payloads keyed by (question_id, topic).
+
+    Payloads are stored as plain dicts and never handed out directly; every
+    call to get() returns a fresh discord.Embed so callers can add fields
+    without touching the cached template.
+    """
+
+    def __init__(self):
+        self._payloads: Dict[Tuple[str, USNCOTopic], dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def clear(self) -> None:
+        self._payloads.clear()
+
+    def build(self, questions: Iterable[Question]) -> None:
+        """Rebuild the cache for a freshly loaded question bank."""
+        self.clear()
+        for question in questions:
+            if not question.question_id:
+                continue
+            own_topic = topic_for_question(question)
+            for topic in {own_topic, USNCOTopic.RANDOM}:
+                self._payloads[(question.question_id, topic)] = build_question_embed(question, topic).to_dict()
+
+    def get(self, question: Question, topic: USNCOTopic) -> discord.Embed:
+        """Return a copy of the cached embed, rendering and caching it on a miss."""
+        key = (question.question_id, topic)
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = build_question_embed(question, topic).to_dict()
+            if question.question_id:
+                self._payloads[key] = payload
+        return self._clone(payload)
+
+    @staticmethod
+    def _clone(payload: dict) -> discord.Embed:
+        # Embed.from_dict keeps references to the nested dicts, so only the
+        # field list (the one part views append to) needs copying
+        data = dict(payload)
+        data['fields'] = [dict(field) for field in payload.get('fields', ())]
+        return discord.Embed.from_dict(data)
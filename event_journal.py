@@ -0,0 +1,205 @@
+"""
+Append-only binary journal of bot interactions.
+
+Every record is a little-endian u32 body length followed by the body, so a
+reader can always skip records it does not understand and a torn write at
+the end of a segment is detected and ignored. The current body is a fixed
+28-byte struct (see RECORD_BODY) which lets journal_analytics.py load whole
+segments with a single numpy.frombuffer.
+
+Records are packed on the event loop and handed to a writer thread through
+a queue; the thread appends them in batches and rotates to a new segment
+file once the current one reaches max_bytes.
+"""
+
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from question_models import Question, USNCOTopic
+
+EVENT_SERVE = 1
+EVENT_BUZZ = 2
+EVENT_ANSWER = 3
+EVENT_TIMEOUT = 4
+EVENT_REPORT = 5
+
+EVENT_NAMES = {
+    EVENT_SERVE: "serve",
+    EVENT_BUZZ: "buzz",
+    EVENT_ANSWER: "answer",
+    EVENT_TIMEOUT: "timeout",
+    EVENT_REPORT: "report",
+}
+
+TOPICS = list(USNCOTopic)
+
+FLAG_CORRECT = 1
+
+# event, topic, option (0 = none, 1-4 = A-D), flags, timestamp, user id, question id, latency (ms)
+RECORD_BODY = struct.Struct("<BBBBdQII")
+LENGTH_PREFIX = struct.Struct("<I")
+RECORD_SIZE = LENGTH_PREFIX.size + RECORD_BODY.size
+
+SEGMENT_PREFIX = "events-"
+COMPACTED_PREFIX = "compacted-"
+SEGMENT_SUFFIX = ".bin"
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def pack_record(event: int, question: Optional[Question] = None, topic: Optional[USNCOTopic] = None,
+                user_id: int = 0, option: Optional[str] = None, correct: bool = False,
+                latency: float = 0.0, timestamp: Optional[float] = None) -> bytes:
+    question_id = question.question_id if question else None
+    body = RECORD_BODY.pack(
+        event,
+        TOPICS.index(topic) if topic else 0,
+        "ABCD".index(option) + 1 if option in ("A", "B", "C", "D") else 0,
+        FLAG_CORRECT if correct else 0,
+        time.time() if timestamp is None else timestamp,
+        int(user_id or 0),
+        int(question_id) if question_id and question_id.isdigit() else 0,
+        max(0, min(int(latency * 1000), 0xFFFFFFFF)),
+    )
+    return LENGTH_PREFIX.pack(len(body)) + body
+
+
+def iter_record_bodies(data: bytes) -> Iterator[bytes]:
+    """Walk length-prefixed records, yielding bodies and stopping at a torn tail."""
+    offset = 0
+    while offset + LENGTH_PREFIX.size <= len(data):
+        (length,) = LENGTH_PREFIX.unpack_from(data, offset)
+        start = offset + LENGTH_PREFIX.size
+        if start + length > len(data):
+            break
+        yield data[start:start + length]
+        offset = start + length
+
+
+def list_segments(directory: str) -> List[str]:
+    """Journal files in write order: compacted history first, then live segments."""
+    if not os.path.isdir(directory):
+        return []
+    names = [
+        name for name in os.listdir(directory)
+        if name.endswith(SEGMENT_SUFFIX) and name.startswith((COMPACTED_PREFIX, SEGMENT_PREFIX))
+    ]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+class EventJournal:
+    def __init__(self, directory: str = "journal", max_bytes: int = 64 * 1024 * 1024, flush_interval: float = 0.5):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._sequence = 0
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="event-journal", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Flush everything queued so far and stop the writer thread, waiting at
+        most `timeout` seconds. Blocks, so the bot calls it through asyncio.to_thread.
+        """
+        if not self._thread:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Journal writer did not finish within %.0f s; the last records may be lost", timeout)
+        self._thread = None
+
+    def log(self, event: int, question: Optional[Question] = None, topic: Optional[USNCOTopic] = None,
+            user_id: int = 0, option: Optional[str] = None, correct: bool = False, latency: float = 0.0) -> None:
+        """Queue one record. Never blocks and never touches the disk."""
+        # Read once: close() may clear it from another thread in between
+        thread = self._thread
+        if not thread:
+            return
+        if not thread.is_alive():
+            # The writer died (eg. the disk filled up); queueing more would only grow memory
+            logger.error("Journal writer thread has stopped; no more events are recorded")
+            self._thread = None
+            self._queue = queue.SimpleQueue()
+            return
+        self._queue.put(pack_record(event, question, topic, user_id, option, correct, latency))
+
+    def _open_segment(self) -> None:
+        if self._file:
+            self._file.close()
+        self._sequence += 1
+        name = f"{SEGMENT_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{self._sequence:04d}{SEGMENT_SUFFIX}"
+        self._file = open(os.path.join(self.directory, name), "ab")
+
+    def _run(self) -> None:
+        self._open_segment()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            time.sleep(self.flush_interval)  # Let a batch build up before writing
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [record for record in batch if record is not _STOP]
+            stopping = len(records) != len(batch)
+            if records:
+                self._file.write(b"".join(records))
+                self._file.flush()
+                if self._file.tell() >= self.max_bytes:
+                    self._open_segment()
+        self._file.close()
+        self._file = None
+
+
+def compact_journal(directory: str = "journal", keep_latest: int = 1) -> Optional[str]:
+    """
+    Merge closed segments into one compacted file, dropping torn records.
+
+    The newest `keep_latest` segments are left alone since the running bot
+    may still be appending to them. Returns the compacted file's path.
+    """
+    segments = [path for path in list_segments(directory) if os.path.basename(path).startswith(SEGMENT_PREFIX)]
+    closed = segments[:-keep_latest] if keep_latest else segments
+    compacted = [path for path in list_segments(directory) if os.path.basename(path).startswith(COMPACTED_PREFIX)]
+    sources = compacted + closed
+    if len(sources) < 2:
+        return None
+
+    def span(path):
+        # "events-<stamp>.bin" or "compacted-<first stamp>--<last stamp>.bin"
+        return os.path.basename(path)[:-len(SEGMENT_SUFFIX)].split("-", 1)[1].split("--")
+
+    first = span(sources[0])[0]
+    last = span(sources[-1])[-1]
+    output = os.path.join(directory, f"{COMPACTED_PREFIX}{first}--{last}{SEGMENT_SUFFIX}")
+    tmp_path = output + ".tmp"
+
+    with open(tmp_path, "wb") as out:
+        for path in sources:
+            with open(path, "rb") as f:
+                for body in iter_record_bodies(f.read()):
+                    out.write(LENGTH_PREFIX.pack(len(body)) + body)
+
+    os.replace(tmp_path, output)
+    for path in sources:
+        if path != output:
+            os.remove(path)
+    return output
@@ -0,0 +1,423 @@
+"""
+Single-pass extraction of an exam PDF into questions, answers and images.
+
+The PDF is read from disk once. pdfplumber (question text) and pymupdf (text
+blocks and rendering) are opened lazily on those same bytes, and each page's
+layout is computed once and shared by the text and image steps. A page's
+questions and its images therefore come from the same pass over the same
+question pages, and questions that only one side found are logged.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pdfplumber
+import pymupdf
+
+import pymupdf_text
+from ExamImages import IMAGE_PROFILES, PageRenderer, save_page_question_images
+from exam_parsing import (
+    associate_questions_with_answers, extract_column_texts, parse_answer_key, parse_page_questions
+)
+from parallel_extraction import list_exam_pdfs, run_tasks, split_pages
+
+logger = logging.getLogger(__name__)
+
+# Libraries the question text can be read with; pdfplumber is the reference
+TEXT_BACKENDS = ("pdfplumber", "pymupdf")
+
+
+@dataclass
+class PageLayout:
+    index: int  # 0-based page index
+    number: int  # 1-based page number, as used by the footer patterns
+    width: float
+    height: float
+    column_split: float  # x-coordinate between the left and right columns
+    blocks: list  # pymupdf text blocks: (x0, y0, x1, y1, text, block_no, block_type)
+
+    @property
+    def left_bbox(self) -> Tuple[float, float, float, float]:
+        return (0, 0, self.column_split, self.height)
+
+    @property
+    def right_bbox(self) -> Tuple[float, float, float, float]:
+        return (self.column_split, 0, self.width, self.height)
+
+
+def exam_info(file_name: str) -> Optional[Tuple[int, int]]:
+    """(exam type digit, year) from an exam file name, or None if it cannot be told."""
+    lower = file_name.lower()
+    exam_type = 1 if "local" in lower else 2 if "national" in lower else 0
+    year = re.search(r"\d{4}", file_name)
+    if not exam_type or not year:
+        return None
+    return exam_type, int(year.group())
+
+
+class ExamExtractor:
+    def __init__(self, pdf_path: str, text_backend: str = "pdfplumber", render_cache: Optional[str] = None,
+                 image_profile: str = "original"):
+        if text_backend not in TEXT_BACKENDS:
+            raise ValueError(f"Unknown text backend {text_backend!r}, expected one of {TEXT_BACKENDS}")
+        if image_profile not in IMAGE_PROFILES:
+            raise ValueError(f"Unknown image profile {image_profile!r}, expected one of {tuple(IMAGE_PROFILES)}")
+        self.pdf_path = pdf_path
+        self.text_backend = text_backend
+        self.image_profile = image_profile
+        with open(pdf_path, "rb") as f:
+            self._data = f.read()
+        self._document = None
+        self._plumber = None
+        self._layouts: Dict[int, PageLayout] = {}
+        self._render_cache = render_cache
+        self._renderer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        if self._document is not None:
+            self._document.close()
+        if self._plumber is not None:
+            self._plumber.close()
+        self._document = self._plumber = None
+        self._layouts.clear()
+        if self._renderer is not None:
+            self._renderer.release()
+
+    def release_page(self, index: int) -> None:
+        """
+        Drop what reading a page cached: its layout, its render and pdfplumber's
+        chars and layout objects, which otherwise stay on the page until close().
+        """
+        self._layouts.pop(index, None)
+        if self._renderer is not None:
+            self._renderer.release()
+        if self._plumber is not None:
+            self._plumber.pages[index].close()
+
+    @property
+    def document(self):
+        if self._document is None:
+            self._document = pymupdf.open(stream=self._data, filetype="pdf")
+        return self._document
+
+    @property
+    def renderer(self) -> PageRenderer:
+        """Renders each page once for all of its question images."""
+        if self._renderer is None:
+            pdf_digest = hashlib.sha256(self._data).hexdigest() if self._render_cache else None
+            self._renderer = PageRenderer(pdf_digest, self._render_cache)
+        return self._renderer
+
+    @property
+    def plumber(self):
+        if self._plumber is None:
+            self._plumber = pdfplumber.open(io.BytesIO(self._data))
+        return self._plumber
+
+    def __len__(self) -> int:
+        return len(self.document)
+
+    def question_pages(self, page_range: Optional[Tuple[int, int]] = None) -> range:
+        """Indices of the question pages: everything but the two cover pages and the answer key."""
+        start, stop = page_range or (2, len(self) - 1)
+        return range(max(start, 2), min(stop, len(self) - 1))
+
+    def layout(self, index: int) -> PageLayout:
+        layout = self._layouts.get(index)
+        if layout is None:
+            page = self.document[index]
+            width, height = page.rect.width, page.rect.height
+            layout = self._layouts[index] = PageLayout(
+                index=index,
+                number=index + 1,
+                width=width,
+                height=height,
+                column_split=width / 2,
+                blocks=page.get_text("blocks"),
+            )
+        return layout
+
+    def column_texts(self, index: int) -> Tuple[str, str]:
+        """Raw text of the left and right columns of a page, read with the text backend."""
+        layout = self.layout(index)
+        if self.text_backend == "pymupdf":
+            return pymupdf_text.extract_column_texts(self.document[index], layout.left_bbox, layout.right_bbox)
+        return extract_column_texts(self.plumber.pages[index], layout.left_bbox, layout.right_bbox)
+
+    def page_questions(self, index: int) -> List[dict]:
+        return parse_page_questions(*self.column_texts(index), self.layout(index).number)
+
+    def page_images(self, index: int, output_folder: str, exam_type: int, exam_year: int) -> Dict[str, str]:
+        layout = self.layout(index)
+        return save_page_question_images(self.document[index], layout.blocks, output_folder, exam_type, exam_year,
+                                         self.renderer, self.image_profile)
+
+    def answer_key(self) -> Dict[int, str]:
+        if self.text_backend == "pymupdf":
+            return parse_answer_key(pymupdf_text.page_text(self.document[-1]))
+        return parse_answer_key(self.plumber.pages[-1].extract_text())
+
+    def questions(self, page_range=None, error_log: Optional[list] = None) -> List[dict]:
+        """Parsed questions of the question pages, without answers."""
+        questions = []
+        for index in self.question_pages(page_range):
+            try:
+                questions.extend(self.page_questions(index))
+            except Exception as e:
+                if error_log is None:
+                    raise
+                error_log.append({'page': index + 1, 'error': str(e)})
+        return questions
+
+    def extract(self, image_folder: Optional[str], exam_type: int, exam_year: int, page_range=None,
+                error_log: Optional[list] = None, text: bool = True) -> Tuple[List[dict], Dict[str, str]]:
+        """
+        Questions and question images in one pass over the question pages.
+
+        Args:
+            image_folder (str): Folder to save the question images in, or None to skip images.
+            exam_type (int): 1 for local, 2 for national.
+            exam_year (int): Year of the exam.
+            page_range (tuple): Optional (start, stop) 0-based page indices.
+            error_log (list): Page errors are appended here instead of raised.
+            text (bool): Whether to parse the question text.
+        Returns:
+            tuple: (parsed questions without answers, {question ID: image path}).
+        """
+        questions = []
+        images = {}
+        text_only = []
+        image_only = []
+        for index in self.question_pages(page_range):
+            page_questions = []
+            if text:
+                try:
+                    page_questions = self.page_questions(index)
+                except Exception as e:
+                    if error_log is None:
+                        raise
+                    error_log.append({'page': index + 1, 'error': str(e)})
+            page_images = {}
+            if image_folder is not None:
+                page_images = self.page_images(index, image_folder, exam_type, exam_year)
+
+            if text and image_folder is not None:
+                text_ids = {f"{exam_type}{exam_year}{q['number']}" for q in page_questions}
+                text_only.extend(sorted(text_ids - page_images.keys()))
+                image_only.extend(sorted(page_images.keys() - text_ids))
+
+            questions.extend(page_questions)
+            images.update(page_images)
+
+        if text_only or image_only:
+            logger.warning("%s: %d questions parsed without an image, %d images without parsed text",
+                           self.pdf_path, len(text_only), len(image_only))
+            logger.debug("Text only: %s; image only: %s", text_only, image_only)
+        return questions, images
+
+
+@dataclass
+class ExamJob:
+    """One exam to extract, and which of its stages to run."""
+    file_name: str
+    pdf_path: str
+    exam_type: int
+    exam_year: int
+    text: bool = True
+    images: bool = True
+    text_backend: str = "pdfplumber"
+    render_cache: Optional[str] = None  # Folder to keep rendered pages in between runs
+    image_profile: str = "original"  # Key of ExamImages.IMAGE_PROFILES
+
+    @property
+    def base_name(self) -> str:
+        return os.path.splitext(self.file_name)[0]
+
+    @property
+    def output_name(self) -> str:
+        return f"{self.base_name}_parsed.json"
+
+
+@dataclass
+class ExamResult:
+    job: ExamJob
+    questions: Optional[List[dict]]  # With answers; None if the text stage did not run
+    images: Optional[Dict[str, str]]  # None if the image stage did not run
+    errors: List[dict]
+
+
+def find_exams(input_folder: str) -> List[ExamJob]:
+    jobs = []
+    for file_name in list_exam_pdfs(input_folder):
+        info = exam_info(file_name)
+        if info is None:
+            logger.warning("Skipping file %s: unable to determine exam type or year", file_name)
+            continue
+        jobs.append(ExamJob(file_name, os.path.join(input_folder, file_name), *info))
+    return jobs
+
+
+def select_exams(jobs: List[ExamJob], years: Optional[List[int]] = None,
+                 exam_type: Optional[str] = None) -> List[ExamJob]:
+    """The jobs of the given years and exam type ("local" or "national"); None matches every exam."""
+    type_digit = {"local": 1, "national": 2}.get(exam_type) if exam_type else None
+    return [
+        job for job in jobs
+        if (not years or job.exam_year in years) and (type_digit is None or job.exam_type == type_digit)
+    ]
+
+
+def enrich_questions(questions: List[dict], images: Dict[str, str], exam_type: int, exam_year: int) -> List[dict]:
+    """Copies of the questions with question_id and image_path set where an image exists."""
+    enriched = []
+    for question in questions:
+        question = dict(question)
+        question_id = f"{exam_type}{exam_year}{question.get('number', '0')}"
+        if question_id in images:
+            question["question_id"] = question_id
+            question["image_path"] = images[question_id]
+        enriched.append(question)
+    return enriched
+
+
+def move_part_images(images: Dict[str, str], part_folder: str, exam_folder: str) -> Dict[str, str]:
+    """Move images rendered into a page range's scratch folder into the exam's folder."""
+    moved = {}
+    for question_id, image_path in images.items():
+        final_path = os.path.join(exam_folder, os.path.basename(image_path))
+        if os.path.exists(image_path):  # Nothing is written for an invalid bounding box
+            os.replace(image_path, final_path)
+        moved[question_id] = final_path
+    shutil.rmtree(part_folder, ignore_errors=True)
+    return moved
+
+
+def extract_exam_part(task):
+    """
+    Worker for run_exam_jobs: one exam, or one page range of it.
+
+    Args:
+        task (tuple): (pdf_path, image_folder or None, exam_type, exam_year, page_range, text,
+            with_answer_key, text_backend, render_cache, image_profile).
+    Returns:
+        tuple: (questions, images, answer key or None, page errors).
+    """
+    (pdf_path, image_folder, exam_type, exam_year, page_range, text, with_answer_key, text_backend, render_cache,
+     image_profile) = task
+    if image_folder is not None:
+        os.makedirs(image_folder, exist_ok=True)
+    error_log = []
+    with ExamExtractor(pdf_path, text_backend, render_cache, image_profile) as extractor:
+        questions, images = extractor.extract(image_folder, exam_type, exam_year, page_range, error_log, text)
+        answer_key = extractor.answer_key() if with_answer_key else None
+    return questions, images, answer_key, error_log
+
+
+def run_exam_jobs(jobs: List[ExamJob], image_folder: str, workers: int = 1,
+                  pages_per_task: Optional[int] = None) -> Iterator[ExamResult]:
+    """
+    Run the selected stages of each job, in a process pool when workers > 1.
+
+    Results are yielded per exam in job order, each reassembled from its page
+    ranges in page order, so the output does not depend on the worker count.
+    """
+    planned = []
+    tasks = []
+    for job in jobs:
+        exam_image_folder = os.path.join(image_folder, job.base_name)
+        if pages_per_task:
+            with pymupdf.open(job.pdf_path) as pdf:
+                page_ranges = split_pages(2, len(pdf) - 1, pages_per_task)
+        else:
+            page_ranges = [None]
+        parts = []
+        for i, page_range in enumerate(page_ranges):
+            part_folder = (
+                exam_image_folder if page_range is None
+                else os.path.join(exam_image_folder, f".pages-{page_range[0]}-{page_range[1]}")
+            )
+            parts.append(part_folder)
+            tasks.append((
+                job.pdf_path, part_folder if job.images else None, job.exam_type, job.exam_year,
+                page_range, job.text, job.text and i == 0, job.text_backend, job.render_cache, job.image_profile
+            ))
+        planned.append((job, exam_image_folder, parts))
+
+    results = run_tasks(extract_exam_part, tasks, workers)
+    for job, exam_image_folder, parts in planned:
+        questions = []
+        images = {}
+        answer_key = {}
+        errors = []
+        for part_folder in parts:
+            part_questions, part_images, part_answer_key, part_errors = next(results)
+            questions.extend(part_questions)
+            if part_answer_key is not None:
+                answer_key = part_answer_key
+            errors.extend(dict(error, file=job.file_name) for error in part_errors)
+            if job.images and part_folder != exam_image_folder:
+                part_images = move_part_images(part_images, part_folder, exam_image_folder)
+            images.update(part_images)
+        yield ExamResult(
+            job,
+            associate_questions_with_answers(questions, answer_key) if job.text else None,
+            images if job.images else None,
+            errors,
+        )
+
+
+def write_questions(path: str, questions: List[dict]) -> None:
+    with open(path, "w") as f:
+        json.dump(questions, f, indent=4)
+
+
+def extract_all_exams(input_folder, parsed_folder, image_folder, enriched_folder, workers=1, pages_per_task=None):
+    """
+    Parse, render and enrich every exam with each PDF opened once.
+
+    Writes each exam's parsed questions, its question images and the
+    questions with IDs and image paths added.
+
+    Args:
+        input_folder (str): Path to the folder containing exam PDFs.
+        parsed_folder (str): Path to save parsed question files.
+        image_folder (str): Path to save question images.
+        enriched_folder (str): Path to save questions with IDs and image paths.
+        workers (int): Number of worker processes; 1 runs serially.
+        pages_per_task (int): Optionally split exams into tasks of this many pages.
+    Returns:
+        dict: A dictionary mapping question IDs to image paths.
+    """
+    for folder in (parsed_folder, image_folder, enriched_folder):
+        os.makedirs(folder, exist_ok=True)
+
+    image_mapping = {}
+    error_log = []
+    for result in run_exam_jobs(find_exams(input_folder), image_folder, workers, pages_per_task):
+        job = result.job
+        write_questions(os.path.join(parsed_folder, job.output_name), result.questions)
+        write_questions(
+            os.path.join(enriched_folder, job.output_name),
+            enrich_questions(result.questions, result.images, job.exam_type, job.exam_year)
+        )
+        image_mapping.update(result.images)
+        error_log.extend(result.errors)
+        logger.info("Extracted %d questions and %d images from %s", len(result.questions), len(result.images), job.file_name)
+
+    if error_log:
+        with open('parsing_errors.json', 'w') as f:
+            json.dump(error_log, f, indent=4)
+    return image_mapping
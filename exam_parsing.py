@@ -0,0 +1,304 @@
+"""
+Text cleaning and question parsing shared by the extraction scripts.
+
+Database (question text) and the unified extractor both use these, so the
+cleaning rules live in one place.
+"""
+
+import functools
+import logging
+import re
+
+from Regex_Patterns import get_footer_patterns, get_usnco_exam_footer_patterns
+
+logger = logging.getLogger(__name__)
+
+FOOTER_PATTERNS = get_footer_patterns()
+USNCO_EXAM_FOOTER_PATTERNS = get_usnco_exam_footer_patterns()
+
+def infer_superscripts(text):
+    # Finds subscripts and changes them to normal numbers
+    return re.sub(r"×\s*10\s*([+-]?\d+)", r"× 10^\1", text)
+
+def reformat_hyphen_numbers(text):
+    # Reformat patterns like '-8.', ']8.' or 'mol-1.' to prevent them from being misinterpreted as question numbers...
+
+    # Reformat standalone hyphen-number-period patterns
+    text = re.sub(r"-(\d+)\.", r"-(\1).", text)
+
+    # Reformat standalone bracket-number-period patterns
+    text = re.sub(r"\](\d+)\.", r"](\1).", text)
+
+    # Handle cases like 'mol-1.' or 'kJ mol-1.'
+    text = re.sub(r"(\w+)-(\d+)\.", r"\1-(\2).", text)
+
+    return text
+
+def remove_footer_from_option(text):
+    # Remove footer text specifically from option D
+
+    return re.sub(FOOTER_PATTERNS['option_footer'], '', text, flags=re.IGNORECASE).strip()
+
+PAGE_3_INSTRUCTIONS = r"DIRECTIONS\s+ When you have selected your answer to each question, blacken the corresponding space on the answer sheet using a soft, #2 pencil\. Make a heavy, full mark, but no stray marks\. If you decide to change an answer, erase the unwanted mark very carefully\.\s+ There is only one correct answer to each question\. Any questions for which more than one response has been blackened will not\s+be counted\.  Your score is based solely on the number of questions you answer correctly\. It is to your advantage to answer every question\."
+ODD_PAGE_FOOTERS = [
+    r"Property of ACS USNCO – Not for use as USNCO Local Sectio",
+]
+EVEN_PAGE_FOOTERS = [
+    r"Page \d+ Property of ACS USNCO –",
+    r"ot for use as USNCO Local Section Exam after March 31, (200[0-9]|201[0-9]|202[0-2])",
+    r"END OF TEST",
+]
+
+SUBSCRIPT_DIGITS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+
+def page_patterns(page_number):
+    # Case-sensitive instruction and footer patterns for this page, in the order they are removed
+
+    patterns = [PAGE_3_INSTRUCTIONS] if page_number == 3 else []
+    patterns.extend(ODD_PAGE_FOOTERS if page_number % 2 == 1 else EVEN_PAGE_FOOTERS)
+    return patterns
+
+def remove_unwanted_text(text, page_number):
+    # Removes instructions and footer text based on known patterns.
+
+    # Remove all matches of these patterns
+    for pattern in page_patterns(page_number):
+        text = re.sub(pattern, "", text)
+    for pattern in USNCO_EXAM_FOOTER_PATTERNS:
+        text = re.sub(pattern, "", text, flags=re.IGNORECASE)
+
+    return text.strip()
+
+def clean_text_multipass(page_text, page_number):
+    """
+    Reference implementation of clean_text_with_removal, one re.sub per rule.
+
+    Kept so check_cleaner_parity.py can show the compiled cleaner gives the
+    same text on every page of the corpus.
+    """
+    # Step 1: Remove unwanted text (instructions and footers)
+    text = remove_unwanted_text(page_text, page_number)
+
+    # Step 2: Infer superscripts for scientific notation
+    text = infer_superscripts(text)
+
+    # Step 3: Reformat problematic patterns
+    text = reformat_hyphen_numbers(text)
+
+    # Step 4: Replace subscript characters with normal digits
+    text = text.translate(SUBSCRIPT_DIGITS)
+
+    # Step 5: Remove extra spaces
+    text = re.sub(r"\s+", " ", text)
+
+    # Step 6: Merge lines
+    text = re.sub(r"\n(?!\d+\.\s|\(A\)|\(B\)|\(C\)|\(D\))", " ", text)
+
+    # Step 7: Add consistent line breaks for questions and answer options
+    text = re.sub(r"(\d+\.\s)", r"\n\1", text)  # Add newline before question numbers
+    text = re.sub(r"(\(A\))", r"\n\1", text)    # Add newline before option A
+    text = re.sub(r"(\(B\))", r"\n\1", text)    # Add newline before option B
+    text = re.sub(r"(\(C\))", r"\n\1", text)    # Add newline before option C
+    text = re.sub(r"(\(D\))", r"\n\1", text)    # Add newline before option D
+
+    return text.strip()
+
+# Exam footer patterns merged into one alternation per scan. An alternation takes the leftmost
+# match, so a pattern that can overlap an earlier one (option_footer inside specific_footer1,
+# 'Page 7' inside specific_footer3), or that removing an earlier one can complete ('Page 5'
+# left behind by exam_footer, exam_footer2 left at the end by option_footer), goes in a later
+# scan to keep the original removal order.
+FOOTER_SCANS = (
+    ('exam_footer',),
+    ('page_property_footer', 'page_number', 'long_instruction'),
+    ('option_footer',),
+    ('exam_footer2',),
+    tuple(f'specific_footer{i}' for i in range(1, 9)),
+)
+END_ANCHORED_FOOTERS = ('option_footer', 'exam_footer2')
+
+def _alternation(patterns, flags=0):
+    # One pattern trying each of patterns in turn. re only skips ahead quickly on a case-sensitive
+    # literal prefix, so when several case-insensitive patterns all start with a letter, a
+    # lookahead on those letters saves trying every branch at every position.
+    alternation = "|".join(f"(?:{pattern})" for pattern in patterns)
+    first_letters = [re.match(r"\[([A-Za-z]+)\]|[A-Za-z]", pattern) for pattern in patterns]
+    if flags & re.IGNORECASE and len(patterns) > 1 and all(first_letters):
+        letters = "".join(sorted({m.group(1) or m.group() for m in first_letters}))
+        alternation = f"(?=[{letters}])(?:{alternation})"
+    return re.compile(alternation, flags)
+
+# (pattern, whether it can only match at the end of the text) per scan
+FOOTER_REMOVAL = tuple(
+    (_alternation([FOOTER_PATTERNS[key] for key in keys], re.IGNORECASE), keys[0] in END_ANCHORED_FOOTERS)
+    for keys in FOOTER_SCANS
+)
+
+@functools.lru_cache(maxsize=None)
+def removal_patterns(is_instruction_page, is_odd_page):
+    # Compiled scans removing the instructions and footers of a kind of page, in order.
+
+    page_number = 3 if is_instruction_page else 1 if is_odd_page else 2
+    return ((_alternation(page_patterns(page_number)), False),) + FOOTER_REMOVAL
+
+def ends_with_exam_date(text):
+    # option_footer and exam_footer2 end in '<day>,' or '<day>, 20xx' at the end of the text,
+    # which is much cheaper to check than trying both patterns at every position.
+
+    tail = text.rstrip()
+    if tail[-4:-2] == "20" and tail[-2:].isdigit():
+        tail = tail[:-4].rstrip()
+    return tail.endswith(",")
+
+# Superscript exponents ('× 10 -8') and the '-8.' / ']8.' sequences that look like question numbers
+NOTATION_PATTERN = re.compile(r"×\s*10\s*([+-]?\d+)|([-\]])(\d+)\.")
+
+# Question numbers and (A)-(D), which start a new line once whitespace is collapsed
+LINE_START_PATTERN = re.compile(r"(\([ABCD]\)|\d+\. )")
+
+def _rewrite_notation(match):
+    exponent = match.group(1)
+    if exponent is None:
+        return f"{match.group(2)}({match.group(3)})."
+    if exponent[0] == "-" and match.string.startswith(".", match.end()):
+        # The hyphen rule applies to the rewritten exponent too: '× 10^-8.' -> '× 10^-(8).'
+        return f"× 10^-({exponent[1:]})"
+    return f"× 10^{exponent}"
+
+def remove_footers(text, page_number):
+    # Removes the instructions and footers of the page with the precompiled scans.
+
+    for pattern, end_anchored in removal_patterns(page_number == 3, page_number % 2 == 1):
+        if not end_anchored or ends_with_exam_date(text):
+            text = pattern.sub("", text)
+    return text
+
+def normalize_text(text):
+    # Rewrites notation, replaces subscript digits and collapses whitespace to single spaces.
+
+    text = NOTATION_PATTERN.sub(_rewrite_notation, text).translate(SUBSCRIPT_DIGITS)
+    return " ".join(text.split())
+
+def clean_text_with_removal(page_text, page_number):
+    """
+    Cleans and standardizes text:
+    - Removes instructions and footer text.
+    - Infers superscripts for scientific notation.
+    - Reformats problematic patterns.
+    - Removes unnecessary line breaks and extra spaces.
+    - Ensures consistent formatting for parsing.
+
+    Gives the same result as clean_text_multipass with precompiled patterns:
+    the footer scans, one scan for notation and one for line breaks.
+    """
+    text = remove_footers(page_text, page_number)
+    # The text has no leading or trailing whitespace here, so split/join is the same as \s+ -> ' '
+    return LINE_START_PATTERN.sub(r"\n\1", normalize_text(text.strip())).strip()
+
+def filter_non_questions(text):
+    match = re.search(r"(\d+\..+)", text, re.DOTALL)
+    return match.group(1) if match else ""
+
+def parse_questions(block):
+
+    # Parses a block of text representing a single question and its options.
+
+    # Match the question number and text up to the options
+    question_number_pattern = r"^(?!-)(\d{1,3})\.\s(.+?)(?=\s\(A\))"
+    option_pattern = (
+        r"\(A\)(.+?)\s*"
+        r"\(B\)(.+?)\s*"
+        r"\(C\)(.+?)\s*"
+        r"\(D\)(.+?)(?=\s*\d+\.\s|$)"
+    )
+
+    # Match the question text
+    question_match = re.search(question_number_pattern, block, re.DOTALL)
+    if not question_match:
+        logger.debug("Question not found in block:\n%s", block)
+        return None
+    
+    # Match the options
+    options_match = re.search(option_pattern, block, re.DOTALL)
+    if not options_match:
+        logger.debug("Options not found for block:\n%s", block)
+        return None
+
+    # Extract question details
+    question_number = question_match.group(1).strip() if question_match else None
+    question_text = question_match.group(2).strip() if question_match else None
+    options = {
+        "A": options_match.group(1).strip() if options_match else None,
+        "B": options_match.group(2).strip() if options_match else None,
+        "C": options_match.group(3).strip() if options_match else None,
+        "D": remove_footer_from_option(options_match.group(4)) if options_match else None,
+    }
+
+    return {"number": question_number, "text": question_text, "options": options}
+
+def extract_column_texts(page, left_bbox, right_bbox):
+    # Raw text of the left and right columns of a pdfplumber page.
+
+    left_text = page.within_bbox(left_bbox).extract_text(y_tolerance=6) or ""
+    right_text = page.within_bbox(right_bbox).extract_text(y_tolerance=6) or ""
+    return left_text, right_text
+
+def clean_page_text(left_text, right_text, page_number):
+    # Cleans a page's column texts and merges them, left column first.
+
+    return (
+        clean_text_with_removal(left_text, page_number)
+        + "\n"
+        + clean_text_with_removal(right_text, page_number)
+    )
+
+def parse_page_text(combined_text):
+    # Parses the questions in a page's cleaned text.
+
+    questions = []
+
+    # Use re.finditer() to match all questions and options in the text
+    question_pattern = r"(\d{1,3})\.\s.+?(?=\n\d{1,3}\.\s|\Z)"
+    matches = re.finditer(question_pattern, combined_text, re.DOTALL)
+
+    for match in matches:
+        question_block = match.group(0)  # Extract the matched question block
+        parsed_question = parse_questions(question_block)
+        if parsed_question:
+            questions.append(parsed_question)
+
+    return questions
+
+def parse_page_questions(left_text, right_text, page_number):
+    # Cleans a page's column texts and parses the questions in them.
+
+    return parse_page_text(clean_page_text(left_text, right_text, page_number))
+
+def extract_questions_from_page(page, page_number, left_bbox, right_bbox):
+
+    # Extracts questions and their corresponding images from a single page.
+
+    left_text, right_text = extract_column_texts(page, left_bbox, right_bbox)
+    return parse_page_questions(left_text, right_text, page_number)
+
+def parse_answer_key(text):
+    # Parses the answer key page into {question number: answer}.
+
+    answer_key = {}
+    matches = re.findall(r"(\d+)\.\s([A-D])", text)
+    for num, ans in matches:
+        answer_key[int(num)] = ans
+    return dict(sorted(answer_key.items()))
+
+def associate_questions_with_answers(questions, answer_key):
+    # Associates each parsed question with its correct answer using the answer key.
+
+    logger.debug("Answer key: %s", answer_key)
+
+    for question in questions:
+        question_number = int(question["number"])  # Convert number to int for consistency
+        correct_answer = answer_key.get(question_number)  # Fetch from answer_key
+        question["correct_answer"] = correct_answer
+        logger.debug("Question %s: correct answer %s", question["number"], correct_answer)
+
+    return questions
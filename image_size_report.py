@@ -0,0 +1,117 @@
+"""
+Size of the question images under each image profile, and what it means for the bot.
+
+1. Renders every question of every exam once per resolution the profiles use
+   and encodes it with each profile in ExamImages.IMAGE_PROFILES, in memory
+2. Totals the bytes per profile and the bytes saved against "original", the
+   300 DPI RGB PNGs the pipeline has always written
+3. Estimates the upload time of the bot, which attaches one question image to
+   every question it serves, from the mean and 95th percentile image size at
+   --uplink-mbps
+
+Options:
+    --images FOLDER   also total the images already in this folder (output_images)
+    --report PATH     write the numbers to a JSON file
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+
+from ExamImages import (
+    IMAGE_PROFILES, PageRenderer, compact_image, find_question_bboxes, page_figures, render_bbox, resolution_options
+)
+from exam_extractor import ExamExtractor, find_exams
+
+
+def encode(img, profile, figure):
+    # Encoded bytes of a rendered question under a profile, as save_image_from_bbox writes it
+    dpi = profile.figure_dpi if figure else profile.text_dpi
+    if profile.gray_levels:
+        img = compact_image(img, figure, profile.gray_levels)
+    data = io.BytesIO()
+    img.save(data, format=profile.format, **profile.save_options, **resolution_options(profile.format, dpi))
+    return data.tell()
+
+
+def folder_bytes(folder):
+    # (number of images, total bytes) of the question images under folder
+    count = total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith((".png", ".webp")):
+                count += 1
+                total += os.path.getsize(os.path.join(root, name))
+    return count, total
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare question image sizes and upload times across image profiles.")
+    parser.add_argument("--input", default="olyexams", help="Folder with the exam PDFs")
+    parser.add_argument("--exams", type=int, help="Only measure the first N exams")
+    parser.add_argument("--images", default="output_images", help="Folder of images already written, to total")
+    parser.add_argument("--uplink-mbps", type=float, default=10.0, help="Upload bandwidth of the bot, in megabits per second")
+    parser.add_argument("--report", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    sizes = defaultdict(list)
+    seconds = defaultdict(float)
+    figures = 0
+    for job in find_exams(args.input)[:args.exams]:
+        with ExamExtractor(job.pdf_path) as extractor:
+            renderer = PageRenderer()
+            for index in extractor.question_pages():
+                page = extractor.document[index]
+                page_figure_rects = page_figures(page)
+                for _, bbox in find_question_bboxes(extractor.layout(index).blocks, page.rect.height):
+                    figure = any(bbox.intersects(rect) for rect in page_figure_rects)
+                    figures += figure
+                    for name, profile in IMAGE_PROFILES.items():
+                        start = time.perf_counter()
+                        img = render_bbox(page, bbox, profile.figure_dpi if figure else profile.text_dpi, renderer, profile.trim)
+                        if img is not None:
+                            sizes[name].append(encode(img, profile, figure))
+                        seconds[name] += time.perf_counter() - start
+
+    original = sum(sizes["original"])
+    images = len(sizes["original"])
+    print(f"{images} question images, {figures} with a figure or structure; upload at {args.uplink_mbps:g} Mbit/s\n")
+    print(f"{'profile':<10} {'MB':>8} {'saved':>7} {'mean KB':>8} {'p95 KB':>8} {'upload mean':>12} {'upload p95':>11} {'encode s':>9}")
+    results = {}
+    for name, values in sizes.items():
+        total = sum(values)
+        mean, p95 = statistics.mean(values), percentile(values, 0.95)
+        upload = {key: value * 8 / (args.uplink_mbps * 1e6) for key, value in (("mean", mean), ("p95", p95), ("all", total))}
+        results[name] = {
+            "images": len(values), "bytes": total, "saved_bytes": original - total,
+            "mean_bytes": round(mean), "p95_bytes": p95, "upload_seconds": {k: round(v, 4) for k, v in upload.items()},
+            "seconds": round(seconds[name], 2),
+        }
+        print(f"{name:<10} {total / 1e6:>8.1f} {1 - total / original:>7.1%} {mean / 1e3:>8.1f} {p95 / 1e3:>8.1f} "
+              f"{upload['mean'] * 1e3:>10.0f}ms {upload['p95'] * 1e3:>9.0f}ms {seconds[name]:>9.2f}")
+
+    if os.path.isdir(args.images):
+        count, total = folder_bytes(args.images)
+        results["folder"] = {"path": args.images, "images": count, "bytes": total}
+        print(f"\n{args.images}: {count} images, {total / 1e6:.1f} MB on disk now")
+        for name, result in results.items():
+            if name in IMAGE_PROFILES and name != "original" and original:
+                print(f"  as {name}: about {total * result['bytes'] / original / 1e6:.1f} MB")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"uplink_mbps": args.uplink_mbps, "figures": figures, "profiles": results}, f, indent=4)
+        print(f"Report written to '{args.report}'")
+
+
+if __name__ == "__main__":
+    main()
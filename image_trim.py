@@ -0,0 +1,199 @@
+"""
+Whitespace trimming of question images.
+
+Question crops span their whole column and are stretched down towards the
+next question (the +35 and 31 - gap padding in ExamImages), so most of an
+image is blank margin. This stage finds each image's ink from its row and
+column projections, crops it to the ink plus a uniform margin and pads it
+on the right to a common width, so the bot shows every question's text at
+the same size. Trimming an image that is already trimmed leaves it as it is.
+
+Margins and widths are given in points and converted with the resolution
+the image was rendered at, so profiles that render text and figures at
+different DPIs come out alike. Image profiles with trim set (ExamImages)
+trim each crop before it is encoded, which costs about a millisecond; the
+command line trims images already on disk, reading the resolution they
+were saved with (ExamImages.resolution_options), and is bound by decoding
+and re-encoding them.
+
+Usage:
+    python image_trim.py output_images      trim every image under the folder, in place
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".webp")
+INK_THRESHOLD = 192  # Gray levels below this count as ink
+MARGIN_PT = 6  # Blank border left around the ink
+WIDTH_PT = 270  # Width images are padded to: a column of text and its margins; wider content keeps its width
+DEFAULT_DPI = 300  # For images saved without a resolution, as the pipeline did before it recorded one
+
+
+def image_dpi(img: Image.Image) -> float:
+    """Resolution an image was saved at, from its PNG pHYs chunk or its EXIF."""
+    if "dpi" in img.info:
+        return round(img.info["dpi"][0])
+    resolution = img.getexif().get(0x011A)
+    return float(resolution) if resolution else DEFAULT_DPI
+
+
+def luminance(img: Image.Image) -> np.ndarray:
+    """Gray level of every pixel, looked up through the palette for "P" images."""
+    if img.mode == "P":
+        palette = np.asarray(img.getpalette("RGB"), dtype=np.uint16).reshape(-1, 3)
+        levels = ((palette * np.array([299, 587, 114])).sum(axis=1) // 1000).astype(np.uint8)
+        return levels[np.asarray(img)]
+    return np.asarray(img)
+
+
+def ink_box(pixels: np.ndarray, threshold: int = INK_THRESHOLD) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (top, bottom, left, right) pixel bounds of the ink, or None for a blank image.
+
+    The row and column projections are the darkest value of each row and
+    column over every channel, so a pixel dark in any channel counts as ink.
+    Rows are reduced as one run of width * channels values, which works on a
+    view into a page raster without copying it; columns only over the rows
+    with ink.
+    """
+    rows = np.flatnonzero(pixels.reshape(pixels.shape[0], -1).min(axis=1) < threshold)
+    if not len(rows):
+        return None
+    columns = pixels[rows[0]:rows[-1] + 1].min(axis=0)
+    if columns.ndim == 2:
+        columns = columns.min(axis=1)
+    columns = np.flatnonzero(columns < threshold)
+    return rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+
+
+def trim_pixels(pixels: np.ndarray, dpi: float, margin_pt: float = MARGIN_PT, width_pt: float = WIDTH_PT,
+                gray: Optional[np.ndarray] = None, fill: int = 255) -> Optional[np.ndarray]:
+    """
+    Crop pixels to their ink plus a uniform margin and pad them to the common width.
+
+    Args:
+        pixels (numpy.ndarray): (height, width) or (height, width, channels) pixels.
+        dpi (float): Resolution of the pixels.
+        margin_pt (float): Margin around the ink, in points.
+        width_pt (float): Width to pad to, in points.
+        gray (numpy.ndarray): Gray levels to find the ink in, if pixels are not gray levels (palette indices).
+        fill (int): Pixel value of blank paper.
+    Returns:
+        numpy.ndarray: The trimmed pixels, or None if they are blank or already trimmed.
+    """
+    box = ink_box(pixels if gray is None else gray)
+    if box is None:
+        return None
+    top, bottom, left, right = box
+    scale = dpi / 72
+    margin = round(margin_pt * scale)
+    height = bottom - top + 2 * margin
+    width = max(right - left + 2 * margin, round(width_pt * scale))
+    if (height, width) == pixels.shape[:2] and (top, left) == (margin, margin):
+        return None
+
+    canvas = np.full((height, width) + pixels.shape[2:], fill, dtype=pixels.dtype)
+    canvas[margin:margin + bottom - top, margin:margin + right - left] = pixels[top:bottom, left:right]
+    return canvas
+
+
+def trim_image(img: Image.Image, margin_pt: float = MARGIN_PT, width_pt: float = WIDTH_PT,
+               dpi: Optional[float] = None) -> Optional[Image.Image]:
+    """
+    Crop an image to its ink plus a uniform margin and pad it to the common width.
+
+    Args:
+        img (PIL.Image.Image): The question image.
+        margin_pt (float): Margin around the ink, in points.
+        width_pt (float): Width to pad to, in points.
+        dpi (float): Resolution of the image; read from the image if None.
+    Returns:
+        PIL.Image.Image: The trimmed image, or None if it is blank or already trimmed.
+    """
+    pixels = np.asarray(img)
+    gray = fill = None
+    if img.mode == "P":
+        gray = luminance(img)
+        fill = pixels.flat[np.argmax(gray)]  # The palette entry of the lightest pixel actually used
+    trimmed = trim_pixels(pixels, dpi or image_dpi(img), margin_pt, width_pt, gray, 255 if fill is None else fill)
+    if trimmed is None:
+        return None
+    result = Image.fromarray(trimmed, img.mode)
+    if img.mode == "P":
+        result.putpalette(img.getpalette())
+    return result
+
+
+def trim_file(path: str, margin_pt: float = MARGIN_PT, width_pt: float = WIDTH_PT) -> bool:
+    """Trim one image file in place, keeping its format and resolution. Returns whether it changed."""
+    with Image.open(path) as img:
+        img.load()
+    trimmed = trim_image(img, margin_pt, width_pt)
+    if trimmed is None:
+        return False
+    options = {"dpi": img.info["dpi"]} if "dpi" in img.info else {}
+    if img.format == "WEBP":
+        options = {"lossless": True, "method": 2, "exif": img.getexif().tobytes()}
+    temporary = f"{path}.tmp"
+    trimmed.save(temporary, format=img.format, **options)
+    os.replace(temporary, path)
+    return True
+
+
+def trim_images(paths: Iterable[str], margin_pt: float = MARGIN_PT, width_pt: float = WIDTH_PT) -> Dict[str, int]:
+    """
+    Trim many image files in place.
+
+    Returns:
+        dict: Counts of images seen and trimmed and their total bytes before and after.
+    """
+    stats = {"images": 0, "trimmed": 0, "errors": 0, "bytes_before": 0, "bytes_after": 0}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        stats["images"] += 1
+        stats["bytes_before"] += os.path.getsize(path)
+        try:
+            stats["trimmed"] += trim_file(path, margin_pt, width_pt)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not trim %s: %s", path, e)
+            stats["errors"] += 1
+        stats["bytes_after"] += os.path.getsize(path)
+    return stats
+
+
+def folder_images(folder: str):
+    """Paths of the question images under a folder."""
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if name.endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trim question images to their ink, in place.")
+    parser.add_argument("folder", nargs="?", default="output_images", help="Folder of question images")
+    parser.add_argument("--margin", type=float, default=MARGIN_PT, help="Margin around the ink, in points")
+    parser.add_argument("--width", type=float, default=WIDTH_PT, help="Width to pad the images to, in points")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = trim_images(folder_images(args.folder), args.margin, args.width)
+    seconds = time.perf_counter() - start
+    before, after = stats["bytes_before"], stats["bytes_after"]
+    print(f"Trimmed {stats['trimmed']} of {stats['images']} images in {seconds:.1f} s "
+          f"({stats['errors']} errors): {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB"
+          + (f" ({after / before - 1:+.0%})" if before else ""))
+
+
+if __name__ == "__main__":
+    main()
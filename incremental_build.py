@@ -0,0 +1,290 @@
+"""
+Incremental rebuilds of the question corpus.
+
+build_manifest.json records, for every exam, the SHA-256 of its PDF, the
+version of each stage that produced its outputs, the images it has and the
+files each stage wrote. A stage's version is a hash of its source files and
+the library it relies on, so editing the cleaning rules re-parses every exam
+but leaves the images alone, and adding one new exam only processes that
+exam. When a stage runs again, the files it wrote last time and no longer
+writes (eg. the .png images after switching to --image-profile webp) are
+deleted, as are the outputs of exams whose PDF is gone.
+
+Stages:
+    text    question text, options and answer key   (parsed_questions)
+    images  question images                         (output_images)
+    ocr     OCR check and re-crop of the images      (optional, needs tesseract)
+    enrich  questions with IDs and image paths      (enriched_questions)
+
+build_corpus(jobs=..., stages=[...]) runs chosen stages for chosen exams
+regardless of the manifest (Database.py --year 2018 --type national
+--stage images), recording only the stages that ran.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+from exam_extractor import (
+    ExamJob, enrich_questions, find_exams, run_exam_jobs, write_questions
+)
+from parallel_extraction import run_tasks
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Source files each stage runs; a change to any of them invalidates the stage.
+# exam_extractor picks the pages, columns and answer key page and runs both
+# the text and image steps; parallel_extraction splits and reassembles them.
+# check_stage_sources.py verifies these lists against the code a stage runs.
+STAGE_SOURCES = {
+    "text": ["exam_extractor.py", "exam_parsing.py", "Regex_Patterns.py", "pymupdf_text.py", "parallel_extraction.py"],
+    "images": ["exam_extractor.py", "ExamImages.py", "image_trim.py", "parallel_extraction.py"],
+    "ocr": ["Image_Adjustment.py"],
+    "enrich": ["exam_extractor.py"],
+}
+
+
+def downstream_stages(stages, versions: Dict[str, str]) -> set:
+    """The stages, and those that consume their outputs and so have to run again too."""
+    stages = set(stages) & set(versions)
+    if "images" in stages and "ocr" in versions:
+        stages.add("ocr")
+    if stages & {"text", "images", "ocr"}:
+        stages.add("enrich")
+    return stages
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def library_versions(text_backend: str = "pdfplumber", image_profile: str = "original") -> Dict[str, str]:
+    import pdfplumber
+    import pymupdf
+    text = pdfplumber.__version__ if text_backend == "pdfplumber" else f"{text_backend} {pymupdf.VersionBind}"
+    images = pymupdf.VersionBind if image_profile == "original" else f"{image_profile} {pymupdf.VersionBind}"
+    return {"text": text, "images": images}
+
+
+def stage_versions(root: Optional[str] = None, text_backend: str = "pdfplumber",
+                   image_profile: str = "original") -> Dict[str, str]:
+    """
+    A short hash per stage of its source files and library version (so switching
+    text backend re-parses, and switching image profile re-renders).
+    """
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    libraries = library_versions(text_backend, image_profile)
+    versions = {}
+    for stage, sources in STAGE_SOURCES.items():
+        sha = hashlib.sha256(libraries.get(stage, "").encode())
+        for source in sources:
+            with open(os.path.join(root, source), "rb") as f:
+                sha.update(f.read())
+        versions[stage] = sha.hexdigest()[:16]
+    return versions
+
+
+class BuildManifest:
+    def __init__(self, path: str = "build_manifest.json"):
+        self.path = path
+        self.exams: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.exams = data.get("exams", {})
+            except (OSError, ValueError) as e:
+                logger.error("Error loading build manifest from %s: %s", path, e)
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "exams": self.exams}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def stale_stages(self, file_name: str, digest: str, versions: Dict[str, str], outputs: Dict[str, str]) -> set:
+        """Stages whose recorded input hash, version or output no longer matches."""
+        entry = self.exams.get(file_name)
+        if entry is None or entry.get("sha256") != digest:
+            return set(versions)
+        recorded = entry.get("stages", {})
+        stale = {stage for stage, version in versions.items() if recorded.get(stage) != version}
+        if not os.path.exists(outputs["text"]):
+            stale.add("text")
+        if not all(os.path.exists(path) for path in entry.get("images", {}).values()):
+            stale.add("images")
+        if not os.path.exists(outputs["enrich"]):
+            stale.add("enrich")
+        return downstream_stages(stale, versions)
+
+    def is_built(self, file_name: str, digest: str) -> bool:
+        """Whether the exam has been built from this exact PDF before."""
+        return self.exams.get(file_name, {}).get("sha256") == digest
+
+    def recorded_outputs(self, file_name: str) -> Dict[str, List[str]]:
+        """Files each stage wrote for the exam in the last build."""
+        entry = self.exams.get(file_name, {})
+        outputs = dict(entry.get("outputs", {}))
+        # Manifests written before outputs were recorded still list the images
+        outputs.setdefault("images", sorted(entry.get("images", {}).values()))
+        return outputs
+
+
+def remove_outputs(paths: Iterable[str]) -> int:
+    """Delete the given output files that still exist. Returns how many were deleted."""
+    removed = 0
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def ocr_exam_images(images: Dict[str, str]) -> int:
+    """Worker for the OCR stage: re-crop images that run into the next question."""
+    from Image_Adjustment import validate_and_adjust_image_crop
+    adjusted = 0
+    for question_id, image_path in images.items():
+        if os.path.exists(image_path):
+            needs_adjustment, _ = validate_and_adjust_image_crop(image_path, int(question_id[5:]))
+            adjusted += bool(needs_adjustment)
+    return adjusted
+
+
+def build_corpus(input_folder: str = "olyexams", parsed_folder: str = "parsed_questions",
+                 image_folder: str = "output_images", enriched_folder: str = "enriched_questions",
+                 manifest_path: str = "build_manifest.json", workers: int = 1,
+                 pages_per_task: Optional[int] = None, ocr: bool = False, force: bool = False,
+                 jobs: Optional[List[ExamJob]] = None, text_backend: str = "pdfplumber",
+                 render_cache: Optional[str] = None, image_profile: str = "original",
+                 stages: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """
+    Bring the outputs up to date, reprocessing only what changed.
+
+    Args:
+        input_folder (str): Path to the folder containing exam PDFs.
+        parsed_folder (str): Path to save parsed question files.
+        image_folder (str): Path to save question images.
+        enriched_folder (str): Path to save questions with IDs and image paths.
+        manifest_path (str): Path of the build manifest.
+        workers (int): Number of worker processes; 1 runs serially.
+        pages_per_task (int): Optionally split exams into tasks of this many pages.
+        ocr (bool): Also run the OCR check on new or changed images.
+        force (bool): Rebuild every stage of every exam.
+        jobs (list): Only consider these exams (defaults to every PDF in input_folder).
+        text_backend (str): Library to read the question text with, "pdfplumber" or "pymupdf".
+        render_cache (str): Optional folder to keep rendered pages in, so re-cropping the
+            images after a bounding box change does not render the PDFs again.
+        image_profile (str): Resolution and encoding of the images, a key of ExamImages.IMAGE_PROFILES.
+        stages (iterable): Run these stages (and those downstream of them) for every exam in jobs,
+            whatever the manifest says, and leave its other stages alone. Exams not built
+            from their current PDF yet still run every stage.
+    Returns:
+        dict: The stages that ran for each exam that was not up to date.
+    """
+    for folder in (parsed_folder, image_folder, enriched_folder):
+        os.makedirs(folder, exist_ok=True)
+
+    manifest = BuildManifest(manifest_path)
+    versions = stage_versions(text_backend=text_backend, image_profile=image_profile)
+    if not ocr and "ocr" not in (stages or ()):
+        versions.pop("ocr")
+
+    if jobs is None:
+        jobs = find_exams(input_folder)
+        # Forget exams whose PDF is gone, and delete what was built from them
+        for file_name in set(manifest.exams) - {job.file_name for job in jobs}:
+            removed = remove_outputs(path for paths in manifest.recorded_outputs(file_name).values() for path in paths)
+            logger.info("Removed %d outputs of %s, whose PDF is gone", removed, file_name)
+            del manifest.exams[file_name]
+    pending = {}
+    for job in jobs:
+        digest = file_digest(job.pdf_path)
+        outputs = {
+            "text": os.path.join(parsed_folder, job.output_name),
+            "enrich": os.path.join(enriched_folder, job.output_name),
+        }
+        stale = set(versions) if force else manifest.stale_stages(job.file_name, digest, versions, outputs)
+        if stages is not None and manifest.is_built(job.file_name, digest):
+            # Enrichment reads the parsed questions, so they are parsed again if they are gone
+            requested = set(stages) | ({"text"} if not os.path.exists(outputs["text"]) else set())
+            stale = downstream_stages(requested, versions)
+        if stale:
+            job.text_backend = text_backend
+            job.render_cache = render_cache
+            job.image_profile = image_profile
+            job.text = "text" in stale
+            job.images = "images" in stale
+            pending[job.file_name] = (job, digest, stale, outputs)
+    if not pending:
+        manifest.save()  # Exams whose PDF is gone may have been dropped
+        logger.info("All %d exams are up to date", len(jobs))
+        return {}
+
+    # Text and image stages: one pass over each PDF that needs either
+    extracted = {}
+    error_log = []
+    extract_jobs = [job for job, _, _, _ in pending.values() if job.text or job.images]
+    for result in run_exam_jobs(extract_jobs, image_folder, workers, pages_per_task):
+        extracted[result.job.file_name] = result
+        error_log.extend(result.errors)
+        if result.questions is not None:
+            write_questions(pending[result.job.file_name][3]["text"], result.questions)
+
+    # Reuse recorded outputs for the stages that did not run
+    images_by_exam = {}
+    for file_name, (job, digest, stale, outputs) in pending.items():
+        result = extracted.get(file_name)
+        if result is not None and result.images is not None:
+            images_by_exam[file_name] = result.images
+        else:
+            images_by_exam[file_name] = manifest.exams.get(file_name, {}).get("images", {})
+
+    if "ocr" in versions:
+        ocr_exams = [file_name for file_name, (_, _, stale, _) in pending.items() if "ocr" in stale]
+        for file_name, adjusted in zip(ocr_exams, run_tasks(ocr_exam_images, [images_by_exam[f] for f in ocr_exams], workers)):
+            logger.info("OCR re-cropped %d images of %s", adjusted, file_name)
+
+    ran = {}
+    for file_name, (job, digest, stale, outputs) in pending.items():
+        result = extracted.get(file_name)
+        if result is not None and result.questions is not None:
+            questions = result.questions
+        else:
+            with open(outputs["text"], "r") as f:
+                questions = json.load(f)
+        images = images_by_exam[file_name]
+        write_questions(outputs["enrich"], enrich_questions(questions, images, job.exam_type, job.exam_year))
+
+        # Files the stages that ran wrote last time but not this time (a new image
+        # format or output folder, or a question no longer found) are stale
+        written = manifest.recorded_outputs(file_name)
+        produced = {"text": [outputs["text"]], "images": sorted(images.values()), "enrich": [outputs["enrich"]]}
+        for stage in stale & produced.keys():
+            removed = remove_outputs(set(written.get(stage, ())) - set(produced[stage]))
+            if removed:
+                logger.info("Removed %d stale %s outputs of %s", removed, stage, file_name)
+            written[stage] = produced[stage]
+
+        recorded = dict(manifest.exams.get(file_name, {}).get("stages", {}))
+        if "images" in stale:
+            recorded.pop("ocr", None)  # New images have not been through OCR yet
+        recorded.update((stage, versions[stage]) for stage in stale)
+        manifest.exams[file_name] = {"sha256": digest, "stages": recorded, "images": images, "outputs": written}
+        manifest.save()
+        ran[file_name] = sorted(stale)
+        logger.info("Rebuilt %s: %s", file_name, ", ".join(sorted(stale)))
+
+    if error_log:
+        with open('parsing_errors.json', 'w') as f:
+            json.dump(error_log, f, indent=4)
+    return ran
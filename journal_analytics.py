@@ -0,0 +1,172 @@
+"""
+Offline analytics over the interaction journal written by the bot.
+
+Reads the journal segments directly (never talks to the running bot) and
+reports per-question accuracy, buzz latency percentiles and topic usage.
+
+Usage: python journal_analytics.py [--journal journal] [--since 2025-02-01] [--json report.json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+
+from event_journal import (
+    EVENT_ANSWER, EVENT_BUZZ, EVENT_NAMES, EVENT_SERVE, FLAG_CORRECT, LENGTH_PREFIX, RECORD_BODY,
+    RECORD_SIZE, TOPICS, compact_journal, iter_record_bodies, list_segments
+)
+
+RECORD_DTYPE = np.dtype([
+    ('length', '<u4'),
+    ('event', 'u1'),
+    ('topic', 'u1'),
+    ('option', 'u1'),
+    ('flags', 'u1'),
+    ('timestamp', '<f8'),
+    ('user_id', '<u8'),
+    ('question_id', '<u4'),
+    ('latency_ms', '<u4'),
+])
+assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+LATENCY_BINS_MS = [0, 2000, 5000, 10000, 20000, 30000, 60000, 90000, 120001]
+
+
+def load_segment(path: str) -> np.ndarray:
+    """Load one journal file as a structured array, dropping any torn tail."""
+    count = os.path.getsize(path) // RECORD_SIZE
+    records = np.fromfile(path, dtype=RECORD_DTYPE, count=count)
+    if (records['length'] == RECORD_BODY.size).all():
+        return records
+
+    # Records of another size (from a newer writer): walk the length prefixes
+    with open(path, 'rb') as f:
+        bodies = [
+            LENGTH_PREFIX.pack(RECORD_BODY.size) + body[:RECORD_BODY.size]
+            for body in iter_record_bodies(f.read())
+            if len(body) >= RECORD_BODY.size
+        ]
+    return np.frombuffer(b''.join(bodies), dtype=RECORD_DTYPE)
+
+
+def load_journal(directory: str, since=None, until=None) -> np.ndarray:
+    segments = [load_segment(path) for path in list_segments(directory)]
+    records = np.concatenate(segments) if segments else np.empty(0, dtype=RECORD_DTYPE)
+    if since is not None:
+        records = records[records['timestamp'] >= since]
+    if until is not None:
+        records = records[records['timestamp'] < until]
+    return records
+
+
+def question_accuracy(records: np.ndarray) -> list:
+    answers = records[records['event'] == EVENT_ANSWER]
+    question_ids, inverse = np.unique(answers['question_id'], return_inverse=True)
+    attempts = np.bincount(inverse, minlength=len(question_ids))
+    correct = np.bincount(inverse, weights=(answers['flags'] & FLAG_CORRECT), minlength=len(question_ids))
+    order = np.argsort(-attempts, kind='stable')
+    return [
+        {
+            'question_id': str(question_ids[i]) if question_ids[i] else 'Unknown',
+            'attempts': int(attempts[i]),
+            'correct': int(correct[i]),
+            'accuracy': round(float(correct[i] / attempts[i]), 4),
+        }
+        for i in order
+    ]
+
+
+def buzz_latency(records: np.ndarray) -> dict:
+    latency = records['latency_ms'][records['event'] == EVENT_BUZZ].astype(np.float64)
+    if not len(latency):
+        return {'count': 0}
+    p50, p90, p99 = np.percentile(latency, [50, 90, 99])
+    histogram, _ = np.histogram(latency, bins=LATENCY_BINS_MS)
+    return {
+        'count': int(len(latency)),
+        'mean_ms': round(float(latency.mean()), 1),
+        'p50_ms': round(float(p50), 1),
+        'p90_ms': round(float(p90), 1),
+        'p99_ms': round(float(p99), 1),
+        'histogram': {
+            f"{LATENCY_BINS_MS[i] // 1000}-{LATENCY_BINS_MS[i + 1] // 1000}s": int(n)
+            for i, n in enumerate(histogram)
+        },
+    }
+
+
+def topic_usage(records: np.ndarray) -> dict:
+    served = np.bincount(records['topic'][records['event'] == EVENT_SERVE], minlength=len(TOPICS))
+    return {topic.value: int(served[i]) for i, topic in enumerate(TOPICS)}
+
+
+def build_report(records: np.ndarray) -> dict:
+    counts = np.bincount(records['event'], minlength=max(EVENT_NAMES) + 1)
+    return {
+        'records': int(len(records)),
+        'events': {name: int(counts[event]) for event, name in EVENT_NAMES.items()},
+        'question_accuracy': question_accuracy(records),
+        'buzz_latency': buzz_latency(records),
+        'topic_usage': topic_usage(records),
+    }
+
+
+def print_report(report: dict, top: int) -> None:
+    print("Interaction Journal Report")
+    print("=" * 50)
+    print(f"Total records: {report['records']}")
+    for name, count in report['events'].items():
+        print(f"- {name}: {count}")
+
+    print(f"\nMost answered questions (top {top}):")
+    for row in report['question_accuracy'][:top]:
+        print(f"- {row['question_id']}: {row['correct']}/{row['attempts']} correct ({row['accuracy']:.0%})")
+
+    latency = report['buzz_latency']
+    print("\nBuzz latency:")
+    if latency['count']:
+        print(f"- mean {latency['mean_ms'] / 1000:.1f}s, p50 {latency['p50_ms'] / 1000:.1f}s, "
+              f"p90 {latency['p90_ms'] / 1000:.1f}s, p99 {latency['p99_ms'] / 1000:.1f}s")
+        for bucket, count in latency['histogram'].items():
+            print(f"  {bucket:>8}: {count}")
+    else:
+        print("- no buzzes recorded")
+
+    print("\nQuestions served by topic:")
+    for topic, count in sorted(report['topic_usage'].items(), key=lambda x: x[1], reverse=True):
+        print(f"- {topic}: {count}")
+
+
+def parse_date(value: str) -> float:
+    return datetime.datetime.strptime(value, "%Y-%m-%d").timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse the bot's interaction journal offline.")
+    parser.add_argument("--journal", default="journal", help="Journal directory")
+    parser.add_argument("--since", type=parse_date, help="Only events on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=parse_date, help="Only events before this date (YYYY-MM-DD)")
+    parser.add_argument("--top", type=int, default=20, help="Number of questions to list")
+    parser.add_argument("--json", help="Also save the full report as JSON to this path")
+    parser.add_argument("--compact", action="store_true", help="Merge closed segments before reading")
+    args = parser.parse_args()
+
+    if args.compact:
+        compacted = compact_journal(args.journal)
+        if compacted:
+            print(f"Compacted closed segments into {compacted}")
+
+    report = build_report(load_journal(args.journal, args.since, args.until))
+    print_report(report, args.top)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nDetailed results have been saved to '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
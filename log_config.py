@@ -0,0 +1,125 @@
+"""
+Logging setup shared by the bot and the extraction scripts.
+
+Records go through a QueueHandler, so the code that logs only pays for a
+queue put; a QueueListener thread does the formatting and console/file I/O.
+By default only warnings and errors are shown. Levels can be raised per
+module through the environment:
+
+    USNCO_LOG_LEVEL=INFO                          default level for everything
+    USNCO_LOG_LEVELS=ExamImages=DEBUG,discord=INFO  per-logger overrides
+    USNCO_LOG_SAMPLE=100                          keep 1 in N repeats of a DEBUG line
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+from collections import defaultdict
+from typing import Dict, Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Thins out repetitive DEBUG lines.
+
+    Each logging call site (file and line) passes its first `burst` records,
+    then one in every `every`. INFO and above always pass.
+    """
+
+    def __init__(self, every: int = 100, burst: int = 5):
+        super().__init__()
+        self.every = every
+        self.burst = burst
+        self._counts: Dict[tuple, int] = defaultdict(int)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every <= 1:
+            return True
+        key = (record.pathname, record.lineno)
+        self._counts[key] += 1
+        count = self._counts[key]
+        return count <= self.burst or count % self.every == 0
+
+
+def parse_level(level: str, source: str) -> int:
+    """
+    Turn a level name ("debug", "INFO") or number into a logging level.
+
+    Raises:
+        ValueError: If the level is not one logging knows, naming `source`
+            (the setting it came from) so the bad configuration is easy to find.
+    """
+    level = level.strip().upper()
+    if level.isdigit():
+        return int(level)
+    number = logging.getLevelName(level)
+    if not isinstance(number, int):
+        raise ValueError(f"{source}: unknown log level {level!r} "
+                         f"(expected DEBUG, INFO, WARNING, ERROR or CRITICAL)")
+    return number
+
+
+def parse_levels(spec: str, source: str = "USNCO_LOG_LEVELS") -> Dict[str, int]:
+    """Parse "module=LEVEL,other=LEVEL" into logger names and levels."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = parse_level(level, f"{source} entry {item!r}")
+    return levels
+
+
+def configure_logging(level: Optional[str] = None, levels: Optional[Dict[str, str]] = None,
+                      log_file: Optional[str] = None) -> None:
+    """
+    Route all logging through a background queue listener.
+
+    Safe to call more than once; later calls replace the earlier setup.
+    Arguments override the USNCO_LOG_* environment variables.
+
+    Raises:
+        ValueError: If a level is not a logging level; nothing is changed.
+    """
+    # Levels are checked before the current setup is torn down
+    default_level = parse_level(level, "level") if level else parse_level(os.getenv("USNCO_LOG_LEVEL", "WARNING"), "USNCO_LOG_LEVEL")
+    module_levels = parse_levels(os.getenv("USNCO_LOG_LEVELS", ""))
+    module_levels.update({name: parse_level(lvl, f"levels[{name!r}]") for name, lvl in (levels or {}).items()})
+
+    global _listener
+    if _listener:
+        stop_logging()
+    else:
+        atexit.register(stop_logging)
+
+    formatter = logging.Formatter("%(asctime)s %(levelname)-8s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(every=int(os.getenv("USNCO_LOG_SAMPLE", "100"))))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(default_level)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
@@ -0,0 +1,117 @@
+import gc
+import os
+import sys
+import tracemalloc
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size right now, from /proc (None where there is no /proc)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Highest resident set size since the process started."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate memory held by an object and everything it references."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def average_deep_size(items: List, sample: int = 50) -> float:
+    """Average deep size of evenly spaced items, so large stores stay cheap to measure."""
+    if not items:
+        return 0.0
+    step = max(1, len(items) // sample)
+    picked = items[::step][:sample]
+    return sum(deep_sizeof(item) for item in picked) / len(picked)
+
+
+def live_object_counts(classes: Iterable[type]) -> Dict[str, Dict[str, int]]:
+    """
+    Count live instances of each class, and for views how many are finished.
+
+    A view that is finished (stop()ed or timed out) but still alive is being
+    kept around by a reference somewhere; a growing number of unfinished views
+    means they are never stopped.
+    """
+    classes = list(classes)
+    counts = {cls.__name__: {"live": 0, "finished": 0} for cls in classes}
+    for obj in gc.get_objects():
+        for cls in classes:
+            if type(obj) is cls:
+                counts[cls.__name__]["live"] += 1
+                is_finished = getattr(obj, "is_finished", None)
+                if callable(is_finished) and is_finished():
+                    counts[cls.__name__]["finished"] += 1
+    return counts
+
+
+def ensure_tracing(frames: int = 10) -> bool:
+    """Start tracemalloc if needed. Returns True if it was already running."""
+    if tracemalloc.is_tracing():
+        return True
+    tracemalloc.start(frames)
+    return False
+
+
+def top_allocators(snapshot: tracemalloc.Snapshot, limit: int = 10) -> List[str]:
+    stats = snapshot.statistics("lineno")[:limit]
+    return [f"{stat.size / 1024:.1f} KiB in {stat.count} blocks: {stat.traceback[0]}" for stat in stats]
+
+
+def diff_snapshots(old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, limit: int = 10) -> List[str]:
+    stats = new.compare_to(old, "lineno")[:limit]
+    return [
+        f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks): {stat.traceback[0]}"
+        for stat in stats
+    ]
+
+
+def cache_sizes(bot) -> Dict[str, str]:
+    """Entry counts (and array sizes where known) of the bot's derived caches."""
+    index = bot.question_index
+    sizes = {
+        "Questions": f"{len(bot.questions)}",
+        "Embed cache": f"{len(bot.embed_cache)} payloads",
+        "Filter masks": f"{len(index._filter_masks)} masks, {len(index._members)} decoded",
+        "Search index": f"{len(bot.search_index.postings)} terms",
+    }
+    similarity = bot.similarity_index
+    if similarity.available:
+        matrix = similarity.matrix
+        nbytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes + similarity.neighbors.nbytes
+        sizes["Similarity index"] = f"{nbytes / 1024:.0f} KiB"
+    if bot.difficulty:
+        sizes["Difficulty ratings"] = f"{len(bot.difficulty.user_ratings)} users"
+    sizes["Blocklist"] = f"{len(bot.blocklist.blocked)} blocked, {len(bot.blocklist.reporters)} reported"
+    if bot.question_api:
+        sizes["Question API cache"] = f"{len(bot.question_api._questions)} questions, {len(bot.question_api._lists)} lists"
+    return sizes
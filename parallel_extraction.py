@@ -0,0 +1,54 @@
+"""
+Process-pool helpers shared by the text and image extraction scripts.
+
+Work is split into tasks (a whole exam, or a page range of one) and run with
+ProcessPoolExecutor.map, which returns results in submission order. Callers
+merge those results in that order, so the output of a parallel run is
+identical to a serial one regardless of which worker finishes first.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+PageRange = Tuple[int, int]  # 0-based page indices, stop exclusive
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def list_exam_pdfs(input_folder: str) -> List[str]:
+    """PDF file names in a stable order, so runs do not depend on directory order."""
+    return sorted(name for name in os.listdir(input_folder) if name.endswith(".pdf"))
+
+
+def split_pages(start: int, stop: int, pages_per_task: Optional[int]) -> List[Optional[PageRange]]:
+    """
+    Split the pages [start, stop) into consecutive ranges.
+
+    Returns [None] (meaning "the whole exam") when the exam is not split.
+    """
+    if not pages_per_task or stop - start <= pages_per_task:
+        return [None]
+    return [(first, min(first + pages_per_task, stop)) for first in range(start, stop, pages_per_task)]
+
+
+def page_count(pdf_path: str) -> int:
+    import pymupdf
+    with pymupdf.open(pdf_path) as pdf:
+        return len(pdf)
+
+
+def run_tasks(func: Callable, tasks: Sequence, workers: int = 1) -> Iterable:
+    """
+    Apply func to every task, in a process pool when workers > 1.
+
+    Results are yielded in task order. func must be a module-level function
+    so it can be pickled.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        yield from map(func, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        yield from pool.map(func, tasks)
@@ -0,0 +1,127 @@
+"""
+Column text from pymupdf, laid out the way pdfplumber's extract_text does.
+
+pdfplumber builds every character's box in Python, which makes text the
+slowest stage of the pipeline. pymupdf's text trace gives the same characters
+in the same content-stream order from C, and the functions here group them
+into lines and words with pdfplumber's rules (chars clustered by top within
+y_tolerance, words split on spaces and on gaps over x_tolerance), so the
+cleaning and parsing rules work on either backend's text unchanged.
+
+The two differ in a few places: pymupdf decodes Symbol-font glyphs (→, ×, ∆)
+that pdfplumber reads as ®, ´, D, and its glyph boxes are a little tighter,
+which can move a sub- or superscript onto a neighbouring line.
+check_text_backend_parity.py reports the questions that come out different.
+"""
+
+import itertools
+from typing import Dict, List, Tuple
+
+# pdfplumber expands these ligatures in extract_text
+LIGATURES = {"ﬀ": "ff", "ﬃ": "ffi", "ﬄ": "ffl", "ﬁ": "fi", "ﬂ": "fl", "ﬆ": "st", "ﬅ": "st"}
+
+X_TOLERANCE = 3
+Y_TOLERANCE = 6  # As passed to pdfplumber by extract_column_texts
+
+
+def page_chars(page) -> List[dict]:
+    """The characters of a pymupdf page in content-stream order, with pdfplumber's box keys."""
+    chars = []
+    for span in page.get_texttrace():
+        dx, dy = span["dir"]
+        upright = dx > 0 and abs(dy) < 1e-3
+        for code, _, _, (x0, top, x1, bottom) in span["chars"]:
+            chars.append({"text": chr(code), "x0": x0, "x1": x1, "top": top, "bottom": bottom, "upright": upright})
+    return chars
+
+
+def cluster_ids(values, tolerance: float) -> Dict[float, int]:
+    """Cluster number of each value, chaining values less than `tolerance` apart."""
+    ids = {}
+    cluster = 0
+    last = None
+    for value in sorted(set(values)):
+        if last is not None and value > last + tolerance:
+            cluster += 1
+        ids[value] = cluster
+        last = value
+    return ids
+
+
+def _lines(chars: List[dict], upright: bool) -> List[List[dict]]:
+    # Upright text lines up by top and reads left to right; rotated text the other way round
+    line_key, order_key = ("top", "x0") if upright else ("x0", "top")
+    ids = cluster_ids([c[line_key] for c in chars], Y_TOLERANCE if upright else X_TOLERANCE)
+    by_line = sorted(chars, key=lambda c: ids[c[line_key]])
+    return [
+        sorted(line, key=lambda c: (c[order_key], c[order_key] if upright else c["bottom"]))
+        for _, line in itertools.groupby(by_line, key=lambda c: ids[c[line_key]])
+    ]
+
+
+def _starts_word(char: dict, previous: dict, upright: bool) -> bool:
+    if upright:
+        return (char["x0"] < previous["x0"] or char["x0"] > previous["x1"] + X_TOLERANCE
+                or abs(char["top"] - previous["top"]) > Y_TOLERANCE)
+    return (char["top"] < previous["top"] or char["top"] > previous["bottom"] + Y_TOLERANCE
+            or abs(char["x0"] - previous["x0"]) > X_TOLERANCE)
+
+
+def extract_words(chars: List[dict]) -> List[Tuple[str, float]]:
+    """(text, top) of each word, in pdfplumber's word order."""
+    words = []
+    for upright, group in itertools.groupby(chars, key=lambda c: c["upright"]):
+        for line in _lines(list(group), upright):
+            word = []
+            for char in line:
+                if char["text"].isspace():
+                    if word:
+                        words.append(word)
+                    word = []
+                elif word and _starts_word(char, word[-1], upright):
+                    words.append(word)
+                    word = [char]
+                else:
+                    word.append(char)
+            if word:
+                words.append(word)
+    return [
+        ("".join(LIGATURES.get(c["text"], c["text"]) for c in word), min(c["top"] for c in word))
+        for word in words
+    ]
+
+
+def chars_text(chars: List[dict]) -> str:
+    """Text of the characters, one line per cluster of word tops, keeping the word order."""
+    words = extract_words(chars)
+    ids = cluster_ids([top for _, top in words], Y_TOLERANCE)
+    return "\n".join(
+        " ".join(text for text, _ in line)
+        for _, line in itertools.groupby(words, key=lambda word: ids[word[1]])
+    )
+
+
+def bbox_text(chars: List[dict], bbox) -> str:
+    """Text of the characters entirely inside bbox, like pdfplumber's within_bbox().extract_text()."""
+    x0, top, x1, bottom = bbox
+    return chars_text([
+        c for c in chars
+        if c["x0"] >= x0 and c["x1"] <= x1 and c["top"] >= top and c["bottom"] <= bottom
+    ])
+
+
+def extract_column_texts(page, left_bbox, right_bbox) -> Tuple[str, str]:
+    """Raw text of the left and right columns of a pymupdf page."""
+    chars = page_chars(page)
+    return bbox_text(chars, left_bbox), bbox_text(chars, right_bbox)
+
+
+def page_text(page) -> str:
+    """
+    Words of a whole pymupdf page in reading order, for the answer key.
+
+    The answer key is a table whose percentage column sits between the rows,
+    so clustering by top chains rows together there; pymupdf's own word sort
+    keeps each "23. D" pair in place.
+    """
+    return " ".join(word[4] for word in page.get_text("words", sort=True))
@@ -0,0 +1,259 @@
+"""
+Read-only HTTP JSON API over the bot's in-memory question bank.
+
+  GET /questions/{question_id}   one question
+  GET /questions?topic=KINETICS&exam_type=local&year_min=2010&year_max=2020&has_image=true
+                                 IDs and summaries of every matching question
+  GET /images/{question_id}      the question's image (supports Range requests)
+
+JSON responses are serialised, gzipped and hashed once per question or
+filter combination, then served from memory with an ETag so clients that
+send If-None-Match get an empty 304. Filters are validated and years
+clamped to the bank's range, and only the most recently used lists are
+kept, so clients cannot grow the cache without bound. The server runs its own event loop in
+a separate thread so requests never compete with Discord interactions.
+"""
+
+import asyncio
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import replace
+from typing import Dict, Optional, Sequence, Tuple
+
+from question_index import QuestionFilter, bit_positions
+from question_models import Question, USNCOTopic, topic_for_question
+
+try:
+    from aiohttp import web
+except ImportError:  # The API is optional; the bot runs without aiohttp
+    web = None
+
+logger = logging.getLogger(__name__)
+
+Payload = Tuple[bytes, bytes, str]  # (body, gzipped body, etag)
+
+
+def question_payload(question: Question) -> dict:
+    return {
+        "question_id": question.question_id,
+        "number": question.number,
+        "exam_type": question.exam_type,
+        "exam_year": question.exam_year,
+        "topic": topic_for_question(question).value,
+        "text": question.text,
+        "options": question.options,
+        "correct_answer": question.correct_answer,
+        "image_url": f"/images/{question.question_id}" if question.image_path else None,
+    }
+
+
+def encode_payload(data) -> Payload:
+    body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return body, gzip.compress(body, compresslevel=9), etag
+
+
+def parse_bool(value: Optional[str]) -> Optional[bool]:
+    if value is None:
+        return None
+    return value.lower() in ("1", "true", "yes")
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, honouring q-values (gzip;q=0 refuses it)."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    # An explicit gzip entry overrides the "*" wildcard
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def clamp_years(filters: QuestionFilter, years: Sequence[int]) -> QuestionFilter:
+    """
+    Map the year range onto the years in the bank, so every range selecting
+    the same questions is the same filter: bounds outside the bank's years
+    become None (no bound) or one year past its end (nothing matches).
+    """
+    if not years:
+        return filters
+    first, last = years[0], years[-1]
+    year_min, year_max = filters.year_min, filters.year_max
+    if year_min is not None:
+        year_min = None if year_min <= first else min(year_min, last + 1)
+    if year_max is not None:
+        year_max = None if year_max >= last else max(year_max, first - 1)
+    return replace(filters, year_min=year_min, year_max=year_max)
+
+
+class QuestionAPI:
+    LIST_CACHE_SIZE = 256
+
+    def __init__(self, bot, host: str = "127.0.0.1", port: int = 8080):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner = None
+        self._thread: Optional[threading.Thread] = None
+        # Encoded responses, dropped whenever the bot loads a new question bank
+        self._index = None
+        self._questions: Dict[str, Payload] = {}
+        self._lists: Dict[Tuple[QuestionFilter, int], Payload] = {}
+
+    @property
+    def available(self) -> bool:
+        return web is not None
+
+    STARTUP_TIMEOUT = 10.0
+
+    def start(self) -> None:
+        """
+        Start the server thread and wait until it is listening.
+
+        Raises:
+            OSError: If the server cannot bind its host and port; the same
+                error the server thread hit is re-raised here.
+            concurrent.futures.TimeoutError: If the server is not listening
+                within STARTUP_TIMEOUT seconds.
+        """
+        if not self.available or self._thread:
+            return
+        started: concurrent.futures.Future = concurrent.futures.Future()
+        self._thread = threading.Thread(target=self._run, args=(started,), name="question-api", daemon=True)
+        self._thread.start()
+        try:
+            started.result(timeout=self.STARTUP_TIMEOUT)
+        except Exception:
+            self._thread = None
+            raise
+
+    def stop(self) -> None:
+        if not self._thread:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, started: concurrent.futures.Future) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            app = web.Application()
+            app.router.add_get("/questions", self.list_questions)
+            app.router.add_get("/questions/{question_id}", self.get_question)
+            app.router.add_get("/images/{question_id}", self.get_image)
+            self._runner = web.AppRunner(app)
+            self._loop.run_until_complete(self._runner.setup())
+            self._loop.run_until_complete(web.TCPSite(self._runner, self.host, self.port).start())
+        except Exception as e:
+            # Handed to start(), which would otherwise wait for a server that never comes up
+            if self._runner:
+                self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+            started.set_exception(e)
+            return
+        logger.info("Question API listening on http://%s:%d", self.host, self.port)
+        started.set_result(None)
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _check_index(self):
+        index = self.bot.question_index
+        if index is not self._index:
+            self._index = index
+            self._questions.clear()
+            self._lists.clear()
+        return index
+
+    @staticmethod
+    def _respond(request, payload: Payload):
+        body, compressed, etag = payload
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "public, max-age=300",
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            return web.Response(status=304, headers=headers)
+        if accepts_gzip(request.headers.get("Accept-Encoding", "")):
+            headers["Content-Encoding"] = "gzip"
+            body = compressed
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def get_question(self, request):
+        index = self._check_index()
+        question_id = request.match_info["question_id"]
+        payload = self._questions.get(question_id)
+        if payload is None:
+            question = index.get(question_id)
+            if question is None:
+                raise web.HTTPNotFound(text=f"No question with ID {question_id}")
+            payload = self._questions[question_id] = encode_payload(question_payload(question))
+        return self._respond(request, payload)
+
+    async def list_questions(self, request):
+        index = self._check_index()
+        query = request.query
+        try:
+            topic = USNCOTopic[query.get("topic", "RANDOM").upper()]
+            exam_type = query.get("exam_type")
+            if exam_type is not None and exam_type not in ("local", "national"):
+                raise ValueError(f"exam_type must be local or national, not {exam_type!r}")
+            filters = QuestionFilter(
+                topic=topic,
+                exam_type=exam_type,
+                year_min=int(query["year_min"]) if "year_min" in query else None,
+                year_max=int(query["year_max"]) if "year_max" in query else None,
+                has_image=parse_bool(query.get("has_image")),
+            )
+        except (KeyError, ValueError) as e:
+            raise web.HTTPBadRequest(text=f"Invalid filter: {e}")
+        filters = clamp_years(filters, index.years)
+
+        # Blocked questions are left out, so the blocklist is part of the key
+        key = (filters, self.bot.blocklist.mask)
+        payload = self._lists.pop(key, None)
+        if payload is None:
+            if len(self._lists) >= self.LIST_CACHE_SIZE:
+                self._lists.pop(next(iter(self._lists)))
+            # Decoded here rather than via index.members(), and masks not cached:
+            # the index's caches belong to the bot's thread
+            questions = [index.questions[i] for i in bit_positions(index.mask_for(filters, cache=False))]
+            payload = encode_payload([
+                {
+                    "question_id": question.question_id,
+                    "exam_type": question.exam_type,
+                    "exam_year": question.exam_year,
+                    "number": question.number,
+                    "url": f"/questions/{question.question_id}",
+                }
+                for question in questions
+                if question.question_id and not self.bot.blocklist.is_blocked(question.question_id)
+            ])
+        # Reinserted on every hit, so the first key is always the least recently used
+        self._lists[key] = payload
+        return self._respond(request, payload)
+
+    async def get_image(self, request):
+        question = self._check_index().get(request.match_info["question_id"])
+        if question is None or not question.image_path or not os.path.exists(question.image_path):
+            raise web.HTTPNotFound(text="No image for this question")
+        # FileResponse handles ETag/If-None-Match, Last-Modified and Range itself
+        return web.FileResponse(question.image_path, headers={"Cache-Control": "public, max-age=86400"})
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionBlocklist:
+    """
+    Questions taken out of rotation because they were reported as faulty.
+
+    A question is blocked once `threshold` different users have reported it,
+    or straight away when an admin reports or blocks it. Admins can unblock a
+    question, which also forgets its reports. Lookups are a set membership
+    test; `mask` mirrors the blocked set as a bitset over QuestionIndex
+    positions for the rare case where most of a selection is blocked.
+
+    The bot keeps one instance, so every shard of an AutoShardedBot sees the
+    same blocklist. It is saved to disk on every change so it survives restarts.
+    """
+
+    def __init__(self, path: str = "reports/blocklist.json", threshold: int = 3):
+        self.path = path
+        self.threshold = threshold
+        self.blocked: Set[str] = set()
+        self.reporters: Dict[str, Set[str]] = {}
+        self.mask = 0
+        self._position: Dict[str, int] = {}
+        # Saves run in worker threads: they are serialized, and one taken from
+        # an older snapshot than the file on disk is dropped
+        self._save_lock = threading.Lock()
+        self._snapshots = 0
+        self._saved_snapshot = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.blocked = set(data.get("blocked", []))
+            self.reporters = {qid: set(users) for qid, users in data.get("reporters", {}).items()}
+        except (OSError, ValueError) as e:
+            logger.error("Error loading blocklist from %s: %s", self.path, e)
+
+    def snapshot(self) -> dict:
+        """Copy the blocklist for saving. Call on the thread that changes it."""
+        self._snapshots += 1
+        return {
+            "_snapshot": self._snapshots,
+            "blocked": sorted(self.blocked),
+            "reporters": {qid: sorted(users) for qid, users in self.reporters.items()},
+        }
+
+    def save(self, snapshot: Optional[dict] = None) -> None:
+        """
+        Write the blocklist to disk atomically. Safe to run in a worker thread
+        with a snapshot; concurrent saves never leave an older snapshot on disk.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        sequence = snapshot.pop("_snapshot")
+        with self._save_lock:
+            if sequence < self._saved_snapshot:
+                return
+            self._saved_snapshot = sequence
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def bind(self, position: Dict[str, int]) -> None:
+        """Rebuild the bitset for a newly loaded question bank's positions."""
+        self._position = position
+        self.mask = 0
+        for qid in self.blocked:
+            if qid in position:
+                self.mask |= 1 << position[qid]
+
+    def is_blocked(self, question_id: Optional[str]) -> bool:
+        return question_id in self.blocked
+
+    def block(self, question_id: str) -> None:
+        self.blocked.add(question_id)
+        if question_id in self._position:
+            self.mask |= 1 << self._position[question_id]
+
+    def unblock(self, question_id: str) -> None:
+        """Admin override: put the question back in rotation and forget its reports."""
+        self.blocked.discard(question_id)
+        self.reporters.pop(question_id, None)
+        if question_id in self._position:
+            self.mask &= ~(1 << self._position[question_id])
+
+    def report(self, question_id: Optional[str], user_id, is_admin: bool = False) -> bool:
+        """Record a report. Returns True if the question is blocked afterwards."""
+        if not question_id:
+            return False
+        users = self.reporters.setdefault(question_id, set())
+        users.add(str(user_id))
+        if is_admin or len(users) >= self.threshold:
+            self.block(question_id)
+        return self.is_blocked(question_id)
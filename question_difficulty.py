@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import random
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from question_models import Question
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_BUCKETS = ("easy", "medium", "hard")
+QUESTIONS_PER_EXAM = 60
+NATIONAL_OFFSET = 0.25  # A quarter of an exam: national question 30 ranks with local question 45
+
+
+def prior_difficulty(question: Question) -> float:
+    """
+    Rough difficulty of a question before anyone has answered it: national
+    exams rank above local ones, and later questions above earlier ones.
+    """
+    try:
+        position = min(int(question.number), QUESTIONS_PER_EXAM) / QUESTIONS_PER_EXAM
+    except ValueError:
+        position = 0.5
+    return position + (NATIONAL_OFFSET if question.exam_type == "National" else 0.0)
+
+
+class DifficultyModel:
+    """
+    Elo-style difficulty ratings for questions, updated online from answers.
+
+    Each answer is a match between a user and a question: the expected score
+    is 1 / (1 + 10 ** ((question - user) / 400)) and both ratings move by K
+    times the surprise, so an update is O(1).
+
+    Questions nobody has answered yet are spread over the rating range by
+    rank of a prior (national above local, later question numbers above
+    earlier ones), so the easy and hard quarters and the medium half are
+    all filled before the first answer; answers move them from there.
+
+    Questions sit in easy/medium/hard buckets by rating. Buckets are lists
+    with a position map (so moving a question is a swap-remove and picking
+    one is random.choice) plus a bitset aligned with QuestionIndex positions
+    for combining difficulty with the other /question filters.
+
+    Ratings only change in memory; save() is called in batches by the bot.
+    """
+
+    INITIAL_RATING = 1500.0
+    INITIAL_SPREAD = 100.0  # Unanswered questions start within INITIAL_RATING +- this, by prior rank
+    EASY_BELOW = 1450.0
+    HARD_ABOVE = 1550.0
+    K_QUESTION = 16.0
+    K_USER = 32.0
+
+    def __init__(self, questions: Sequence[Question], ratings_path: str = "question_ratings.json"):
+        self.ratings_path = ratings_path
+        self.questions = list(questions)
+        self.position: Dict[str, int] = {}
+        self.ratings: List[float] = []
+        self.answer_counts: List[int] = []
+        self.user_ratings: Dict[str, float] = {}
+        self.pending_updates = 0
+        # Saves run in worker threads: they are serialized, and one taken from
+        # an older snapshot than the file on disk is dropped
+        self._save_lock = threading.Lock()
+        self._snapshots = 0
+        self._saved_snapshot = 0
+
+        self.buckets: Dict[str, List[int]] = {bucket: [] for bucket in DIFFICULTY_BUCKETS}
+        self.bucket_masks: Dict[str, int] = {bucket: 0 for bucket in DIFFICULTY_BUCKETS}
+        self._bucket_of: List[Optional[str]] = []
+        self._slot: List[int] = []
+
+        saved = self._load()
+        saved_questions = saved.get("questions", {})
+        self.user_ratings = {str(uid): float(r) for uid, r in saved.get("users", {}).items()}
+
+        unrated = []
+        for i, question in enumerate(self.questions):
+            rating = self.INITIAL_RATING
+            answers = 0
+            if question.question_id:
+                self.position.setdefault(question.question_id, i)
+                if question.question_id in saved_questions:
+                    rating, answers = saved_questions[question.question_id]
+                else:
+                    unrated.append(i)
+            self.ratings.append(float(rating))
+            self.answer_counts.append(int(answers))
+            self._bucket_of.append(None)
+            self._slot.append(-1)
+
+        # Evenly spaced quantiles of the prior, mapped onto the rating range
+        unrated.sort(key=lambda i: prior_difficulty(self.questions[i]))
+        for rank, i in enumerate(unrated):
+            quantile = (rank + 0.5) / len(unrated)
+            self.ratings[i] = self.INITIAL_RATING + (2 * quantile - 1) * self.INITIAL_SPREAD
+        for i, question in enumerate(self.questions):
+            if question.question_id:
+                self._place(i)
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.ratings_path):
+            return {}
+        try:
+            with open(self.ratings_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Error loading difficulty ratings from %s: %s", self.ratings_path, e)
+            return {}
+
+    def bucket_for(self, rating: float) -> str:
+        if rating < self.EASY_BELOW:
+            return "easy"
+        if rating > self.HARD_ABOVE:
+            return "hard"
+        return "medium"
+
+    def _place(self, i: int) -> None:
+        """Move question i into the bucket matching its rating, in O(1)."""
+        new_bucket = self.bucket_for(self.ratings[i])
+        old_bucket = self._bucket_of[i]
+        if new_bucket == old_bucket:
+            return
+
+        if old_bucket is not None:
+            members = self.buckets[old_bucket]
+            slot = self._slot[i]
+            last = members.pop()
+            if last != i:
+                members[slot] = last
+                self._slot[last] = slot
+            self.bucket_masks[old_bucket] &= ~(1 << i)
+
+        self.buckets[new_bucket].append(i)
+        self._slot[i] = len(self.buckets[new_bucket]) - 1
+        self._bucket_of[i] = new_bucket
+        self.bucket_masks[new_bucket] |= 1 << i
+
+    def rating_of(self, question: Question) -> Optional[float]:
+        i = self.position.get(question.question_id or "")
+        return None if i is None else self.ratings[i]
+
+    def record_answer(self, question: Question, user_id, correct: bool) -> None:
+        """Update the question's and the user's ratings from one answer."""
+        i = self.position.get(question.question_id or "")
+        if i is None:
+            return
+        user = str(user_id)
+        user_rating = self.user_ratings.get(user, 1500.0)
+        expected = 1 / (1 + 10 ** ((self.ratings[i] - user_rating) / 400))
+        surprise = (1.0 if correct else 0.0) - expected
+
+        self.user_ratings[user] = user_rating + self.K_USER * surprise
+        self.ratings[i] -= self.K_QUESTION * surprise
+        self.answer_counts[i] += 1
+        self.pending_updates += 1
+        self._place(i)
+
+    def sample(self, bucket: str) -> Optional[Question]:
+        """Pick a random question from a difficulty bucket in constant time."""
+        members = self.buckets.get(bucket)
+        if not members:
+            return None
+        return self.questions[random.choice(members)]
+
+    def snapshot(self) -> dict:
+        """Copy the ratings for saving; clears the pending update count."""
+        self.pending_updates = 0
+        self._snapshots += 1
+        return {
+            "_snapshot": self._snapshots,
+            "questions": {
+                qid: [round(self.ratings[i], 2), self.answer_counts[i]]
+                for qid, i in self.position.items()
+                if self.answer_counts[i]
+            },
+            "users": {uid: round(r, 2) for uid, r in self.user_ratings.items()},
+        }
+
+    def save(self, snapshot: Optional[dict] = None) -> None:
+        """
+        Write ratings to disk atomically. Safe to run in a worker thread with a
+        snapshot; concurrent saves never leave an older snapshot on disk.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        sequence = snapshot.pop("_snapshot")
+        with self._save_lock:
+            if sequence < self._saved_snapshot:
+                return
+            self._saved_snapshot = sequence
+            tmp_path = self.ratings_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.ratings_path)
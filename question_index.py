@@ -0,0 +1,200 @@
+import random
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from question_models import Question, USNCOTopic, topic_for_question
+
+# Words accepted in place of the leading exam-type digit of a question ID
+EXAM_TYPE_PREFIXES = {
+    'local': '1',
+    'l': '1',
+    'national': '2',
+    'n': '2',
+}
+
+
+def normalize_id_prefix(text: str) -> str:
+    """
+    Turns user input such as "local 2018 2" or "N2019" into a question ID prefix.
+
+    Question IDs are `[exam type (1/2)][year][question number]`, so once the
+    exam type word is mapped to its digit the rest is just the digits typed.
+    """
+    text = text.strip().lower()
+    match = re.match(r"([a-z]+)\s*(.*)", text)
+    if match and match.group(1) in EXAM_TYPE_PREFIXES:
+        text = EXAM_TYPE_PREFIXES[match.group(1)] + match.group(2)
+    return re.sub(r"\D", "", text)
+
+
+@dataclass(frozen=True)
+class QuestionFilter:
+    """A combination of /question filters. None means "don't filter on this"."""
+    topic: USNCOTopic = USNCOTopic.RANDOM
+    exam_type: Optional[str] = None  # "local" or "national"
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    has_image: Optional[bool] = None
+    difficulty: Optional[str] = None  # "easy", "medium" or "hard"; ratings change, so not part of mask_for
+
+
+EXAM_ID_LENGTH = 5  # Exam type digit and year at the start of every question ID
+
+
+def id_display_key(question_id: str) -> Tuple[str, int, str]:
+    """Orders question IDs by exam, then question number."""
+    return question_id[:EXAM_ID_LENGTH], len(question_id), question_id
+
+
+def bit_positions(mask: int) -> Tuple[int, ...]:
+    """Decode a bitset into the sorted positions of its set bits."""
+    positions = []
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+        base = byte_index * 8
+        while byte:
+            low = byte & -byte
+            positions.append(base + low.bit_length() - 1)
+            byte ^= low
+    return tuple(positions)
+
+
+class QuestionIndex:
+    """
+    Lookup structures over the loaded question bank, built once per load.
+
+    Question IDs are kept in a sorted list so every ID sharing a prefix sits
+    in one contiguous slice that two binary searches can find.
+
+    Filter attributes are kept as bitsets (plain Python ints, bit i set when
+    self.questions[i] has the attribute), so any combination of filters is a
+    handful of ANDs. Year ranges use cumulative masks: the questions from
+    year_min to year_max are upto[year_max] & ~upto[year_min - 1].
+    """
+
+    MEMBER_CACHE_SIZE = 256
+
+    def __init__(self, questions: Sequence[Question]):
+        self.questions = list(questions)
+        self.by_id: Dict[str, Question] = {}
+        self.position: Dict[str, int] = {}
+        for i, question in enumerate(self.questions):
+            if question.question_id and question.question_id not in self.by_id:
+                self.by_id[question.question_id] = question
+                self.position[question.question_id] = i
+        self.sorted_ids: List[str] = sorted(self.by_id)
+        # IDs are not zero padded, so string order puts question 10 before 2.
+        # Display order (exam, then question number) is kept alongside, with
+        # each ID's exam part for finding the exams that share a prefix
+        self.display_ids: List[str] = sorted(self.by_id, key=id_display_key)
+        self._display_exams: List[str] = [qid[:EXAM_ID_LENGTH] for qid in self.display_ids]
+
+        self.all_mask = (1 << len(self.questions)) - 1
+        self.topic_masks: Dict[USNCOTopic, int] = {topic: 0 for topic in USNCOTopic}
+        self.exam_type_masks: Dict[str, int] = {"local": 0, "national": 0}
+        self.image_mask = 0
+        year_masks: Dict[int, int] = {}
+
+        for i, question in enumerate(self.questions):
+            bit = 1 << i
+            self.topic_masks[topic_for_question(question)] |= bit
+            if question.image_path:
+                self.image_mask |= bit
+            if question.question_id:
+                self.exam_type_masks[question.exam_type.lower()] |= bit
+                if question.exam_year.isdigit():
+                    year = int(question.exam_year)
+                    year_masks[year] = year_masks.get(year, 0) | bit
+        self.topic_masks[USNCOTopic.RANDOM] = self.all_mask
+
+        self.years: List[int] = sorted(year_masks)
+        self._years_upto: List[int] = []
+        running = 0
+        for year in self.years:
+            running |= year_masks[year]
+            self._years_upto.append(running)
+
+        self._filter_masks: Dict[QuestionFilter, int] = {}
+        self._members: Dict[int, Tuple[int, ...]] = {}
+
+    def get(self, question_id: str) -> Optional[Question]:
+        return self.by_id.get(question_id.strip())
+
+    def ids_with_prefix(self, prefix: str, limit: int = 25) -> List[str]:
+        """
+        Return the first `limit` IDs starting with `prefix`, by exam and question number.
+
+        A prefix no longer than the exam part (type and year) matches whole
+        exams, a contiguous slice of display_ids, so this is O(log n + limit).
+        A longer one falls within a single exam, whose few matches are sorted.
+        """
+        if len(prefix) <= EXAM_ID_LENGTH:
+            start = bisect_left(self._display_exams, prefix)
+            end = bisect_left(self._display_exams, prefix + "\uffff", lo=start)
+            return self.display_ids[start:min(end, start + limit)]
+        start = bisect_left(self.sorted_ids, prefix)
+        end = bisect_left(self.sorted_ids, prefix + "\uffff", lo=start)
+        return sorted(self.sorted_ids[start:end], key=id_display_key)[:limit]
+
+    def _upto_year(self, year: int) -> int:
+        """Mask of questions from any year <= `year`."""
+        i = bisect_right(self.years, year)
+        return self._years_upto[i - 1] if i else 0
+
+    def mask_for(self, filters: QuestionFilter, cache: bool = True) -> int:
+        """
+        Bitset of the questions matching every set filter.
+
+        Masks are cached per filter combination; other threads pass
+        cache=False so the cache is only ever written from the bot's thread.
+        """
+        mask = self._filter_masks.get(filters)
+        if mask is not None:
+            return mask
+
+        mask = self.topic_masks[filters.topic]
+        if filters.exam_type:
+            mask &= self.exam_type_masks.get(filters.exam_type, 0)
+        if filters.year_min is not None or filters.year_max is not None:
+            years = self._upto_year(filters.year_max) if filters.year_max is not None else self.all_mask
+            if filters.year_min is not None:
+                years &= ~self._upto_year(filters.year_min - 1)
+            mask &= years
+        if filters.has_image is not None:
+            mask &= self.image_mask if filters.has_image else ~self.image_mask
+
+        if cache:
+            self._filter_masks[filters] = mask
+        return mask
+
+    def members(self, mask: int) -> Tuple[int, ...]:
+        """Positions of the questions in `mask`, cached for recently used masks."""
+        positions = self._members.get(mask)
+        if positions is None:
+            if len(self._members) >= self.MEMBER_CACHE_SIZE:
+                self._members.pop(next(iter(self._members)))
+            positions = self._members[mask] = bit_positions(mask)
+        return positions
+
+    def count(self, filters: QuestionFilter) -> int:
+        return self.mask_for(filters).bit_count()
+
+    def sample(self, filters: QuestionFilter, within: Optional[int] = None, exclude: int = 0) -> Optional[Question]:
+        """
+        Pick a random question matching `filters`, or None if nothing matches.
+
+        `within` optionally narrows the selection to another bitset over the
+        same positions (eg. a difficulty bucket) and `exclude` removes one
+        (eg. blocked questions).
+        """
+        mask = self.mask_for(filters)
+        if within is not None:
+            mask &= within
+        mask &= ~exclude
+        if not mask:
+            return None
+        return self.questions[random.choice(self.members(mask))]
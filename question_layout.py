@@ -0,0 +1,339 @@
+"""
+Coordinate-based layout analysis of exam pages.
+
+The regex pipeline flattens each column to text, splitting the page at
+page.width / 2, and finds questions with regular expressions, while the
+images come from pymupdf text blocks with the column hardcoded at x = 310.
+Here both come from the positions of the words instead:
+
+1. Lines are built from pymupdf's text trace (which also decodes Symbol-font
+   glyphs), keeping sub- and superscripts on the line they belong to.
+2. The column gutter is the widest empty strip of x-coordinates near the
+   middle of the page, found per page from the lines that do not cross it.
+   Rows with a line across the gutter (directions, headers, footers) are
+   not part of either column.
+3. One pass over each column's words in reading order starts a question at a
+   number anchor ("12.") at the column's left margin and a new field at each
+   of the (A)-(D) markers, growing the question's bounding box as it goes.
+
+check_question_layout.py compares the results with the regex pipeline.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from exam_parsing import normalize_text, remove_footer_from_option, remove_footers
+from pymupdf_text import LIGATURES, X_TOLERANCE
+
+ANCHOR_PATTERN = re.compile(r"(\d{1,3})\.")
+OPTION_MARKERS = ("(A)", "(B)", "(C)", "(D)")
+
+GUTTER_BAND = (0.35, 0.65)  # Part of the page width the gutter is looked for in
+GUTTER_SLACK = 2  # Lines allowed to cover a strip that is still counted as gutter
+ANCHOR_INDENT = 10  # How far right of the leftmost anchor of its column a number anchor may start
+SPAN_OVERLAP = 10  # How far into each column a line reaches to count as running across the page
+FOOTER_GAP = 20  # Space above the bottom row of a page that makes it a footer
+PADDING = 4  # Around a question's bounding box
+
+
+@dataclass
+class Word:
+    text: str
+    x0: float
+    top: float
+    x1: float
+    bottom: float
+
+
+@dataclass
+class Line:
+    words: List[Word]
+    x0: float
+    top: float
+    x1: float
+    bottom: float
+
+    def add(self, word: Word) -> None:
+        self.words.append(word)
+        self.x0, self.x1 = min(self.x0, word.x0), max(self.x1, word.x1)
+        self.top, self.bottom = min(self.top, word.top), max(self.bottom, word.bottom)
+
+
+@dataclass
+class QuestionRegion:
+    number: str
+    page_number: int
+    column: int  # 0 for the left column, 1 for the right
+    fields: Dict[str, List[str]] = field(default_factory=lambda: {"text": []})
+    bbox: Optional[List[float]] = None  # Union of the question's words in its own column
+
+    def include(self, word: Word) -> None:
+        if self.bbox is None:
+            self.bbox = [word.x0, word.top, word.x1, word.bottom]
+        else:
+            bbox = self.bbox
+            bbox[0], bbox[1] = min(bbox[0], word.x0), min(bbox[1], word.top)
+            bbox[2], bbox[3] = max(bbox[2], word.x1), max(bbox[3], word.bottom)
+
+    def as_question(self) -> Optional[dict]:
+        """The question as parse_questions returns it, or None without all four options."""
+        if list(self.fields) != ["text", "A", "B", "C", "D"]:
+            return None
+        # Footers are left out by position, but a stray "END OF TEST" or directions line is not
+        texts = {
+            key: normalize_text(remove_footers(" ".join(words), self.page_number))
+            for key, words in self.fields.items()
+        }
+        if not texts["text"]:
+            return None
+        options = {key: texts[key] for key in "ABC"}
+        options["D"] = remove_footer_from_option(texts["D"])
+        return {"number": self.number, "text": texts["text"], "options": options}
+
+
+@dataclass
+class PageSegmentation:
+    width: float
+    height: float
+    column_split: float
+    columns: Tuple[float, float, float, float]  # x0 and x1 of the left column, then of the right
+    questions: List[QuestionRegion]
+    image_bboxes: List[Tuple[str, Tuple[float, float, float, float]]]
+
+
+def page_lines(page) -> List[Line]:
+    """
+    Upright text lines of a pymupdf page, in content-stream order.
+
+    A character continues the previous line when it starts just after it and
+    their boxes overlap vertically, which keeps sub- and superscripts (often
+    spans of their own) on their line and in their word. Words are split at
+    spaces and at gaps wider than X_TOLERANCE.
+    """
+    lines = []
+    line = None
+    word = None
+    for span in page.get_texttrace():
+        if span["dir"] != (1.0, 0.0):
+            continue
+        for code, _, _, (x0, top, x1, bottom) in span["chars"]:
+            text = chr(code)
+            if text.isspace():
+                word = None
+                continue
+            text = LIGATURES.get(text, text)
+            same_line = line is not None and top < line.bottom and bottom > line.top
+            if word is not None and same_line and word.x0 <= x0 <= word.x1 + X_TOLERANCE:
+                word.text += text
+                word.x1, word.top, word.bottom = max(word.x1, x1), min(word.top, top), max(word.bottom, bottom)
+                line.x1, line.top, line.bottom = max(line.x1, x1), min(line.top, top), max(line.bottom, bottom)
+                continue
+            word = Word(text, x0, top, x1, bottom)
+            # A gap of more than about a character height ends the line, well short of the gutter
+            if same_line and line.x1 - X_TOLERANCE <= x0 <= line.x1 + (bottom - top):
+                line.add(word)
+            else:
+                line = Line([word], x0, top, x1, bottom)
+                lines.append(line)
+    return lines
+
+
+def widest_strip(coverage: List[int], low: int, high: int, limit: int) -> Optional[Tuple[int, int]]:
+    """(start, stop) of the widest run of x in [low, high) that at most `limit` lines cover."""
+    best = None
+    start = None
+    for x in range(low, high + 1):
+        if x < high and coverage[x] <= limit:
+            start = x if start is None else start
+        elif start is not None:
+            if best is None or x - start > best[1] - best[0]:
+                best = (start, x)
+            start = None
+    return best
+
+
+def find_column_split(lines: List[Line], width: float) -> Optional[float]:
+    """
+    The middle of the page's column gutter, or None for a page without one.
+
+    Lines that run across the middle of the page (directions, footers) are
+    left out. Of the rest, the gutter is the widest strip of the middle band
+    that no line covers or, failing that, that at most GUTTER_SLACK lines
+    cover (a stray glyph or a figure label).
+    """
+    coverage = [0] * (int(width) + 2)
+    middle = width / 2
+    for line in lines:
+        if line.x0 < middle < line.x1:
+            continue
+        for x in range(max(int(line.x0), 0), min(int(line.x1) + 1, len(coverage))):
+            coverage[x] += 1
+
+    low, high = int(width * GUTTER_BAND[0]), int(width * GUTTER_BAND[1])
+    for limit in (0, GUTTER_SLACK):
+        strip = widest_strip(coverage, low, high, limit)
+        if strip is not None and strip[1] - strip[0] >= 2 * X_TOLERANCE:
+            return (strip[0] + strip[1]) / 2
+    return None
+
+
+def reading_order(lines: List[Line]) -> List[Line]:
+    """Lines top to bottom, and left to right within a row of lines that overlap vertically."""
+    ordered = []
+    row = []
+    row_bottom = None
+    for line in sorted(lines, key=lambda line: line.top):
+        if row and (line.top + line.bottom) / 2 > row_bottom:
+            ordered.extend(sorted(row, key=lambda line: line.x0))
+            row = []
+        if not row:
+            row_bottom = line.bottom
+        row.append(line)
+    ordered.extend(sorted(row, key=lambda line: line.x0))
+    return ordered
+
+
+def page_columns(lines: List[Line], split: float) -> Tuple[List[Line], List[Line], Optional[float]]:
+    """
+    Left and right column lines in reading order, and the top of the page footer.
+
+    Lines reaching well into both columns, and any line sharing a row with
+    one, belong to neither column. Nor does the bottom row of the page when it sits more
+    than FOOTER_GAP below everything else, as the running footer does.
+    """
+    excluded = [line for line in lines if line.x0 < split - SPAN_OVERLAP and line.x1 > split + SPAN_OVERLAP]
+    footer_top = None
+    if lines:
+        lowest = max(lines, key=lambda line: line.top)
+        bottom_row = [line for line in lines if line.bottom > lowest.top]
+        above = max((line.bottom for line in lines if line.bottom <= lowest.top), default=0)
+        if lowest.top - above > FOOTER_GAP or any(line in excluded for line in bottom_row):
+            excluded.extend(bottom_row)
+            footer_top = min(line.top for line in bottom_row)
+
+    columns = ([], [])
+    for line in lines:
+        if any(line.top < other.bottom and other.top < line.bottom for other in excluded):
+            continue
+        columns[line.x0 >= split].append(line)
+    return reading_order(columns[0]), reading_order(columns[1]), footer_top
+
+
+def segment_columns(columns, page_number: int) -> List[QuestionRegion]:
+    """
+    Questions of a page in one pass over its column lines.
+
+    A question starts at a number anchor as far left as the column's other
+    anchors and higher than the page's previous question; (A)-(D) start the options in
+    turn. Text before the right column's first anchor continues the last
+    question of the left column, as in the flattened column text.
+    """
+    questions = []
+    current = None
+    last_number = 0
+    for column, lines in enumerate(columns):
+        # One- and two-digit numbers are right-aligned, so anchors start within a few points of each other
+        margin = min((line.x0 for line in lines if ANCHOR_PATTERN.fullmatch(line.words[0].text)), default=0)
+        for line in lines:
+            for i, word in enumerate(line.words):
+                anchor = ANCHOR_PATTERN.fullmatch(word.text) if i == 0 else None
+                if anchor and line.x0 <= margin + ANCHOR_INDENT and int(anchor.group(1)) > last_number:
+                    last_number = int(anchor.group(1))
+                    current = QuestionRegion(anchor.group(1), page_number, column)
+                    questions.append(current)
+                    current.include(word)
+                    continue
+                if current is None:
+                    continue
+                fields = current.fields
+                if len(fields) <= 4 and word.text.startswith(OPTION_MARKERS[len(fields) - 1]):
+                    # The next option's marker, sometimes run together with the option's first word
+                    fields["ABCD"[len(fields) - 1]] = [word.text[3:]] if len(word.text) > 3 else []
+                else:
+                    fields[next(reversed(fields))].append(word.text)
+                if current.column == column:
+                    current.include(word)
+    return questions
+
+
+def page_graphics(page) -> List[Tuple[float, float, float, float]]:
+    """Bounding boxes of the images and drawings on a page."""
+    return [rect for kind, rect in page.get_bboxlog() if "text" not in kind]
+
+
+def graphics_bottom(graphics, x0: float, x1: float, limit: float) -> float:
+    """Bottom of the lowest of graphics between x0 and x1 that starts above limit."""
+    bottom = 0.0
+    for gx0, gy0, gx1, gy1 in graphics:
+        if gx0 >= x0 - X_TOLERANCE and gx1 <= x1 + X_TOLERANCE and gy0 < limit:
+            bottom = max(bottom, gy1)
+    return bottom
+
+
+def question_image_bboxes(page, graphics, questions: List[QuestionRegion], columns, footer_top: Optional[float],
+                          column_bounds) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+    """
+    Image bounding box of each question: the width of its column, from its
+    anchor down to the next question's anchor in the same column, or for the
+    last question of a column down to the lowest text, image or drawing above
+    the footer.
+    """
+    limit = footer_top if footer_top is not None else page.rect.height
+    bboxes = []
+    for i, question in enumerate(questions):
+        x0, x1 = column_bounds[question.column]
+        following = next((q for q in questions[i + 1:] if q.column == question.column), None)
+        if following is not None:
+            y1 = following.bbox[1] - PADDING
+        else:
+            text_bottom = max((line.bottom for line in columns[question.column]), default=question.bbox[3])
+            y1 = min(max(text_bottom, graphics_bottom(graphics, x0, x1, limit)) + PADDING, limit)
+        bboxes.append((question.number, (x0, question.bbox[1] - PADDING, x1, max(y1, question.bbox[3]))))
+    return bboxes
+
+
+def segment_page(page, page_number: int) -> PageSegmentation:
+    """
+    Questions, their text and their image bounding boxes from one pymupdf page.
+
+    Args:
+        page: The pymupdf page.
+        page_number (int): 1-based page number.
+    Returns:
+        PageSegmentation: The column split and the page's questions in reading order.
+    """
+    width, height = page.rect.width, page.rect.height
+    lines = page_lines(page)
+    split = find_column_split(lines, width)
+    if split is None:
+        split = width / 2
+    left, right, footer_top = page_columns(lines, split)
+    columns = (left, right)
+    graphics = page_graphics(page)
+    # Each column's text and figures plus PADDING, so a page with a near-empty column does not widen the other
+    extents = [
+        [(line.x0, line.x1) for line in left] + [(g[0], g[2]) for g in graphics if g[2] <= split],
+        [(line.x0, line.x1) for line in right] + [(g[0], g[2]) for g in graphics if g[0] >= split],
+    ]
+    column_bounds = (
+        (max(min((x0 for x0, _ in extents[0]), default=0) - PADDING, 0),
+         min(max((x1 for _, x1 in extents[0]), default=split) + PADDING, split)),
+        (max(min((x0 for x0, _ in extents[1]), default=split) - PADDING, split),
+         min(max((x1 for _, x1 in extents[1]), default=width) + PADDING, width)),
+    )
+    questions = segment_columns(columns, page_number)
+    return PageSegmentation(
+        width=width,
+        height=height,
+        column_split=split,
+        columns=column_bounds[0] + column_bounds[1],
+        questions=questions,
+        image_bboxes=question_image_bboxes(page, graphics, questions, columns, footer_top, column_bounds),
+    )
+
+
+def page_questions(page, page_number: int) -> List[dict]:
+    """Parsed questions of a pymupdf page, in the format of parse_page_questions."""
+    segmentation = segment_page(page, page_number)
+    return [q for q in (region.as_question() for region in segmentation.questions) if q is not None]
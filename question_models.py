@@ -36,6 +36,13 @@ class USNCOTopic(Enum):
                 return topic
         return cls.RANDOM
 
+def topic_for_question(question: 'Question') -> USNCOTopic:
+    """Returns the topic a question belongs to based on its number."""
+    try:
+        return USNCOTopic.get_topic_for_number(int(question.number))
+    except (TypeError, ValueError):
+        return USNCOTopic.RANDOM
+
 @dataclass
 class Question:
     text: str
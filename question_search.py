@@ -0,0 +1,101 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from question_models import Question
+
+# Same mapping clean_text_with_removal applies to exam text
+SUBSCRIPT_MAP = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+
+# Runs of letters and digits, optionally joined by hyphens. Formulas such as
+# H2SO4 or NaCl stay one token and "half-life" keeps its hyphenated form
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when",
+    "which", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Chemistry-aware tokenizer shared by the index and queries.
+
+    Tokens are lowercased after subscript digits are normalized, so "H₂SO₄",
+    "H2SO4" and "h2so4" all become "h2so4". Hyphenated words are indexed whole
+    and by their parts so "half-life" also matches "half life".
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.translate(SUBSCRIPT_MAP)):
+        token = match.group().lower()
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part not in STOPWORDS)
+    return tokens
+
+
+def question_document(question: Question) -> str:
+    """The searchable text of a question: its stem followed by its options."""
+    options = question.options or {}
+    return " ".join([question.text or ""] + [str(text) for text in options.values() if text])
+
+
+class SearchIndex:
+    """
+    BM25-ranked inverted index over question text and options, built at load.
+
+    Postings map each token to (position, term frequency) pairs where the
+    position indexes the question list the index was built from.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, questions: Sequence[Question]):
+        self.questions = list(questions)
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for i, question in enumerate(self.questions):
+            counts = Counter(tokenize(question_document(question)))
+            self.doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self.postings.setdefault(token, []).append((i, tf))
+
+        doc_count = len(self.questions)
+        self.average_length = (sum(self.doc_lengths) / doc_count) if doc_count else 0.0
+        self.idf: Dict[str, float] = {
+            token: math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self.postings.items()
+        }
+        # Per-document BM25 length normalisation, computed once
+        self._norms = [
+            self.K1 * (1 - self.B + self.B * length / self.average_length) if self.average_length else self.K1
+            for length in self.doc_lengths
+        ]
+
+    def search(self, query: str, limit: int = 50) -> List[Tuple[Question, float]]:
+        """
+        Rank questions against `query`.
+
+        Questions matching more of the query terms always rank above ones
+        matching fewer; BM25 breaks ties within the same number of matches.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for term in terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for doc, tf in docs:
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.K1 + 1) / (tf + self._norms[doc])
+                matched[doc] = matched.get(doc, 0) + 1
+
+        ranked = sorted(scores, key=lambda doc: (matched[doc], scores[doc]), reverse=True)[:limit]
+        return [(self.questions[doc], scores[doc]) for doc in ranked]
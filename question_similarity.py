@@ -0,0 +1,82 @@
+import math
+from collections import Counter
+from typing import Dict, List, Sequence
+
+from question_models import Question
+from question_search import question_document, tokenize
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # "More like this" is simply unavailable without numpy/scipy
+    np = None
+    sparse = None
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour lists over a TF-IDF matrix of question text and options.
+
+    Every question's top-k neighbours are computed when the index is built, a
+    block of rows at a time with sparse matrix products, so looking up similar
+    questions later is a plain array read.
+    """
+
+    def __init__(self, questions: Sequence[Question], k: int = 10, block_size: int = 256):
+        self.questions = list(questions)
+        self.position: Dict[str, int] = {}
+        for i, question in enumerate(self.questions):
+            if question.question_id:
+                self.position.setdefault(question.question_id, i)
+
+        self.available = np is not None and len(self.questions) > 1
+        self.neighbors = None
+        if self.available:
+            self.matrix = self._build_matrix()
+            self.neighbors = self._top_k(min(k, len(self.questions) - 1), block_size)
+
+    def _build_matrix(self):
+        """Row-normalised TF-IDF matrix with sublinear term frequencies."""
+        vocabulary: Dict[str, int] = {}
+        rows, cols, values = [], [], []
+        for i, question in enumerate(self.questions):
+            for token, tf in Counter(tokenize(question_document(question))).items():
+                rows.append(i)
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+                values.append(1.0 + math.log(tf))
+
+        shape = (len(self.questions), max(len(vocabulary), 1))
+        matrix = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (rows, cols)), shape=shape
+        )
+        document_frequency = np.bincount(matrix.indices, minlength=shape[1])
+        idf = np.log((1 + shape[0]) / (1 + document_frequency)).astype(np.float32) + 1
+        matrix = matrix.multiply(idf).tocsr()
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms).dot(matrix).tocsr().astype(np.float32)
+
+    def _top_k(self, k: int, block_size: int):
+        count = self.matrix.shape[0]
+        neighbors = np.empty((count, k), dtype=np.int32)
+        transposed = self.matrix.T.tocsc()
+
+        for start in range(0, count, block_size):
+            stop = min(start + block_size, count)
+            scores = (self.matrix[start:stop] @ transposed).toarray()
+            scores[np.arange(stop - start), np.arange(start, stop)] = -1  # never recommend itself
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+            neighbors[start:stop] = np.take_along_axis(top, order, axis=1)
+
+        return neighbors
+
+    def similar_to(self, question: Question, limit: int = 5) -> List[Question]:
+        """The `limit` questions closest to `question`, nearest first."""
+        if not self.available or not question.question_id:
+            return []
+        i = self.position.get(question.question_id)
+        if i is None:
+            return []
+        return [self.questions[j] for j in self.neighbors[i, :limit]]
@@ -0,0 +1,181 @@
+"""
+Streaming extraction: pages flow through the stages one at a time.
+
+build_corpus holds every exam's questions until it writes whole JSON
+arrays, and
+pdfplumber keeps the chars and layout objects of every page it has read
+until the PDF is closed. Here each stage is a generator over pages:
+
+    extract_pages   raw column text of each question page
+    clean_pages     footers removed and text normalized
+    parse_pages     questions of the page, with their answers
+    enrich_pages    question images rendered, IDs and image paths added
+    write_pages     one JSON line per question, appended as each page completes
+
+A page is released (ExamExtractor.release_page) once it has been written,
+and the next exam is only opened when the last one is closed, so memory
+holds one page and one open PDF whatever the number or size of the exams.
+
+Usage:
+    python Database.py --stream      writes enriched_questions/<exam>_parsed.jsonl
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pymupdf
+
+from exam_extractor import ExamExtractor, ExamJob, enrich_questions, find_exams
+from exam_parsing import associate_questions_with_answers, clean_page_text, parse_page_text
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamPage:
+    index: int  # 0-based page index
+    number: int  # 1-based page number, as used by the footer patterns
+    columns: Tuple[str, str] = ("", "")  # Raw left and right column text
+    text: str = ""  # Cleaned text of both columns
+    questions: List[dict] = field(default_factory=list)
+
+
+def extract_pages(extractor: ExamExtractor, errors: list, page_range=None) -> Iterator[StreamPage]:
+    for index in extractor.question_pages(page_range):
+        page = StreamPage(index, index + 1)
+        try:
+            page.columns = extractor.column_texts(index)
+        except Exception as e:
+            errors.append({'page': page.number, 'error': str(e)})
+        yield page
+        # The stages below have read what they need from a page once they ask for the next one
+        extractor.release_page(index)
+
+
+def clean_pages(pages: Iterator[StreamPage], errors: list) -> Iterator[StreamPage]:
+    for page in pages:
+        try:
+            page.text = clean_page_text(*page.columns, page.number)
+        except Exception as e:
+            errors.append({'page': page.number, 'error': str(e)})
+        yield page
+
+
+def parse_pages(pages: Iterator[StreamPage], answer_key: Dict[int, str], errors: list) -> Iterator[StreamPage]:
+    for page in pages:
+        try:
+            page.questions = associate_questions_with_answers(parse_page_text(page.text), answer_key)
+        except Exception as e:
+            errors.append({'page': page.number, 'error': str(e)})
+        yield page
+
+
+def enrich_pages(pages: Iterator[StreamPage], extractor: ExamExtractor, image_folder: Optional[str],
+                 exam_type: int, exam_year: int) -> Iterator[StreamPage]:
+    """
+    Save each page's question images and add IDs and image paths to its questions.
+
+    A question's text and its image box can fall on neighbouring pages, so
+    the images of the whole exam so far are kept (IDs and paths only) and
+    each page is held back until the next one's images are saved.
+    """
+    images = {}
+    previous = None
+    for page in pages:
+        if image_folder is not None:
+            images.update(extractor.page_images(page.index, image_folder, exam_type, exam_year))
+        if previous is not None:
+            previous.questions = enrich_questions(previous.questions, images, exam_type, exam_year)
+            yield previous
+        previous = page
+    if previous is not None:
+        previous.questions = enrich_questions(previous.questions, images, exam_type, exam_year)
+        yield previous
+
+
+def write_pages(pages: Iterator[StreamPage], path: str) -> int:
+    """
+    Write the questions of each page as JSON Lines as it arrives. The file
+    is replaced only once every page is written. Returns the question count.
+    """
+    count = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for page in pages:
+            for question in page.questions:
+                f.write(json.dumps(question) + "\n")
+            count += len(page.questions)
+            f.flush()
+    os.replace(tmp_path, path)
+    return count
+
+
+def stream_exam(job: ExamJob, output_path: str, image_folder: Optional[str] = None,
+                errors: Optional[list] = None) -> int:
+    """
+    Extract one exam page by page into a JSON Lines file.
+
+    Args:
+        job (ExamJob): The exam, its text backend, image profile and render cache.
+        output_path (str): Path of the JSON Lines file to write.
+        image_folder (str): Folder to save the exam's question images in, or None to skip images.
+        errors (list): Page errors are appended here.
+    Returns:
+        int: Number of questions written.
+    """
+    errors = [] if errors is None else errors
+    exam_errors = []
+    if image_folder is not None:
+        os.makedirs(image_folder, exist_ok=True)
+    with ExamExtractor(job.pdf_path, job.text_backend, job.render_cache, job.image_profile) as extractor:
+        # The answer key is on the last page, so it is read before the questions stream past
+        answer_key = extractor.answer_key()
+        extractor.release_page(len(extractor) - 1)
+
+        pages = extract_pages(extractor, exam_errors)
+        pages = clean_pages(pages, exam_errors)
+        pages = parse_pages(pages, answer_key, exam_errors)
+        pages = enrich_pages(pages, extractor, image_folder, job.exam_type, job.exam_year)
+        count = write_pages(pages, output_path)
+    # MuPDF keeps the fonts and images of closed documents in its store until it holds 256 MB
+    pymupdf.TOOLS.store_shrink(100)
+    errors.extend(dict(error, file=job.file_name) for error in exam_errors)
+    return count
+
+
+def stream_all_exams(input_folder: str, output_folder: str, image_folder: Optional[str] = None,
+                     text_backend: str = "pdfplumber", render_cache: Optional[str] = None,
+                     image_profile: str = "original", jobs: Optional[List[ExamJob]] = None) -> Dict[str, int]:
+    """
+    Extract every exam into <output_folder>/<exam>_parsed.jsonl, one exam and one page at a time.
+
+    Args:
+        input_folder (str): Path to the folder containing exam PDFs.
+        output_folder (str): Path to save the enriched questions in.
+        image_folder (str): Path to save question images, or None to skip images.
+        text_backend (str): Library to read the question text with, "pdfplumber" or "pymupdf".
+        render_cache (str): Optional folder to keep rendered pages in.
+        image_profile (str): Resolution and encoding of the images, a key of ExamImages.IMAGE_PROFILES.
+        jobs (list): Only stream these exams (defaults to every PDF in input_folder).
+    Returns:
+        dict: Number of questions written per exam file name.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    counts = {}
+    errors = []
+    for job in find_exams(input_folder) if jobs is None else jobs:
+        job.text_backend = text_backend
+        job.render_cache = render_cache
+        job.image_profile = image_profile
+        exam_image_folder = os.path.join(image_folder, job.base_name) if image_folder is not None else None
+        output_path = os.path.join(output_folder, f"{job.base_name}_parsed.jsonl")
+        counts[job.file_name] = stream_exam(job, output_path, exam_image_folder, errors)
+        logger.info("Streamed %d questions from %s to %s", counts[job.file_name], job.file_name, output_path)
+
+    if errors:
+        with open('parsing_errors.json', 'w') as f:
+            json.dump(errors, f, indent=4)
+    return counts
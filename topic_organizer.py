@@ -1,8 +1,11 @@
 import json
+import logging
 import os
 from typing import Dict, List
 from question_models import Question, USNCOTopic
 
+logger = logging.getLogger(__name__)
+
 class TopicOrganizer:
     def __init__(self, questions_folder: str):
         """
@@ -36,7 +39,7 @@ class TopicOrganizer:
                     if topic != USNCOTopic.RANDOM:  # Only add to random if it's not already a random question
                         self.questions_by_topic[USNCOTopic.RANDOM].append(Question.from_json(q))
                 except (ValueError, KeyError) as e:
-                    print(f"Error processing question {q.get('number', 'unknown')}: {e}")
+                    logger.warning("Error processing question %s in %s: %s", q.get('number', 'unknown'), filename, e)
     
     def get_questions_by_topic(self, topic: USNCOTopic) -> List[Question]:
         """Get all questions for a specific topic."""